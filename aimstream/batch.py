@@ -0,0 +1,281 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+import typer
+from wasabi import msg  # type: ignore[import]
+
+from .dockerfile import DockerfileResult, analyze, extract_dockerfile
+from .llm import get_openai_response_by_model
+from .router import Router
+
+DEFAULT_WORKERS = 4
+_SLUG = re.compile(r"[^a-z0-9]+")
+
+
+class BatchResult:
+    """Outcome of one prompt in a batch"""
+
+    def __init__(
+        self,
+        index: int,
+        id: str,
+        prompt: str,
+        content: Optional[str],
+        latency: float,
+        error: Optional[str] = None,
+    ) -> None:
+        self.index = index
+        self.id = id
+        self.prompt = prompt
+        self.content = content
+        self.latency = latency
+        self.error = error
+
+        self.analysis: Optional[DockerfileResult] = (
+            analyze(extract_dockerfile(content)) if content else None
+        )
+
+    @property
+    def dockerfile(self) -> Optional[str]:
+        return self.analysis.text if self.analysis is not None else None
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "id": self.id,
+            "prompt": self.prompt,
+            "content": self.content,
+            "dockerfile": self.dockerfile,
+            "stages": self.analysis.stages if self.analysis else None,
+            "layers": self.analysis.layers if self.analysis else None,
+            "issues": (
+                [issue.to_dict() for issue in self.analysis.issues]
+                if self.analysis
+                else []
+            ),
+            "latency": self.latency,
+            "error": self.error,
+        }
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile `q` in [0, 100] of `values`, interpolating between ranks"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class BatchReport:
+    """Throughput and latency of a batch run"""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.latencies: List[float] = []
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def add(self, result: BatchResult) -> None:
+        with self._lock:
+            if result.error is None:
+                self.latencies.append(result.latency)
+            else:
+                self.failed += 1
+
+    @property
+    def completed(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def throughput(self) -> float:
+        """Completed prompts per second"""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput(),
+            "p50": percentile(self.latencies, 50),
+            "p90": percentile(self.latencies, 90),
+            "p99": percentile(self.latencies, 99),
+        }
+
+    def summary(self) -> str:
+        stats = self.to_dict()
+        return (
+            f"{stats['completed']} generated, {stats['failed']} failed in "
+            f"{stats['elapsed']:.1f}s ({stats['throughput']:.2f} prompts/s), latency "
+            f"p50 {stats['p50']:.2f}s p90 {stats['p90']:.2f}s p99 {stats['p99']:.2f}s"
+        )
+
+
+class InvalidPrompt(ValueError):
+    """A prompts file line that could not be read, reported as a failed result"""
+
+    def __init__(self, number: int, line: str, reason: str) -> None:
+        super().__init__(f"line {number}: {reason}")
+        self.number = number
+        self.line = line
+
+
+def read_prompts(reader: TextIO) -> Iterator[Tuple[str, Union[str, InvalidPrompt]]]:
+    """Yield `(id, prompt)` pairs from plain text or JSONL, one prompt per line
+
+    JSON lines may carry an `id` next to the `prompt`; other lines get their line
+    number as ID. Blank lines and lines starting with `#` are skipped. A malformed
+    JSON line, or one without a `prompt`, yields an InvalidPrompt instead so the
+    rest of the batch still runs.
+    """
+    for number, line in enumerate(reader, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield str(number), InvalidPrompt(number, line, f"invalid JSON ({e})")
+                continue
+            if not isinstance(item, dict) or not isinstance(item.get("prompt"), str):
+                yield str(number), InvalidPrompt(number, line, 'no "prompt" string')
+                continue
+            yield str(item.get("id", number)), item["prompt"]
+        else:
+            yield str(number), line
+
+
+def generate_batch(
+    prompts: Iterable[Tuple[str, str]],
+    model_option: str,
+    client=None,
+    workers: int = DEFAULT_WORKERS,
+    on_result: Optional[Callable[[BatchResult], None]] = None,
+) -> BatchReport:
+    """Generate a response for every prompt with a bounded pool of workers
+    @parameter prompts : Iterable[tuple] - `(id, prompt)` pairs, consumed lazily; an InvalidPrompt fails without a request
+    @parameter model_option : str - Model name, as in the app's model selectbox
+    @parameter client : OpenAI | Router - Optional client or router, the local server by default
+    @parameter workers : int - Number of prompts in flight at once
+    @parameter on_result : Callable - Called with each result as soon as it finishes
+    @returns BatchReport - Throughput and latency percentiles
+    """
+    report = BatchReport()
+    # Keep at most two prompts per worker read ahead of the pool
+    pending = threading.BoundedSemaphore(2 * workers)
+    callback_lock = threading.Lock()
+
+    def run(index: int, id: str, prompt: str) -> BatchResult:
+        started = time.monotonic()
+        try:
+            _, content = get_openai_response_by_model(prompt, model_option, client)
+            result = BatchResult(index, id, prompt, content, time.monotonic() - started)
+        except Exception as e:
+            result = BatchResult(
+                index, id, prompt, None, time.monotonic() - started, error=str(e)
+            )
+        report.add(result)
+        if on_result is not None:
+            with callback_lock:
+                on_result(result)
+        return result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for index, (id, prompt) in enumerate(prompts):
+            if isinstance(prompt, InvalidPrompt):
+                result = BatchResult(
+                    index, id, prompt.line, None, 0.0, error=str(prompt)
+                )
+                report.add(result)
+                if on_result is not None:
+                    with callback_lock:
+                        on_result(result)
+                continue
+            pending.acquire()
+            future = pool.submit(run, index, id, prompt)
+            future.add_done_callback(lambda _: pending.release())
+    report.finished = time.monotonic()
+    return report
+
+
+def slug(text: str, max_length: int = 40) -> str:
+    return _SLUG.sub("-", text.lower()).strip("-")[:max_length] or "prompt"
+
+
+def dockerfile_name(id: str) -> str:
+    """Readable, unique file name for a prompt id
+    @parameter id : str - Prompt id
+    @returns str - Slug of the id plus a short hash, so ids sharing a slug get their own file
+    """
+    digest = hashlib.sha1(id.encode("utf-8")).hexdigest()[:8]
+    return f"{slug(id)}-{digest}.Dockerfile"
+
+
+def write_dockerfile(output_dir: str, result: BatchResult) -> str:
+    """Write the Dockerfile of a result, or its full answer if it has none
+    @parameter output_dir : str - Directory receiving one file per prompt
+    @parameter result : BatchResult - Successful result
+    @returns str - Path of the written file
+    """
+    path = os.path.join(output_dir, dockerfile_name(result.id))
+    with open(path, "w") as writer:
+        writer.write((result.dockerfile or result.content or "") + "\n")
+    return path
+
+
+def main(
+    prompts_file: str = "-",
+    model: str = "lmstudio-ai/gemma-2b-it-GGUF",
+    workers: int = DEFAULT_WORKERS,
+    output_dir: Optional[str] = None,
+    jsonl: Optional[str] = None,
+    backends: Optional[str] = None,
+) -> None:
+    msg.divider("Generating Dockerfiles")
+    # Without a registry, go straight to the local server like the app used to
+    client = Router.from_file(backends) if backends else None
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    reader = sys.stdin if prompts_file == "-" else open(prompts_file, "r")
+    writer = open(jsonl, "w") if jsonl is not None else None
+
+    def on_result(result: BatchResult) -> None:
+        if result.error is not None:
+            msg.fail(f"{result.id}: {result.error}")
+        elif output_dir is not None:
+            msg.good(f"{result.id}: {write_dockerfile(output_dir, result)}")
+        if writer is not None:
+            writer.write(json.dumps(result.to_dict()) + "\n")
+            writer.flush()
+
+    try:
+        report = generate_batch(
+            read_prompts(reader), model, client, workers=workers, on_result=on_result
+        )
+    finally:
+        if reader is not sys.stdin:
+            reader.close()
+        if writer is not None:
+            writer.close()
+    msg.info(report.summary())
+    if report.failed:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
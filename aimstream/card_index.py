@@ -0,0 +1,276 @@
+import difflib
+import json
+import mmap
+import os
+import re
+import struct
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CUTOFF = 0.75
+# Trigram candidates re-scored with difflib before picking the best match
+CANDIDATES = 10
+_MAGIC = b"AIMCARD1"
+_HEADER = struct.Struct("<8sQ")
+_ALIGN = 8
+_QUOTES = re.compile(r"[\"'‘’“”]")
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_FACES = " // "
+
+
+def normalize_name(name: str) -> str:
+    """Key a card name the way people misspell it: no accents, case, quotes or punctuation"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _PUNCTUATION.sub(" ", _QUOTES.sub("", name.casefold()))
+    return " ".join(name.split())
+
+
+def trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return sorted({padded[i : i + 3] for i in range(len(padded) - 2)})
+
+
+def _hash(text: str) -> int:
+    # Stable across processes, unlike hash(), so it can be persisted
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _key_hash(key: str) -> int:
+    return (_hash(key) << 32) | _hash(key[::-1])
+
+
+def _pack(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+class CardIndex:
+    """In-process index of card names for exact, normalized and fuzzy lookups
+
+    Names are keyed by `normalize_name`; exact lookups binary-search a sorted
+    array of key hashes and fuzzy lookups rank names by shared trigrams through
+    an inverted index, then re-score the best few with difflib. All of it lives
+    in flat numpy arrays that `save` writes to one file and `load` maps back
+    without copying, so processes sharing an index share its pages.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], buffer=None) -> None:
+        self._arrays = arrays
+        self._buffer = buffer
+        self.name_offsets = arrays["name_offsets"]
+        self.key_offsets = arrays["key_offsets"]
+        self.key_hashes = arrays["key_hashes"]
+        self.key_ids = arrays["key_ids"]
+        self.gram_hashes = arrays["gram_hashes"]
+        self.gram_offsets = arrays["gram_offsets"]
+        self.postings = arrays["postings"]
+        self.gram_counts = arrays["gram_counts"]
+
+    @classmethod
+    def build(cls, names: Iterable[str]) -> "CardIndex":
+        """Index `names`, e.g. the card list in data/all_cards.json
+        @parameter names : Iterable[str] - Card names; later duplicates of a key are dropped
+        @returns CardIndex - The index
+        """
+        unique: List[str] = []
+        keys: List[str] = []
+        exact: Dict[int, int] = {}
+        for name in names:
+            key = normalize_name(name)
+            if not key or _key_hash(key) in exact:
+                continue
+            exact[_key_hash(key)] = len(unique)
+            unique.append(name)
+            keys.append(key)
+        # Double-faced cards are also found by either face, unless a card has its name
+        for id, name in enumerate(unique):
+            if _FACES in name:
+                for face in name.split(_FACES):
+                    exact.setdefault(_key_hash(normalize_name(face)), id)
+
+        postings: Dict[int, List[int]] = {}
+        gram_counts = np.zeros(len(keys), dtype=np.uint16)
+        for id, key in enumerate(keys):
+            grams = trigrams(key)
+            gram_counts[id] = len(grams)
+            for gram in grams:
+                postings.setdefault(_hash(gram), []).append(id)
+        gram_hashes = np.array(sorted(postings), dtype=np.uint32)
+        lists = [postings[int(h)] for h in gram_hashes]
+        gram_offsets = np.zeros(len(lists) + 1, dtype=np.uint32)
+        np.cumsum([len(ids) for ids in lists], out=gram_offsets[1:])
+
+        key_hashes = np.array(sorted(exact), dtype=np.uint64)
+        name_offsets, name_bytes = _pack(unique)
+        key_offsets, key_bytes = _pack(keys)
+        return cls(
+            {
+                "names": name_bytes,
+                "name_offsets": name_offsets,
+                "keys": key_bytes,
+                "key_offsets": key_offsets,
+                "key_hashes": key_hashes,
+                "key_ids": np.array(
+                    [exact[int(h)] for h in key_hashes], dtype=np.uint32
+                ),
+                "gram_hashes": gram_hashes,
+                "gram_offsets": gram_offsets,
+                "postings": np.array(
+                    [id for ids in lists for id in ids], dtype=np.uint32
+                ),
+                "gram_counts": gram_counts,
+            }
+        )
+
+    def save(self, path: str) -> None:
+        """Write the index to one file: a JSON table of contents, then the raw arrays"""
+        contents = {}
+        position = 0
+        for name, array in self._arrays.items():
+            contents[name] = [position, array.dtype.str, len(array)]
+            position += -(-array.nbytes // _ALIGN) * _ALIGN
+        header = json.dumps(contents).encode("utf-8")
+        header += b" " * (-(_HEADER.size + len(header)) % _ALIGN)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as writer:
+            writer.write(_HEADER.pack(_MAGIC, len(header)))
+            writer.write(header)
+            for array in self._arrays.values():
+                data = np.ascontiguousarray(array).tobytes()
+                writer.write(data + b"\0" * (-len(data) % _ALIGN))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CardIndex":
+        """Map an index written by `save` into memory without reading it"""
+        with open(path, "rb") as reader:
+            buffer = mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a card index")
+        start = _HEADER.size + length
+        contents = json.loads(buffer[_HEADER.size : start])
+        arrays = {
+            name: np.frombuffer(
+                buffer, dtype=np.dtype(dtype), count=count, offset=start + offset
+            )
+            for name, (offset, dtype, count) in contents.items()
+        }
+        return cls(arrays, buffer)
+
+    @classmethod
+    def open(cls, path: str, names_file: str) -> "CardIndex":
+        """Load the index at `path`, rebuilding it first if `names_file` is newer
+        @parameter path : str - Index file, e.g. data/card_index.bin
+        @parameter names_file : str - JSON file whose `data` lists the card names
+        @returns CardIndex - The memory-mapped index
+        """
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(
+            names_file
+        ):
+            with open(names_file, "r") as reader:
+                cls.build(json.load(reader)["data"]).save(path)
+        return cls.load(path)
+
+    def __len__(self) -> int:
+        return len(self.name_offsets) - 1
+
+    def __contains__(self, name: str) -> bool:
+        return self.exact(name) is not None
+
+    def name(self, id: int) -> str:
+        start, end = self.name_offsets[id], self.name_offsets[id + 1]
+        return self._arrays["names"][start:end].tobytes().decode("utf-8")
+
+    def _key(self, id: int) -> str:
+        start, end = self.key_offsets[id], self.key_offsets[id + 1]
+        return self._arrays["keys"][start:end].tobytes().decode("utf-8")
+
+    def _exact_id(self, key: str) -> Optional[int]:
+        target = np.uint64(_key_hash(key))
+        position = int(np.searchsorted(self.key_hashes, target))
+        if position < len(self.key_hashes) and self.key_hashes[position] == target:
+            return int(self.key_ids[position])
+        return None
+
+    def exact(self, name: str) -> Optional[str]:
+        """The indexed spelling of `name`, ignoring case, accents and punctuation"""
+        id = self._exact_id(normalize_name(name))
+        return self.name(id) if id is not None else None
+
+    def search(
+        self, name: str, limit: int = 5, cutoff: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """Closest indexed names to `name`
+        @parameter name : str - Possibly misspelled card name
+        @parameter limit : int - Maximum number of matches
+        @parameter cutoff : float - Minimum similarity in [0, 1]
+        @returns List[tuple] - `(name, similarity)` pairs, best first
+        """
+        key = normalize_name(name)
+        if not key:
+            return []
+        id = self._exact_id(key)
+        if id is not None and limit == 1:
+            return [(self.name(id), 1.0)]
+        grams = np.array([_hash(g) for g in trigrams(key)], dtype=np.uint32)
+        positions = np.searchsorted(self.gram_hashes, grams)
+        known = positions < len(self.gram_hashes)
+        positions, grams = positions[known], grams[known]
+        positions = positions[self.gram_hashes[positions] == grams]
+        if not len(positions):
+            return [(self.name(id), 1.0)] if id is not None else []
+        hits = np.concatenate(
+            [
+                self.postings[self.gram_offsets[p] : self.gram_offsets[p + 1]]
+                for p in positions
+            ]
+        )
+        ids, shared = np.unique(hits, return_counts=True)
+        # Dice coefficient of the trigram sets ranks candidates cheaply
+        dice = 2.0 * shared / (self.gram_counts[ids] + len(grams))
+        count = min(max(CANDIDATES, limit), len(ids))
+        candidates = ids[np.argpartition(-dice, count - 1)[:count]]
+        matcher = difflib.SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(key)
+        matches = [] if id is None else [(self.name(id), 1.0)]
+        for candidate in candidates:
+            if candidate == id:
+                continue
+            matcher.set_seq1(self._key(int(candidate)))
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            score = matcher.ratio()
+            if score >= cutoff:
+                matches.append((self.name(int(candidate)), score))
+        matches.sort(key=lambda match: -match[1])
+        return matches[:limit]
+
+    def resolve(self, name: str, cutoff: float = DEFAULT_CUTOFF) -> Optional[str]:
+        """The card `name` refers to: an exact match, else the best fuzzy one above `cutoff`"""
+        exact = self.exact(name)
+        if exact is not None:
+            return exact
+        matches = self.search(name, limit=1, cutoff=cutoff)
+        return matches[0][0] if matches else None
+
+    def dedupe(self, names: Iterable[str]) -> List[str]:
+        """Indexed spellings of `names` without repeats, in first-seen order
+
+        Names that are not in the index are kept as given, deduplicated by key.
+        """
+        seen = set()
+        unique = []
+        for name in names:
+            key = normalize_name(name)
+            id = self._exact_id(key)
+            if (key if id is None else id) not in seen:
+                seen.add(key if id is None else id)
+                unique.append(name if id is None else self.name(id))
+        return unique
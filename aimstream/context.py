@@ -0,0 +1,170 @@
+import functools
+import re
+from typing import Callable, List, Optional
+
+from .dockerfile import extract_dockerfile
+from .llm import model_system_request
+
+DEFAULT_BUDGET = 2048
+# Once the history overflows, trim it down to this share of the budget so the
+# kept turns, and the prompt prefix they form, stay stable for several requests
+TRIM_TARGET = 0.6
+SUMMARY_PROMPT_CHARS = 120
+# Share of the budget the summary of trimmed turns may take
+SUMMARY_SHARE = 0.25
+# Share of the budget retrieved references may take; larger ones are left out
+REFERENCE_SHARE = 0.4
+MESSAGE_OVERHEAD_TOKENS = 4
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@functools.lru_cache(maxsize=None)
+def _tiktoken_encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The encoding is downloaded on first use; fall back when offline
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when installed, else estimate them locally
+
+    The estimate counts words and punctuation marks, which tracks the BPE
+    tokenizers of the local models closely enough for budgeting.
+    """
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def message_tokens(
+    message: dict, tokenizer: Callable[[str], int] = count_tokens
+) -> int:
+    return tokenizer(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize_turns(messages: List[dict]) -> str:
+    """Extractive summary of dropped turns: the user requests, shortened"""
+    requests = []
+    for message in messages:
+        if message["role"] != "user":
+            continue
+        content = " ".join(message["content"].split())
+        if len(content) > SUMMARY_PROMPT_CHARS:
+            content = content[: SUMMARY_PROMPT_CHARS - 3] + "..."
+        requests.append(f"- {content}")
+    if not requests:
+        return ""
+    return "Earlier in this conversation the user asked for:\n" + "\n".join(requests)
+
+
+class ContextBuilder:
+    """Assembles chat messages for a request from the conversation within a token budget
+
+    The messages are laid out as: system prompt, summary of trimmed turns, the
+    latest generated Dockerfile if it was trimmed, the kept turns, references
+    retrieved for this prompt, and the new prompt. The system prompt never
+    changes and kept turns are only dropped in chunks, so consecutive requests
+    share a long prefix that servers with prefix/KV caching can reuse.
+    """
+
+    def __init__(
+        self,
+        budget: int = DEFAULT_BUDGET,
+        system_prompt: str = model_system_request,
+        tokenizer: Callable[[str], int] = count_tokens,
+        summarize: Optional[Callable[[List[dict]], str]] = summarize_turns,
+    ) -> None:
+        self.budget = budget
+        self.system_prompt = system_prompt
+        self.tokenizer = tokenizer
+        self.summarize = summarize
+        # Position of the first kept turn; only ever moves forward, keeping the prefix
+        self._first = 0
+
+    def _tokens(self, messages: List[dict]) -> int:
+        return sum(message_tokens(m, self.tokenizer) for m in messages)
+
+    def _fit_summary(self, summary: str) -> str:
+        """Drop the oldest lines of a summary until it fits its share of the budget"""
+        limit = int(self.budget * SUMMARY_SHARE)
+        header, *lines = summary.split("\n")
+        while lines and self.tokenizer("\n".join([header, *lines])) > limit:
+            lines.pop(0)
+        return "\n".join([header, *lines]) if lines else ""
+
+    def _preamble(self, dropped: List[dict], kept: List[dict]) -> List[dict]:
+        preamble = [{"role": "system", "content": self.system_prompt}]
+        if dropped and self.summarize is not None:
+            summary = self._fit_summary(self.summarize(dropped))
+            if summary:
+                preamble.append({"role": "system", "content": summary})
+        # Pin the latest Dockerfile when its turn was trimmed
+        if not any(
+            extract_dockerfile(m["content"]) for m in kept if m["role"] == "assistant"
+        ):
+            for message in reversed(dropped):
+                dockerfile = message["role"] == "assistant" and extract_dockerfile(
+                    message["content"]
+                )
+                if dockerfile:
+                    preamble.append(
+                        {
+                            "role": "system",
+                            "content": f"The current Dockerfile is:\n```dockerfile\n{dockerfile}\n```",
+                        }
+                    )
+                    break
+        return preamble
+
+    def build(
+        self, history: List[dict], prompt: str, references: str = ""
+    ) -> List[dict]:
+        """Chat messages for `prompt` following the turns in `history`
+        @parameter history : List[dict] - Earlier messages, oldest first, e.g. the latest of a History
+        @parameter prompt : str - New user prompt
+        @parameter references : str - Optional examples for this prompt, e.g. retrieved Dockerfiles
+        @returns List[dict] - Messages for the chat completions API
+        """
+        turns, positions = [], []
+        for i, m in enumerate(history):
+            # Skip greetings and other answers that precede the first request
+            if not turns and m["role"] != "user":
+                continue
+            if m["role"] in ("user", "assistant") and m["content"]:
+                turns.append({"role": m["role"], "content": m["content"]})
+                positions.append(m.get("seq", i))
+        question = [{"role": "user", "content": prompt}]
+        if references and self.tokenizer(references) <= self.budget * REFERENCE_SHARE:
+            # After the kept turns, so changing references never break the prefix
+            question.insert(0, {"role": "system", "content": references})
+        start = next(
+            (i for i, position in enumerate(positions) if position >= self._first),
+            len(turns),
+        )
+
+        def fits(start: int, limit: int) -> bool:
+            messages = self._preamble(turns[:start], turns[start:])
+            return self._tokens(messages + turns[start:] + question) <= limit
+
+        if not fits(start, self.budget):
+            target = int(self.budget * TRIM_TARGET)
+            while start < len(turns) and not fits(start, target):
+                start += 1
+            # Never start the kept turns with an answer to a dropped question
+            while start < len(turns) and turns[start]["role"] != "user":
+                start += 1
+            if start < len(turns):
+                self._first = positions[start]
+            elif turns:
+                self._first = positions[-1] + 1
+        return self._preamble(turns[:start], turns[start:]) + turns[start:] + question
+
+    def prompt_tokens(self, messages: List[dict]) -> int:
+        return self._tokens(messages)
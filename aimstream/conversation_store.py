@@ -0,0 +1,248 @@
+import abc
+import collections
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MAX_CONVERSATIONS = 1000
+DEFAULT_MAX_MESSAGES = 500
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+# Bound on the content held by the whole in-memory store, across conversations
+DEFAULT_MAX_TOTAL_BYTES = 256 * 1024 * 1024
+# Rough per-message overhead of the dict and its small fields
+MESSAGE_OVERHEAD = 256
+
+# (seq, role, version) of one stored message; version is None for user messages
+IndexEntry = Tuple[int, str, Optional[int]]
+
+
+def message_size(message: dict) -> int:
+    """Approximate memory held by a message, dominated by its text and images"""
+    images = message.get("images") or []
+    return (
+        MESSAGE_OVERHEAD
+        + len(message.get("content") or "")
+        + sum(len(str(image)) for image in images)
+    )
+
+
+class ConversationStore(abc.ABC):
+    """Where the messages of every conversation live
+
+    `History` keeps only the recent turns of a session in memory and reads older
+    ones back from its store on demand. Messages are addressed by their sequence
+    number within the conversation.
+    """
+
+    @abc.abstractmethod
+    def append(self, conversation_id: str, message: dict) -> None:
+        ...
+
+    @abc.abstractmethod
+    def get(self, conversation_id: str, seqs: List[int]) -> Dict[int, dict]:
+        """Stored messages among `seqs`; evicted ones are left out"""
+
+    @abc.abstractmethod
+    def index(self, conversation_id: str) -> List[IndexEntry]:
+        """Compact index of the stored messages, oldest first"""
+
+    @abc.abstractmethod
+    def delete(self, conversation_id: str) -> None:
+        ...
+
+    def first_seq(self, conversation_id: str) -> Optional[int]:
+        """Sequence number of the oldest stored message, None when nothing is stored"""
+        index = self.index(conversation_id)
+        return index[0][0] if index else None
+
+
+class _Conversation:
+    def __init__(self) -> None:
+        self.messages: "collections.OrderedDict[int, dict]" = collections.OrderedDict()
+        self.bytes = 0
+
+
+class MemoryStore(ConversationStore):
+    """In-process store bounded per conversation and as a whole
+
+    A conversation keeps at most `max_messages` messages and about `max_bytes` of
+    content, dropping its oldest messages first. Beyond `max_conversations`, or
+    once all conversations together hold more than `max_total_bytes`, the least
+    recently used conversations are dropped whole.
+    """
+
+    def __init__(
+        self,
+        max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+    ) -> None:
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.evictions = 0
+        self.dropped_conversations = 0
+        self._bytes = 0
+        self._conversations: "collections.OrderedDict[str, _Conversation]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _touch(self, conversation_id: str) -> Optional[_Conversation]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None:
+            self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def append(self, conversation_id: str, message: dict) -> None:
+        with self._lock:
+            conversation = self._touch(conversation_id)
+            if conversation is None:
+                conversation = self._conversations[conversation_id] = _Conversation()
+            replaced = conversation.messages.get(message["seq"])
+            if replaced is not None:
+                conversation.bytes -= message_size(replaced)
+                self._bytes -= message_size(replaced)
+            conversation.messages[message["seq"]] = message
+            conversation.bytes += message_size(message)
+            self._bytes += message_size(message)
+            while len(conversation.messages) > 1 and (
+                len(conversation.messages) > self.max_messages
+                or conversation.bytes > self.max_bytes
+            ):
+                _, evicted = conversation.messages.popitem(last=False)
+                conversation.bytes -= message_size(evicted)
+                self._bytes -= message_size(evicted)
+                self.evictions += 1
+            # The conversation just written to is the most recent; it is never dropped here
+            while len(self._conversations) > 1 and (
+                len(self._conversations) > self.max_conversations
+                or self._bytes > self.max_total_bytes
+            ):
+                _, dropped = self._conversations.popitem(last=False)
+                self._bytes -= dropped.bytes
+                self.dropped_conversations += 1
+
+    def get(self, conversation_id: str, seqs: List[int]) -> Dict[int, dict]:
+        with self._lock:
+            conversation = self._touch(conversation_id)
+            if conversation is None:
+                return {}
+            return {
+                seq: conversation.messages[seq]
+                for seq in seqs
+                if seq in conversation.messages
+            }
+
+    def index(self, conversation_id: str) -> List[IndexEntry]:
+        with self._lock:
+            conversation = self._touch(conversation_id)
+            if conversation is None:
+                return []
+            return [
+                (seq, message["role"], message.get("version"))
+                for seq, message in conversation.messages.items()
+            ]
+
+    def first_seq(self, conversation_id: str) -> Optional[int]:
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None or not conversation.messages:
+                return None
+            return next(iter(conversation.messages))
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock:
+            conversation = self._conversations.pop(conversation_id, None)
+            if conversation is not None:
+                self._bytes -= conversation.bytes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "conversations": len(self._conversations),
+                "messages": sum(len(c.messages) for c in self._conversations.values()),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "dropped_conversations": self.dropped_conversations,
+            }
+
+
+class SQLiteStore(ConversationStore):
+    """On-disk store, so conversations survive restarts without holding memory"""
+
+    def __init__(self, path: str, max_messages: Optional[int] = None) -> None:
+        self.path = path
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "conversation TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+            "version INTEGER, message TEXT NOT NULL, "
+            "PRIMARY KEY (conversation, seq))"
+        )
+        self._db.commit()
+
+    def append(self, conversation_id: str, message: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO messages "
+                "(conversation, seq, role, version, message) VALUES (?, ?, ?, ?, ?)",
+                (
+                    conversation_id,
+                    message["seq"],
+                    message["role"],
+                    message.get("version"),
+                    json.dumps(message, default=str),
+                ),
+            )
+            if self.max_messages is not None:
+                self._db.execute(
+                    "DELETE FROM messages WHERE conversation = ? AND seq <= ?",
+                    (conversation_id, message["seq"] - self.max_messages),
+                )
+            self._db.commit()
+
+    def get(self, conversation_id: str, seqs: List[int]) -> Dict[int, dict]:
+        if not seqs:
+            return {}
+        placeholders = ",".join("?" * len(seqs))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, message FROM messages "
+                f"WHERE conversation = ? AND seq IN ({placeholders})",
+                (conversation_id, *seqs),
+            ).fetchall()
+        return {seq: json.loads(message) for seq, message in rows}
+
+    def index(self, conversation_id: str) -> List[IndexEntry]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, role, version FROM messages "
+                "WHERE conversation = ? ORDER BY seq",
+                (conversation_id,),
+            ).fetchall()
+
+    def first_seq(self, conversation_id: str) -> Optional[int]:
+        with self._lock:
+            (seq,) = self._db.execute(
+                "SELECT MIN(seq) FROM messages WHERE conversation = ?",
+                (conversation_id,),
+            ).fetchone()
+            return seq
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM messages WHERE conversation = ?", (conversation_id,)
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
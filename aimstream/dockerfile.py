@@ -0,0 +1,365 @@
+import re
+from typing import Iterable, Iterator, List, Optional
+
+DOCKER_LANGUAGES = ("dockerfile", "docker", "")
+MAX_LAYERS = 15
+MAX_CONSECUTIVE_RUNS = 3
+WARNING = "warning"
+INFO = "info"
+
+_FENCE = re.compile(r"^\s*```\s*([\w+-]*)\s*$")
+_FROM_LINE = re.compile(r"^\s*FROM\s+\S+", re.M | re.I)
+_INSTRUCTION = re.compile(r"^\s*([A-Za-z]+)(?:\s+(.*))?$", re.S)
+_DEPENDENCY_INSTALL = re.compile(
+    r"\b(apt-get\s+install|apt\s+install|apk\s+add|yum\s+install|dnf\s+install|"
+    r"pip3?\s+install|npm\s+(?:install|ci)|go\s+mod\s+download|"
+    # `yarn` alone installs, but `yarn build` and other scripts do not
+    r"yarn(?:\s+install)?(?:\s+--[\w-]+(?:=\S+)?)*\s*(?:$|&&|;|\|)|"
+    r"bundle\s+install|composer\s+install|mvn\s+[\w:-]*dependency)",
+    re.I,
+)
+_COPY_ALL = re.compile(r"^(?:--\S+\s+)*\.\s+\S+\s*$")
+_LAYER_INSTRUCTIONS = ("RUN", "COPY", "ADD")
+
+
+class Instruction:
+    """One Dockerfile instruction, with continuation lines joined"""
+
+    def __init__(self, keyword: str, arguments: str, line: int) -> None:
+        self.keyword = keyword
+        self.arguments = arguments
+        self.line = line
+
+    def __repr__(self) -> str:
+        return f"Instruction({self.keyword!r}, {self.arguments!r}, line={self.line})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Instruction) and (
+            self.keyword,
+            self.arguments,
+            self.line,
+        ) == (other.keyword, other.arguments, other.line)
+
+    def to_dict(self) -> dict:
+        return {"keyword": self.keyword, "arguments": self.arguments, "line": self.line}
+
+
+class Issue:
+    """A build-performance problem found by the linter"""
+
+    def __init__(self, rule: str, severity: str, line: int, message: str) -> None:
+        self.rule = rule
+        self.severity = severity
+        self.line = line
+        self.message = message
+
+    def __repr__(self) -> str:
+        return f"Issue({self.rule!r}, line={self.line})"
+
+    def to_dict(self) -> dict:
+        return {
+            "rule": self.rule,
+            "severity": self.severity,
+            "line": self.line,
+            "message": self.message,
+        }
+
+
+class DockerfileResult:
+    """Structured view of the Dockerfile in a generated answer"""
+
+    def __init__(
+        self, text: str, instructions: List[Instruction], issues: List[Issue]
+    ) -> None:
+        self.text = text
+        self.instructions = instructions
+        self.issues = issues
+
+    @property
+    def stages(self) -> int:
+        return sum(1 for i in self.instructions if i.keyword == "FROM")
+
+    @property
+    def layers(self) -> int:
+        """Layer-creating instructions in the final stage"""
+        return len(
+            [
+                i
+                for i in final_stage(self.instructions)
+                if i.keyword in _LAYER_INSTRUCTIONS
+            ]
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "dockerfile": self.text,
+            "stages": self.stages,
+            "layers": self.layers,
+            "instructions": [i.to_dict() for i in self.instructions],
+            "issues": [i.to_dict() for i in self.issues],
+        }
+
+
+class DockerfileExtractor:
+    """Finds the fenced Dockerfile in a completion while it streams
+
+    Feed it the streamed chunks; each line is looked at once, and `dockerfile` is
+    set as soon as the closing fence arrives, before the rest of the answer.
+    """
+
+    def __init__(self) -> None:
+        self.dockerfile: Optional[str] = None
+        self._text: List[str] = []
+        self._partial = ""
+        self._block: Optional[List[str]] = None
+        self._language = ""
+
+    @property
+    def done(self) -> bool:
+        return self.dockerfile is not None
+
+    def feed(self, chunk: str) -> None:
+        self._text.append(chunk)
+        if self.done:
+            return
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+            if self.done:
+                return
+
+    def _line(self, line: str) -> None:
+        fence = _FENCE.match(line)
+        if self._block is None:
+            if fence is not None:
+                self._block = []
+                self._language = fence.group(1).lower()
+            return
+        if fence is None or fence.group(1):
+            self._block.append(line)
+            return
+        block = "\n".join(self._block).strip()
+        self._block = None
+        if self._language in DOCKER_LANGUAGES and _FROM_LINE.search(block):
+            self.dockerfile = block
+
+    def close(self) -> Optional[str]:
+        """Finish the stream, falling back to an unfenced or unterminated Dockerfile"""
+        if not self.done:
+            if self._partial:
+                self._line(self._partial)
+                self._partial = ""
+            if self._block is not None and self._language in DOCKER_LANGUAGES:
+                block = "\n".join(self._block).strip()
+                if _FROM_LINE.search(block):
+                    self.dockerfile = block
+        if not self.done:
+            text = "".join(self._text).strip()
+            if "```" not in text and _FROM_LINE.search(text):
+                self.dockerfile = text
+        return self.dockerfile
+
+    def wrap(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Pass `chunks` through unchanged while feeding them to the extractor"""
+        for chunk in chunks:
+            self.feed(chunk)
+            yield chunk
+        self.close()
+
+
+def extract_dockerfile(content: str) -> Optional[str]:
+    """The Dockerfile in a complete answer, if it has one"""
+    extractor = DockerfileExtractor()
+    extractor.feed(content)
+    return extractor.close()
+
+
+def _instruction(parts: List[str], line: int) -> Optional[Instruction]:
+    match = _INSTRUCTION.match(" ".join(p for p in parts if p))
+    if match is None:
+        return None
+    return Instruction(match.group(1).upper(), (match.group(2) or "").strip(), line)
+
+
+def parse(text: str) -> List[Instruction]:
+    """Split a Dockerfile into instructions, joining `\\` continuations and dropping comments
+    @parameter text : str - Dockerfile text
+    @returns List[Instruction] - Instructions with upper-cased keywords and their first line
+    """
+    instructions: List[Optional[Instruction]] = []
+    parts: List[str] = []
+    start = 0
+    for number, line in enumerate(text.splitlines(), start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            # Comments and blank lines may sit inside a continued instruction
+            continue
+        if not parts:
+            start = number
+        if stripped.endswith("\\"):
+            parts.append(stripped[:-1].strip())
+            continue
+        parts.append(stripped)
+        instructions.append(_instruction(parts, start))
+        parts = []
+    # A continuation left open on the last line
+    if parts:
+        instructions.append(_instruction(parts, start))
+    return [i for i in instructions if i is not None]
+
+
+def final_stage(instructions: List[Instruction]) -> List[Instruction]:
+    starts = [n for n, i in enumerate(instructions) if i.keyword == "FROM"]
+    return instructions[starts[-1] :] if starts else instructions
+
+
+def _stages(instructions: List[Instruction]) -> Iterator[List[Instruction]]:
+    stage: List[Instruction] = []
+    for instruction in instructions:
+        if instruction.keyword == "FROM" and stage:
+            yield stage
+            stage = []
+        stage.append(instruction)
+    if stage:
+        yield stage
+
+
+def _image(arguments: str) -> str:
+    words = [w for w in arguments.split() if not w.startswith("--")]
+    return words[0] if words else ""
+
+
+def _lint_base_images(instructions: List[Instruction]) -> Iterator[Issue]:
+    stage_names = set()
+    for instruction in instructions:
+        if instruction.keyword != "FROM":
+            continue
+        words = instruction.arguments.split()
+        image = _image(instruction.arguments)
+        lowered = [w.lower() for w in words]
+        if "as" in lowered and lowered.index("as") + 1 < len(words):
+            stage_names.add(words[lowered.index("as") + 1].lower())
+        if image.lower() in stage_names or image == "scratch" or "$" in image:
+            continue
+        name = image.split("/")[-1]
+        if "@" in name:
+            continue
+        if ":" not in name:
+            yield Issue(
+                "DF001",
+                WARNING,
+                instruction.line,
+                f"Base image {image} is not pinned; add a version tag so builds are reproducible and cached",
+            )
+        elif name.endswith(":latest"):
+            yield Issue(
+                "DF001",
+                WARNING,
+                instruction.line,
+                f"Base image {image} uses the moving :latest tag; pin a version",
+            )
+
+
+def _lint_copy_order(stage: List[Instruction]) -> Iterator[Issue]:
+    copy_all = None
+    for instruction in stage:
+        if (
+            instruction.keyword in ("COPY", "ADD")
+            and copy_all is None
+            and _COPY_ALL.match(instruction.arguments)
+        ):
+            copy_all = instruction
+        elif (
+            instruction.keyword == "RUN"
+            and copy_all is not None
+            and _DEPENDENCY_INSTALL.search(instruction.arguments)
+        ):
+            yield Issue(
+                "DF002",
+                WARNING,
+                copy_all.line,
+                f"{copy_all.keyword} . before installing dependencies on line "
+                f"{instruction.line} invalidates the install layer on every source "
+                "change; copy the dependency manifests first",
+            )
+            return
+
+
+def _lint_package_caches(instructions: List[Instruction]) -> Iterator[Issue]:
+    for instruction in instructions:
+        if instruction.keyword != "RUN":
+            continue
+        command = instruction.arguments
+        if re.search(r"\bapk\s+add\b", command) and "--no-cache" not in command:
+            yield Issue(
+                "DF003",
+                INFO,
+                instruction.line,
+                "apk add without --no-cache keeps the package index in the layer",
+            )
+        if (
+            re.search(r"\bpip3?\s+install\b", command)
+            and "--no-cache-dir" not in command
+        ):
+            yield Issue(
+                "DF003",
+                INFO,
+                instruction.line,
+                "pip install without --no-cache-dir keeps downloaded wheels in the layer",
+            )
+        if (
+            re.search(r"\bapt(?:-get)?\s+install\b", command)
+            and "/var/lib/apt/lists" not in command
+        ):
+            yield Issue(
+                "DF003",
+                INFO,
+                instruction.line,
+                "apt-get install without removing /var/lib/apt/lists keeps the package index in the layer",
+            )
+
+
+def _lint_layers(stage: List[Instruction]) -> Iterator[Issue]:
+    layers = [i for i in stage if i.keyword in _LAYER_INSTRUCTIONS]
+    if len(layers) > MAX_LAYERS:
+        yield Issue(
+            "DF004",
+            WARNING,
+            layers[MAX_LAYERS].line,
+            f"{len(layers)} layers in one stage; merge steps or use a multi-stage build",
+        )
+    run = []
+    for instruction in stage + [Instruction("", "", 0)]:
+        if instruction.keyword == "RUN":
+            run.append(instruction)
+            continue
+        if len(run) >= MAX_CONSECUTIVE_RUNS:
+            yield Issue(
+                "DF004",
+                INFO,
+                run[0].line,
+                f"{len(run)} consecutive RUN instructions; chain them with && to save layers",
+            )
+        run = []
+
+
+def lint(instructions: List[Instruction]) -> List[Issue]:
+    """Check parsed instructions for build-performance problems
+    @parameter instructions : List[Instruction] - Output of `parse`
+    @returns List[Issue] - Issues ordered by line
+    """
+    issues = list(_lint_base_images(instructions))
+    issues.extend(_lint_package_caches(instructions))
+    for stage in _stages(instructions):
+        issues.extend(_lint_copy_order(stage))
+        issues.extend(_lint_layers(stage))
+    return sorted(issues, key=lambda issue: (issue.line, issue.rule))
+
+
+def analyze(dockerfile: Optional[str]) -> Optional[DockerfileResult]:
+    """Parse and lint an extracted Dockerfile"""
+    if dockerfile is None:
+        return None
+    instructions = parse(dockerfile)
+    return DockerfileResult(dockerfile, instructions, lint(instructions))
@@ -0,0 +1,261 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import metrics
+
+DEFAULT_BATCH_SIZE = 100
+# The model text2vec-openai uses for `"model": "ada", "modelVersion": "002"`
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+TEXT_TYPES = ("text", "text[]", "string", "string[]")
+# SQLite's default limit on host parameters in one statement
+_MAX_VARIABLES = 999
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+LOOKUPS = metrics.counter(
+    "aimstream_embedding_cache_lookups_total",
+    "Embedding cache lookups by outcome",
+    ("result",),
+)
+BATCH_SECONDS = metrics.histogram(
+    "aimstream_embedding_batch_seconds", "Latency of embedding calls"
+)
+BATCH_SIZE = metrics.histogram(
+    "aimstream_embedding_batch_size",
+    "Texts sent per embedding call",
+    buckets=metrics.SIZE_BUCKETS,
+)
+
+
+def vectorized_properties(class_obj: dict) -> List[Tuple[str, bool]]:
+    """Text properties the class's vectorizer embeds, as `(name, vectorizePropertyName)`
+    @parameter class_obj : dict - Class definition, e.g. data/weaviate_schema.json
+    @returns List[tuple] - Properties sorted by name, like the vectorizer reads them
+    """
+    module = class_obj.get("vectorizer", "none")
+    properties = []
+    for prop in class_obj["properties"]:
+        config = prop.get("moduleConfig", {}).get(module, {})
+        if config.get("skip", False) or prop["dataType"][0] not in TEXT_TYPES:
+            continue
+        properties.append((prop["name"], config.get("vectorizePropertyName", False)))
+    return sorted(properties)
+
+
+def vectorized_text(
+    obj: dict, properties: List[Tuple[str, bool]], class_name: str = ""
+) -> str:
+    """The text a text2vec module builds for `obj`: class name, then each property, lowercased"""
+    parts = [class_name] if class_name else []
+    for name, with_name in properties:
+        value = obj.get(name)
+        if isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        if not value:
+            continue
+        parts.append(f"{name} {value}" if with_name else str(value))
+    return " ".join(parts).lower()
+
+
+def content_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings on disk, keyed by content hash
+
+    Vectors are appended to one float32 matrix that is memory-mapped for
+    reads; a SQLite table maps each key to its row.
+    """
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._db.commit()
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE name = 'dimensions'"
+        ).fetchone()
+        self.dimensions: Optional[int] = int(row[0]) if row else None
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()
+            return count
+
+    def _rows(self) -> int:
+        if self.dimensions is None or not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // (4 * self.dimensions)
+
+    def _map(self) -> np.ndarray:
+        if self._matrix is None:
+            rows = self._rows()
+            self._matrix = (
+                np.memmap(
+                    self.path,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(rows, self.dimensions),
+                )
+                if rows
+                else np.zeros((0, self.dimensions or 0), dtype=np.float32)
+            )
+        return self._matrix
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors of `keys`; missing keys are left out
+        @parameter keys : Sequence[str] - Content keys
+        @returns Dict[str, np.ndarray] - Read-only float32 rows of the mapped matrix
+        """
+        with self._lock:
+            rows: Dict[str, int] = {}
+            for start in range(0, len(keys), _MAX_VARIABLES):
+                chunk = keys[start : start + _MAX_VARIABLES]
+                rows.update(
+                    self._db.execute(
+                        "SELECT key, row FROM vectors WHERE key IN "
+                        f"({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                )
+            if not rows:
+                return {}
+            matrix = self._map()
+            return {key: matrix[row] for key, row in rows.items()}
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """Append `vectors` to the matrix and index them under `keys`
+        @parameter keys : Sequence[str] - Content keys, one per row
+        @parameter vectors : np.ndarray - Matrix of shape (len(keys), dimensions)
+        @returns None
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+                self._db.execute(
+                    "INSERT INTO meta (name, value) VALUES ('dimensions', ?)",
+                    (str(self.dimensions),),
+                )
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Expected {self.dimensions}-dimensional vectors, got {vectors.shape[1]}"
+                )
+            start = self._rows()
+            # Rows are written before they are indexed, so a crash in between
+            # leaves unused rows rather than keys pointing past the end
+            with open(self.path, "ab") as writer:
+                writer.write(vectors.tobytes())
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (key, row) VALUES (?, ?)",
+                [(key, start + i) for i, key in enumerate(keys)],
+            )
+            self._db.commit()
+            self._matrix = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix = None
+            self._db.close()
+
+
+class EmbeddingStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.calls = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits} embeddings cached, {self.misses} computed "
+            f"in {self.calls} calls"
+        )
+
+
+class EmbeddingStage:
+    """Embeds texts in batches through a cache, so unchanged content is embedded once"""
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        cache: Optional[EmbeddingCache] = None,
+        model: str = "",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.embed_batch = embed_batch
+        self.cache = cache
+        self.model = model
+        self.batch_size = batch_size
+        self.stats = EmbeddingStats()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Vectors of `texts`, from the cache or computed `batch_size` at a time
+        @parameter texts : Sequence[str] - Texts to embed
+        @returns np.ndarray - float32 matrix with one row per text
+        """
+        keys = [content_key(self.model, text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        found = self.cache.get_many(unique) if self.cache is not None else {}
+        missing = [key for key in unique if key not in found]
+        self.stats.hits += len(unique) - len(missing)
+        self.stats.misses += len(missing)
+        LOOKUPS.labels("hit").inc(len(unique) - len(missing))
+        LOOKUPS.labels("miss").inc(len(missing))
+        if missing:
+            text_for = dict(zip(keys, texts))
+            for start in range(0, len(missing), self.batch_size):
+                chunk = missing[start : start + self.batch_size]
+                started = time.perf_counter()
+                vectors = np.asarray(
+                    self.embed_batch([text_for[key] for key in chunk]),
+                    dtype=np.float32,
+                )
+                BATCH_SECONDS.observe(time.perf_counter() - started)
+                BATCH_SIZE.observe(len(chunk))
+                self.stats.calls += 1
+                if self.cache is not None:
+                    self.cache.put_many(chunk, vectors)
+                found.update(zip(chunk, vectors))
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+
+class HashEmbedder:
+    """Deterministic local embedder for tests and offline runs
+
+    Words are hashed into signed buckets and the result is L2-normalized, so
+    texts sharing words get similar vectors without any model.
+    """
+
+    def __init__(self, dimensions: int = 256) -> None:
+        self.dimensions = dimensions
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in _WORD.findall(text.lower()):
+                digest = zlib.crc32(word.encode("utf-8"))
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[i, (digest >> 1) % self.dimensions] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms == 0, 1, norms)).tolist()
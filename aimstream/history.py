@@ -0,0 +1,146 @@
+import bisect
+import collections
+import functools
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from .conversation_store import ConversationStore, MemoryStore
+
+HISTORY_PAGE_SIZE = 10
+DEFAULT_RECENT_SIZE = 2 * HISTORY_PAGE_SIZE
+
+
+class History:
+    """Chat messages of one conversation, each with an ID assigned once at creation
+
+    Messages are written through to a `ConversationStore`; only the latest
+    `recent_size` stay in the session, and older ones are read back from the store
+    when a window reaches them. Assistant messages are indexed by sequence number
+    as they are added so the latest versions can be windowed without scanning the
+    whole history.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ConversationStore] = None,
+        conversation_id: Optional[str] = None,
+        recent_size: int = DEFAULT_RECENT_SIZE,
+    ) -> None:
+        self.store = store if store is not None else MemoryStore()
+        self.conversation_id = conversation_id or uuid.uuid4().hex
+        self.recent_size = recent_size
+        self._recent: "collections.OrderedDict[int, dict]" = collections.OrderedDict()
+        # Resume a stored conversation from its index alone
+        index = self.store.index(self.conversation_id)
+        self._count = index[-1][0] + 1 if index else 0
+        self._assistant = [seq for seq, role, _ in index if role == "assistant"]
+        versions = [version for _, _, version in index if version is not None]
+        self._next_version = max(versions) + 1 if versions else 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, role: str, content: str, **extra) -> dict:
+        """Append a message
+        @parameter role : str - "user" or "assistant"
+        @parameter content : str - Message text
+        @parameter extra : Any - Additional keys, e.g. images or stats
+        @returns dict - The stored message, with its `id`, `seq`, `version` and `created`
+        """
+        message = {
+            "id": uuid.uuid4().hex,
+            "seq": self._count,
+            "role": role,
+            "content": content,
+            "created": time.time(),
+            **extra,
+        }
+        if role == "assistant":
+            message["version"] = self._next_version
+            self._next_version += 1
+            self._assistant.append(message["seq"])
+        self._count += 1
+        self.store.append(self.conversation_id, message)
+        self._recent[message["seq"]] = message
+        while len(self._recent) > self.recent_size:
+            self._recent.popitem(last=False)
+        return message
+
+    def _load(self, seqs: List[int]) -> List[dict]:
+        missing = [seq for seq in seqs if seq not in self._recent]
+        loaded = self.store.get(self.conversation_id, missing) if missing else {}
+        messages = []
+        for seq in seqs:
+            message = self._recent.get(seq) or loaded.get(seq)
+            # Evicted from a bounded store
+            if message is not None:
+                messages.append(message)
+        return messages
+
+    def last(self, n: int) -> List[dict]:
+        if n <= 0:
+            return []
+        return self._load(list(range(max(self._count - n, 0), self._count)))
+
+    @property
+    def assistant_count(self) -> int:
+        """Assistant messages that can still be loaded, from the session or the store"""
+        first = self.store.first_seq(self.conversation_id)
+        if self._recent:
+            recent = next(iter(self._recent))
+            first = recent if first is None else min(first, recent)
+        if first is None:
+            self._assistant.clear()
+        else:
+            # Messages a bounded store evicted never come back
+            del self._assistant[: bisect.bisect_left(self._assistant, first)]
+        return len(self._assistant)
+
+    def assistant_window(self, limit: int) -> List[dict]:
+        """The latest `limit` assistant messages, oldest first"""
+        if limit <= 0:
+            return []
+        return self._load(self._assistant[-limit:])
+
+
+@functools.lru_cache(maxsize=1024)
+def _message_html(message_id: str, version: int, content: str) -> str:
+    return (
+        f"<p>Version {version} -- UUID: {message_id}</p>"
+        f"<div class='block assistant' style='background-color:black'>"
+        f"<strong>Assistant:</strong> {content}</div>"
+        "<div class='line'></div>"
+    )
+
+
+def message_html(message: dict) -> str:
+    """HTML block of an assistant message, built once per message"""
+    return _message_html(message["id"], message["version"], message["content"])
+
+
+def render_html(messages: List[dict]) -> str:
+    """One HTML document for a window of assistant messages"""
+    return (
+        "<div class='flowchart'>"
+        + "".join(message_html(message) for message in messages)
+        + "</div>"
+    )
+
+
+def window_size(
+    shown: int, total: int, page_size: int = HISTORY_PAGE_SIZE
+) -> Tuple[int, int]:
+    """Clamp the number of shown messages and count the hidden ones
+    @parameter shown : int - Requested number of messages to show
+    @parameter total : int - Number of assistant messages in the history
+    @parameter page_size : int - Minimum window
+    @returns tuple - Messages to show and messages left hidden
+    """
+    shown = min(max(shown, page_size), total)
+    return shown, total - shown
+
+
+def cache_info() -> Dict[str, int]:
+    info = _message_html.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
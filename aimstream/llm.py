@@ -0,0 +1,225 @@
+import functools
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import httpx
+from openai import OpenAI
+
+from . import metrics
+
+LOCAL_BASE_URL = "http://localhost:1234/v1"
+LOCAL_API_KEY = "lm-studio"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+EMBEDDING_MODEL = "nomic-ai/nomic-embed-text-v1.5-GGUF"
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_TIMEOUT = httpx.Timeout(300.0, connect=10.0)
+
+LLM_TIME_TO_FIRST_TOKEN = metrics.histogram(
+    "aimstream_llm_time_to_first_token_seconds",
+    "Time from sending a completion request to its first streamed token",
+    ("model",),
+)
+LLM_STREAM_SECONDS = metrics.histogram(
+    "aimstream_llm_stream_seconds",
+    "Duration of streamed completions by outcome",
+    ("model", "status"),
+)
+LLM_TOKENS = metrics.counter(
+    "aimstream_llm_tokens_total", "Streamed tokens, one per chunk", ("model",)
+)
+
+model_system_request = "From now on, act as a tech professional. Pay close attention to user questions. Provide outputs that users would regarding the input."
+
+
+class StreamStats:
+    """Timing of one streamed completion"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.tokens = 0
+
+    def record(self) -> None:
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.tokens += 1
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.first_token_at is None or self.finished_at is None:
+            return 0.0
+        elapsed = self.finished_at - self.first_token_at
+        return self.tokens / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "time_to_first_token": self.time_to_first_token,
+            "tokens": self.tokens,
+            "tokens_per_second": self.tokens_per_second,
+        }
+
+
+def create_client(
+    base_url: str = LOCAL_BASE_URL,
+    api_key: str = LOCAL_API_KEY,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+) -> OpenAI:
+    """Create a client for an OpenAI-compatible server backed by a keep-alive pool
+    @parameter base_url : str - Server URL, the local LM Studio server by default
+    @parameter api_key : str - API key expected by the server
+    @parameter max_connections : int - Size of the HTTP connection pool
+    @parameter timeout : httpx.Timeout - Connect and read timeouts of every request
+    @returns OpenAI - Client
+    """
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        timeout=timeout,
+    )
+    return OpenAI(
+        base_url=base_url, api_key=api_key, http_client=http_client, timeout=timeout
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def default_client() -> OpenAI:
+    """Process-wide client for the local server"""
+    return create_client()
+
+
+def build_messages(prompt: str, system_prompt: str = model_system_request) -> list:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def stream_completion(
+    client: OpenAI,
+    prompt: str,
+    model_option: str,
+    stats: Optional[StreamStats] = None,
+    temperature: float = 0.7,
+    messages: Optional[List[dict]] = None,
+) -> Iterator[str]:
+    """Yield the completion text chunk by chunk as the server generates it
+    @parameter client : OpenAI - Client for the model server
+    @parameter prompt : str - User prompt
+    @parameter model_option : str - Model name
+    @parameter stats : StreamStats - Optional, filled with time-to-first-token and token rate
+    @parameter temperature : float - Sampling temperature
+    @parameter messages : List[dict] - Optional, full chat messages built by a ContextBuilder
+    @returns Iterator[str] - Text deltas; each streamed chunk is counted as one token
+    """
+    stats = stats if stats is not None else StreamStats()
+    span = metrics.TRACER.start("llm.stream", model=model_option)
+    stream = None
+    status = "error"
+    try:
+        stream = client.chat.completions.create(
+            model=model_option,
+            messages=messages if messages is not None else build_messages(prompt),
+            temperature=temperature,
+            max_tokens=-1,
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                stats.record()
+                yield content
+        status = "ok"
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    finally:
+        stats.finished_at = time.perf_counter()
+        if stream is not None:
+            stream.close()
+        record_stream(model_option, stats, status, span)
+
+
+def record_stream(
+    model: str,
+    stats: StreamStats,
+    status: str,
+    span: Optional[metrics.Span] = None,
+) -> None:
+    """Feed one finished stream to the metrics and its trace span
+    @parameter model : str - Model name
+    @parameter stats : StreamStats - Timing of the stream
+    @parameter status : str - "ok", "error" or "cancelled"
+    @parameter span : Span - Optional, span started for the stream
+    @returns None
+    """
+    if metrics.REGISTRY.enabled:
+        if stats.time_to_first_token is not None:
+            LLM_TIME_TO_FIRST_TOKEN.labels(model).observe(stats.time_to_first_token)
+        LLM_STREAM_SECONDS.labels(model, status).observe(
+            stats.finished_at - stats.started
+        )
+        LLM_TOKENS.labels(model).inc(stats.tokens)
+    if span is not None:
+        span.set(status=status, **stats.to_dict())
+        metrics.TRACER.finish(span)
+
+
+def get_openai_response_by_model(
+    prompt: str,
+    model_option: str,
+    client=None,
+    messages: Optional[List[dict]] = None,
+) -> Tuple[str, str]:
+    """Generate a full response without streaming it to a UI
+    @parameter prompt : str - User prompt
+    @parameter model_option : str - Model name
+    @parameter client : OpenAI | Router - Optional client or router, the local server by default
+    @parameter messages : List[dict] - Optional, full chat messages including earlier turns
+    @returns tuple - Status message and the generated content
+    """
+    from .router import Router
+
+    if isinstance(client, Router):
+        chunks = client.stream(prompt, model_option, messages=messages)
+    else:
+        chunks = stream_completion(
+            client or default_client(), prompt, model_option, messages=messages
+        )
+    content = "".join(chunks)
+    return "DONE.", content
+
+
+def embed(client: OpenAI, text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """Embed `text` with the server's OpenAI-compatible embeddings endpoint
+    @parameter client : OpenAI - Client for the model server
+    @parameter text : str - Text to embed
+    @parameter model : str - Embedding model name
+    @returns list - Embedding vector
+    """
+    return client.embeddings.create(model=model, input=text).data[0].embedding
+
+
+def embed_batch(
+    client: OpenAI, texts: List[str], model: str = EMBEDDING_MODEL
+) -> List[List[float]]:
+    """Embed several texts with one request to the embeddings endpoint
+    @parameter client : OpenAI - Client for the model server
+    @parameter texts : List[str] - Texts to embed
+    @parameter model : str - Embedding model name
+    @returns List[list] - One embedding vector per text, in order
+    """
+    data = client.embeddings.create(model=model, input=texts).data
+    return [item.embedding for item in sorted(data, key=lambda item: item.index)]
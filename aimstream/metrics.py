@@ -0,0 +1,553 @@
+import abc
+import bisect
+import contextlib
+import contextvars
+import functools
+import http.server
+import json
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a cached lookup to a long local generation
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+DEFAULT_PORT = 9464
+DEFAULT_EXPORT_INTERVAL = 15.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("_registry", "_lock", "value")
+
+    def __init__(self, registry: "Registry") -> None:
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        if self._registry.enabled:
+            self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("_registry", "_lock", "buckets", "counts", "sum", "count")
+
+    def __init__(self, registry: "Registry", buckets: Tuple[float, ...]) -> None:
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        # One count per bucket plus +Inf, not cumulative until rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        if not self._registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Metric(abc.ABC):
+    """A named metric with one time series per combination of label values"""
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        ...
+
+    def labels(self, *values: str):
+        """The time series for `values`, one per label name, created on first use"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[str]:
+        ...
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild(self.registry)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._items():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild(self.registry)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.registry, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._items():
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket
+                labels = _format_labels(
+                    self.labelnames + ("le",), values + (_format_value(bound),)
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Callback(Metric):
+    """A counter or gauge read from `collect` when the metrics are rendered
+
+    Suits values other objects already track, e.g. `QueryCache.stats()`, so the
+    hot path pays nothing for them.
+    """
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]],
+        kind: str = "gauge",
+    ) -> None:
+        super().__init__(registry, name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def _new_child(self):
+        raise TypeError(f"{self.name} is read from its callback and has no labels()")
+
+    def samples(self) -> Iterator[str]:
+        for values, value in self.collect().items():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Registry:
+    """Every metric of the process, rendered in the Prometheus text format
+
+    While `enabled` is False, recording returns right after one attribute check,
+    so instrumented code can stay in place in production.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric, replace: bool = False) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not replace:
+                if type(existing) is not type(metric):
+                    raise ValueError(
+                        f"{metric.name} is already registered as a {existing.kind}"
+                    )
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]],
+        kind: str = "gauge",
+    ) -> Callback:
+        """Register a metric read from `collect`, replacing one of the same name
+        @parameter name : str - Metric name
+        @parameter documentation : str - HELP text
+        @parameter labelnames : Sequence[str] - Label names, in the order of the returned keys
+        @parameter collect : Callable - Returns a value per tuple of label values
+        @parameter kind : str - "gauge" or "counter"
+        @returns Callback - Registered metric
+        """
+        return self._register(
+            Callback(self, name, documentation, labelnames, collect, kind),
+            replace=True,
+        )
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A failing callback must not take the other metrics down with it
+                logger.warning("Metric %s failed: %s", metric.name, e)
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the rendered metrics to `path` atomically, e.g. for a textfile collector"""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as writer:
+            writer.write(self.render())
+        os.replace(temporary, path)
+
+
+class FileExporter:
+    """Writes a registry to a file every `interval` seconds and once more on close"""
+
+    def __init__(
+        self,
+        path: str,
+        registry: Optional[Registry] = None,
+        interval: float = DEFAULT_EXPORT_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.registry = registry or REGISTRY
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-export", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.registry.write(self.path)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.registry.write(self.path)
+
+
+def serve(
+    port: int = DEFAULT_PORT,
+    registry: Optional[Registry] = None,
+    host: str = "0.0.0.0",
+) -> http.server.ThreadingHTTPServer:
+    """Serve the metrics at `/metrics` on a daemon thread
+    @parameter port : int - Port to listen on, 0 picks a free one
+    @parameter registry : Registry - Registry to serve, the process-wide one by default
+    @parameter host : str - Interface to bind
+    @returns ThreadingHTTPServer - Running server, `shutdown()` stops it
+    """
+    registry = registry or REGISTRY
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    return server
+
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "aimstream_span", default=None
+)
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    """Appends finished spans as JSON lines to `path`; does nothing without one"""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def start(self, name: str, **attributes) -> Optional[Span]:
+        """Start a span under the current one, for work that outlives a `with` block"""
+        if self.path is None:
+            return None
+        return Span(name, _current_span.get(), attributes)
+
+    def finish(
+        self, span: Optional[Span], error: Optional[BaseException] = None
+    ) -> None:
+        if span is None or self.path is None:
+            return
+        span.duration = time.perf_counter() - span._started
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a") as writer:
+                writer.write(line + "\n")
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Time the block as a span; spans started inside it become its children"""
+        span = self.start(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span, error)
+
+
+REGISTRY = Registry(enabled=os.environ.get("AIMSTREAM_METRICS", "") not in ("", "0"))
+TRACER = Tracer(os.environ.get("AIMSTREAM_TRACE_FILE") or None)
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+span = TRACER.span
+
+
+def configure(enabled: Optional[bool] = None, trace_file: Optional[str] = None) -> None:
+    """Turn recording on or off and set where spans go, for the whole process
+    @parameter enabled : bool - Optional, whether metrics are recorded
+    @parameter trace_file : str - Optional, JSON lines file receiving finished spans
+    @returns None
+    """
+    if enabled is not None:
+        REGISTRY.enabled = enabled
+    if trace_file is not None:
+        TRACER.path = trace_file or None
+
+
+@functools.lru_cache(maxsize=None)
+def connection_timer(name: str = "weaviate") -> Callable[[str, float], None]:
+    """Hook recording Weaviate request latency, for `WeaviateConnection(on_timing=...)`
+
+    Passed to the constructor it also times the initial connect, which runs before
+    `instrument_connection` could set it. The same hook is returned for a name, so
+    `st.connection` sees the same arguments on every rerun.
+    @parameter name : str - Value of the `connection` label
+    @returns Callable - Called with an operation name and its duration in seconds
+    """
+    latency = histogram(
+        "aimstream_weaviate_request_seconds",
+        "Latency of Weaviate requests by operation",
+        ("connection", "operation"),
+    )
+    return lambda operation, seconds: latency.labels(name, operation).observe(seconds)
+
+
+def instrument_connection(connection, name: str = "weaviate") -> None:
+    """Record a WeaviateConnection's request latency and query cache counters
+
+    A connection without an `on_timing` hook gets `connection_timer(name)`, which
+    times its later requests and reconnects but not the connect already done.
+    @parameter connection : WeaviateConnection - Connection to instrument
+    @parameter name : str - Value of the `connection` label
+    @returns None
+    """
+    if connection.on_timing is None:
+        connection.on_timing = connection_timer(name)
+
+    def cache_counter(key: str):
+        return lambda: {(name,): connection.cache_stats()[key]}
+
+    for key in ("hits", "misses", "evictions"):
+        REGISTRY.callback(
+            f"aimstream_weaviate_query_cache_{key}_total",
+            f"Weaviate query cache {key}",
+            ("connection",),
+            cache_counter(key),
+            kind="counter",
+        )
+    REGISTRY.callback(
+        "aimstream_weaviate_query_cache_entries",
+        "Results held by the Weaviate query cache",
+        ("connection",),
+        cache_counter("entries"),
+    )
@@ -0,0 +1,276 @@
+import functools
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from . import metrics
+from .llm import model_system_request
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_THRESHOLD = 0.92
+SEMANTIC_CLASS = "AImStream_Response"
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS = metrics.counter(
+    "aimstream_response_cache_lookups_total",
+    "Response cache lookups by the layer that answered",
+    ("result",),
+)
+# Label of each ResponseCache counter
+_RESULTS = {"exact_hits": "exact", "semantic_hits": "semantic", "misses": "miss"}
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+def context_key(
+    model: str,
+    system_prompt: str = model_system_request,
+    temperature: float = 0.7,
+    history: Optional[List[dict]] = None,
+) -> str:
+    """Hash of everything besides the prompt that changes what the model answers"""
+    key = f"{model}\0{system_prompt}\0{temperature}"
+    if history:
+        turns = [[m["role"], m["content"]] for m in history]
+        key += "\0" + json.dumps(turns, ensure_ascii=False)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def exact_key(prompt: str, context: str) -> str:
+    return hashlib.sha256(f"{context}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+
+
+class ExactCache:
+    """Persistent SQLite cache of responses with TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+            "created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created, used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, content, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE created < ? OR key IN ("
+                "SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_entries),
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class SemanticCache:
+    """Responses stored with their prompt embedding in a Weaviate class
+
+    A lookup returns the closest earlier response for the same model context whose
+    cosine similarity to the prompt is at least `threshold`.
+    """
+
+    def __init__(
+        self,
+        connection,
+        embed: Callable[[str], List[float]],
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl: float = DEFAULT_TTL,
+        class_name: str = SEMANTIC_CLASS,
+    ) -> None:
+        self.connection = connection
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.class_name = class_name
+        if not connection.client().schema.exists(class_name):
+            connection.create_class(
+                {
+                    "class": class_name,
+                    "description": "Cached LLM responses keyed by prompt embedding",
+                    "vectorizer": "none",
+                    "vectorIndexConfig": {"distance": "cosine"},
+                    "properties": [
+                        {"name": "prompt", "dataType": ["text"]},
+                        {"name": "content", "dataType": ["text"]},
+                        {"name": "context", "dataType": ["text"]},
+                        {"name": "created", "dataType": ["number"]},
+                    ],
+                }
+            )
+
+    def _where(self, context: str) -> dict:
+        return {
+            "operator": "And",
+            "operands": [
+                {"path": ["context"], "operator": "Equal", "valueText": context},
+                {
+                    "path": ["created"],
+                    "operator": "GreaterThanEqual",
+                    "valueNumber": time.time() - self.ttl,
+                },
+            ],
+        }
+
+    def get(self, prompt: str, context: str, vector: List[float]) -> Optional[str]:
+        results = self.connection.near_vector(
+            self.class_name,
+            vector,
+            ["content"],
+            limit=1,
+            distance=1 - self.threshold,
+            where=self._where(context),
+            ttl=0,
+        )
+        if len(results) == 0:
+            return None
+        return results["content"].iloc[0]
+
+    def put(self, prompt: str, context: str, vector: List[float], content: str) -> None:
+        with self.connection.batch(self.class_name) as batch:
+            batch.add_data_object(
+                {
+                    "prompt": prompt,
+                    "content": content,
+                    "context": context,
+                    "created": time.time(),
+                },
+                self.class_name,
+                vector=vector,
+            )
+
+    def prune(self) -> None:
+        """Delete responses older than the TTL"""
+        self.connection.client().batch.delete_objects(
+            self.class_name,
+            where={
+                "path": ["created"],
+                "operator": "LessThan",
+                "valueNumber": time.time() - self.ttl,
+            },
+        )
+        self.connection.invalidate(self.class_name)
+
+
+class ResponseCache:
+    """Two-level response cache: exact prompt match, then semantic similarity"""
+
+    def __init__(self, exact: ExactCache, semantic: Optional[SemanticCache] = None):
+        self.exact = exact
+        self.semantic = semantic
+        if semantic is not None:
+            # A miss is followed by a put for the same prompt; embed it only once
+            self._embed = functools.lru_cache(maxsize=256)(semantic.embed)
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        LOOKUPS.labels(_RESULTS[counter]).inc()
+
+    def get(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: str = model_system_request,
+        temperature: float = 0.7,
+        history: Optional[List[dict]] = None,
+    ) -> Optional[str]:
+        """Return a cached response for the request, or None
+        @parameter prompt : str - User prompt
+        @parameter model : str - Model name
+        @parameter system_prompt : str - System prompt sent with the request
+        @parameter temperature : float - Sampling temperature
+        @parameter history : List[dict] - Earlier turns sent along with the prompt
+        @returns str - Cached content, if any
+        """
+        context = context_key(model, system_prompt, temperature, history)
+        key = exact_key(prompt, context)
+        content = self.exact.get(key)
+        if content is not None:
+            self._count("exact_hits")
+            return content
+        if self.semantic is not None:
+            try:
+                vector = self._embed(normalize_prompt(prompt))
+                content = self.semantic.get(prompt, context, vector)
+            except Exception as e:
+                # The semantic layer is best effort; never fail a generation on it
+                logger.warning("Semantic cache lookup failed: %s", e)
+            if content is not None:
+                self._count("semantic_hits")
+                self.exact.put(key, content)
+                return content
+        self._count("misses")
+        return None
+
+    def put(
+        self,
+        prompt: str,
+        model: str,
+        content: str,
+        system_prompt: str = model_system_request,
+        temperature: float = 0.7,
+        history: Optional[List[dict]] = None,
+    ) -> None:
+        context = context_key(model, system_prompt, temperature, history)
+        self.exact.put(exact_key(prompt, context), content)
+        if self.semantic is not None:
+            try:
+                vector = self._embed(normalize_prompt(prompt))
+                self.semantic.put(prompt, context, vector, content)
+            except Exception as e:
+                logger.warning("Semantic cache store failed: %s", e)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
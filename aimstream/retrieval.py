@@ -0,0 +1,138 @@
+import functools
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+from .llm import EMBEDDING_MODEL
+from .response_cache import normalize_prompt
+
+REFERENCE_CLASS = "AImStream_Dockerfile"
+REFERENCE_PROPERTIES = ["title", "description", "base_image", "dockerfile"]
+DEFAULT_K = 3
+DEFAULT_ALPHA = 0.5
+logger = logging.getLogger(__name__)
+
+EXAMPLE_PROMPTS = [
+    "Set up an Alpine Linux Docker image with Nginx web server.",
+    "Build a CentOS 7 image with basic tools like Git, net-tools, and curl.",
+    "Create an Ubuntu 18.04 Docker image with OpenJDK 11 and Maven.",
+]
+
+
+def embedding_text(reference: dict) -> str:
+    """What a reference is embedded as; written like the prompts it should match"""
+    return f"{reference['title']}. {reference['description']}"
+
+
+def format_references(references: List[dict]) -> str:
+    """Prompt section presenting retrieved Dockerfiles as examples to follow"""
+    if not references:
+        return ""
+    sections = [
+        "Known-good reference Dockerfiles for similar requests. Follow their "
+        "practices where they apply:"
+    ]
+    for reference in references:
+        sections.append(
+            f"### {reference['title']}\n{reference['description']}\n"
+            f"```dockerfile\n{reference['dockerfile']}\n```"
+        )
+    return "\n\n".join(sections)
+
+
+class PromptEmbeddings:
+    """Precomputed embeddings of known prompts, e.g. the app's example prompts"""
+
+    def __init__(self, vectors: Dict[str, List[float]], model: str = "") -> None:
+        self.model = model
+        self.vectors = {normalize_prompt(p): v for p, v in vectors.items()}
+
+    @classmethod
+    def build(
+        cls, prompts: List[str], embed: Callable[[str], List[float]], model: str = ""
+    ) -> "PromptEmbeddings":
+        return cls({prompt: embed(prompt) for prompt in prompts}, model)
+
+    @classmethod
+    def load(
+        cls, path: str, model: Optional[str] = EMBEDDING_MODEL
+    ) -> "PromptEmbeddings":
+        """Read embeddings saved by `save`, or none if the file does not exist
+        @parameter path : str - File written by `save`
+        @parameter model : str - Model prompts are embedded with now; a file made with another one is ignored, None accepts any
+        @returns PromptEmbeddings - The saved embeddings, empty when missing or stale
+        """
+        if not os.path.exists(path):
+            return cls({}, model or "")
+        with open(path, "r") as reader:
+            data = json.load(reader)
+        saved = data.get("model", "")
+        if model is not None and saved != model:
+            # Vectors from another model are not comparable with new query vectors
+            logger.warning(
+                "Ignoring %s: embedded with %r, prompts now use %r; rebuild it",
+                path,
+                saved,
+                model,
+            )
+            return cls({}, model)
+        return cls(data["vectors"], saved)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as writer:
+            json.dump({"model": self.model, "vectors": self.vectors}, writer)
+
+    def get(self, prompt: str) -> Optional[List[float]]:
+        return self.vectors.get(normalize_prompt(prompt))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+
+class ReferenceRetriever:
+    """Top-k hybrid search over the reference Dockerfiles indexed in Weaviate
+
+    The class has no vectorizer: references are embedded at ingestion with the
+    same local model that embeds prompts here, and prompts with a precomputed
+    embedding skip the embedding call entirely.
+    """
+
+    def __init__(
+        self,
+        connection,
+        embed: Callable[[str], List[float]],
+        k: int = DEFAULT_K,
+        alpha: float = DEFAULT_ALPHA,
+        class_name: str = REFERENCE_CLASS,
+        precomputed: Optional[PromptEmbeddings] = None,
+    ) -> None:
+        self.connection = connection
+        self.k = k
+        self.alpha = alpha
+        self.class_name = class_name
+        self.precomputed = (
+            precomputed if precomputed is not None else PromptEmbeddings({})
+        )
+        self._embed = functools.lru_cache(maxsize=256)(embed)
+
+    def embedding(self, prompt: str) -> List[float]:
+        vector = self.precomputed.get(prompt)
+        if vector is None:
+            vector = self._embed(prompt)
+        return vector
+
+    def search(self, prompt: str) -> List[dict]:
+        """The `k` references closest to `prompt` by fused BM25 and vector score
+        @parameter prompt : str - User prompt
+        @returns List[dict] - References with their `score`, best first
+        """
+        results = self.connection.hybrid(
+            self.class_name,
+            prompt,
+            REFERENCE_PROPERTIES,
+            limit=self.k,
+            alpha=self.alpha,
+            vector=self.embedding(prompt),
+        )
+        return results.to_dict("records")
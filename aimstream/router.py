@@ -0,0 +1,394 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import openai
+from openai import OpenAI
+
+from . import metrics
+from .llm import (
+    LOCAL_API_KEY,
+    LOCAL_BASE_URL,
+    OPENAI_BASE_URL,
+    StreamStats,
+    create_client,
+    stream_completion,
+)
+
+LEAST_OUTSTANDING = "least_outstanding"
+LATENCY = "latency"
+STRATEGIES = (LEAST_OUTSTANDING, LATENCY)
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 30.0
+DEFAULT_HEALTH_INTERVAL = 15.0
+LATENCY_SMOOTHING = 0.3
+# Errors after which the same request is retried on the next endpoint
+FAILOVER_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+    openai.RateLimitError,
+    httpx.HTTPError,
+)
+
+FAILOVERS = metrics.counter(
+    "aimstream_router_failovers_total",
+    "Requests moved to another endpoint after an endpoint failed",
+    ("model",),
+)
+
+DEFAULT_BACKENDS = {
+    "strategy": LEAST_OUTSTANDING,
+    "models": {
+        "lmstudio-ai/gemma-2b-it-GGUF": {
+            "endpoints": [{"base_url": LOCAL_BASE_URL, "api_key": LOCAL_API_KEY}],
+        },
+        "TheBloke/Mistral-7B-Instruct-v0.2-GGUF": {
+            "endpoints": [{"base_url": LOCAL_BASE_URL, "api_key": LOCAL_API_KEY}],
+            "fallback": "lmstudio-ai/gemma-2b-it-GGUF",
+        },
+        "ChatGPT": {
+            "endpoints": [
+                {
+                    "base_url": OPENAI_BASE_URL,
+                    "api_key_env": "OPENAI_KEY",
+                    "model": "gpt-3.5-turbo",
+                }
+            ],
+            "fallback": "lmstudio-ai/gemma-2b-it-GGUF",
+        },
+    },
+}
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint after repeated failures
+
+    After `failure_threshold` consecutive failures the breaker opens for
+    `reset_timeout` seconds, then lets a single trial request through; its outcome
+    closes the breaker again or reopens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        """Whether a request may be sent now, without reserving the trial"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial)
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; takes the trial slot when half open"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """Give back the trial slot of a request that ended without an outcome"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class Endpoint:
+    """One OpenAI-compatible server able to serve a model"""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = LOCAL_API_KEY,
+        model: Optional[str] = None,
+        client: Optional[OpenAI] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.base_url = base_url
+        self.model = model
+        self.client = client or create_client(base_url, api_key)
+        self.breaker = breaker or CircuitBreaker()
+        self.outstanding = 0
+        self.latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.base_url!r}, model={self.model!r})"
+
+    def begin(self) -> None:
+        with self._lock:
+            self.outstanding += 1
+
+    def end(self, latency: Optional[float] = None) -> None:
+        with self._lock:
+            self.outstanding -= 1
+            if latency is not None:
+                self.latency = (
+                    latency
+                    if self.latency is None
+                    else LATENCY_SMOOTHING * latency
+                    + (1 - LATENCY_SMOOTHING) * self.latency
+                )
+
+    def check(self) -> bool:
+        """Probe the server's model list and feed the outcome to the breaker
+        @returns bool - Whether the endpoint answered
+        """
+        try:
+            self.client.with_options(timeout=5.0, max_retries=0).models.list()
+        except Exception:
+            self.breaker.record_failure()
+            return False
+        self.breaker.record_success()
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "state": self.breaker.state,
+            "outstanding": self.outstanding,
+            "latency": self.latency,
+        }
+
+
+class NoBackendAvailable(Exception):
+    """Every endpoint of a model and of its fallbacks failed or is open"""
+
+
+class Router:
+    """Routes completions for a model to one of its endpoints
+
+    Endpoints are ranked by outstanding requests or by smoothed time to first
+    token, skipping those whose circuit breaker is open. A request that fails
+    before its first token is retried on the next endpoint, then on the model's
+    `fallback` model. Once tokens have been shown the request is not retried.
+    """
+
+    def __init__(
+        self,
+        backends: Dict[str, List[Endpoint]],
+        fallbacks: Optional[Dict[str, str]] = None,
+        strategy: str = LEAST_OUTSTANDING,
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"strategy must be one of {STRATEGIES}, got {strategy!r}")
+        self.backends = backends
+        self.fallbacks = dict(fallbacks or {})
+        self.strategy = strategy
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Router":
+        """Build a router from a dict shaped like DEFAULT_BACKENDS
+        @parameter config : dict - `models` maps a model name to its `endpoints` and optional `fallback`
+        @returns Router - Router over every configured endpoint
+        """
+        backends: Dict[str, List[Endpoint]] = {}
+        fallbacks: Dict[str, str] = {}
+        clients: Dict[Tuple[str, str], OpenAI] = {}
+        for model, settings in config["models"].items():
+            backends[model] = []
+            for endpoint in settings["endpoints"]:
+                api_key = endpoint.get("api_key") or os.environ.get(
+                    endpoint.get("api_key_env", ""), LOCAL_API_KEY
+                )
+                # Models served by the same server share its connection pool
+                key = (endpoint["base_url"], api_key)
+                if key not in clients:
+                    clients[key] = create_client(endpoint["base_url"], api_key)
+                backends[model].append(
+                    Endpoint(
+                        endpoint["base_url"],
+                        api_key,
+                        model=endpoint.get("model"),
+                        client=clients[key],
+                    )
+                )
+            if settings.get("fallback"):
+                fallbacks[model] = settings["fallback"]
+        return cls(backends, fallbacks, config.get("strategy", LEAST_OUTSTANDING))
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "Router":
+        """Build a router from a JSON registry, or DEFAULT_BACKENDS when there is none"""
+        if path is None or not os.path.exists(path):
+            return cls.from_config(DEFAULT_BACKENDS)
+        with open(path, "r") as reader:
+            return cls.from_config(json.load(reader))
+
+    def models(self) -> List[str]:
+        return list(self.backends)
+
+    def capacity(self, model: str) -> int:
+        """Number of endpoints serving `model`, e.g. to scale a scheduler limit"""
+        return max(len(self.backends.get(model, [])), 1)
+
+    def _rank(self, endpoints: List[Endpoint]) -> List[Endpoint]:
+        if self.strategy == LATENCY:
+            # Unmeasured endpoints go first so every endpoint gets a latency
+            key = lambda e: (e.latency is not None, e.latency or 0.0, e.outstanding)
+        else:
+            key = lambda e: (e.outstanding, e.latency or 0.0)
+        return sorted((e for e in endpoints if e.breaker.available()), key=key)
+
+    def candidates(self, model: str) -> Iterator[Tuple[str, Endpoint]]:
+        """Yield `(model, endpoint)` pairs in the order a request tries them"""
+        seen = set()
+        while model is not None and model not in seen:
+            seen.add(model)
+            if model not in self.backends:
+                raise ValueError(f"No backend is configured for model {model!r}")
+            for endpoint in self._rank(self.backends[model]):
+                yield model, endpoint
+            model = self.fallbacks.get(model)
+
+    def stream(
+        self,
+        prompt: str,
+        model_option: str,
+        stats: Optional[StreamStats] = None,
+        temperature: float = 0.7,
+        messages: Optional[List[dict]] = None,
+    ) -> Iterator[str]:
+        """`stream_completion` over the best available endpoint for `model_option`
+        @parameter prompt : str - User prompt
+        @parameter model_option : str - Model name as listed in the registry
+        @parameter stats : StreamStats - Optional, filled by the endpoint that answered
+        @parameter temperature : float - Sampling temperature
+        @parameter messages : List[dict] - Optional, full chat messages including earlier turns
+        @returns Iterator[str] - Text deltas
+        """
+        errors = []
+        for model, endpoint in self.candidates(model_option):
+            if not endpoint.breaker.allow():
+                continue
+            attempt = StreamStats()
+            endpoint.begin()
+            latency = None
+            started = False
+            try:
+                chunks = stream_completion(
+                    endpoint.client,
+                    prompt,
+                    endpoint.model or model,
+                    stats=attempt,
+                    temperature=temperature,
+                    messages=messages,
+                )
+                for chunk in chunks:
+                    if not started:
+                        started = True
+                        latency = attempt.time_to_first_token
+                    if stats is not None:
+                        stats.record()
+                    yield chunk
+            except FAILOVER_ERRORS as e:
+                endpoint.breaker.record_failure()
+                if started:
+                    raise
+                errors.append(f"{endpoint!r}: {e}")
+                FAILOVERS.labels(model).inc()
+                continue
+            except BaseException:
+                # Cancelled by the caller, or a non-retryable error
+                if started:
+                    endpoint.breaker.record_success()
+                else:
+                    endpoint.breaker.release()
+                raise
+            finally:
+                endpoint.end(latency)
+                if stats is not None:
+                    stats.finished_at = time.perf_counter()
+            endpoint.breaker.record_success()
+            return
+        raise NoBackendAvailable(
+            f"No backend could serve {model_option}: " + "; ".join(errors)
+            if errors
+            else f"Every backend for {model_option} is unavailable"
+        )
+
+    def check_health(self) -> Dict[str, List[dict]]:
+        """Probe every endpoint once and return their state"""
+        checked: Dict[int, bool] = {}
+        for endpoints in self.backends.values():
+            for endpoint in endpoints:
+                # Endpoints sharing a server share its health
+                client_id = id(endpoint.client)
+                if client_id not in checked:
+                    checked[client_id] = endpoint.check()
+                elif checked[client_id]:
+                    endpoint.breaker.record_success()
+                else:
+                    endpoint.breaker.record_failure()
+        return self.stats()
+
+    def start_health_checks(self, interval: float = DEFAULT_HEALTH_INTERVAL) -> None:
+        """Probe every endpoint every `interval` seconds on a daemon thread"""
+        if self._health_thread is not None:
+            return
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(
+            target=run, name="router-health", daemon=True
+        )
+        self._health_thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def close(self) -> None:
+        """Stop the health checks and close every endpoint's connection pool"""
+        self.stop()
+        clients = {
+            id(endpoint.client): endpoint.client
+            for endpoints in self.backends.values()
+            for endpoint in endpoints
+        }
+        for client in clients.values():
+            client.close()
+
+    def stats(self) -> Dict[str, List[dict]]:
+        return {
+            model: [endpoint.stats() for endpoint in endpoints]
+            for model, endpoints in self.backends.items()
+        }
@@ -0,0 +1,264 @@
+import collections
+import contextlib
+import threading
+import time
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Union
+
+from openai import OpenAI
+
+from . import metrics
+from .llm import StreamStats, stream_completion
+from .router import Router
+
+DEFAULT_MAX_IN_FLIGHT = 1
+DEFAULT_QUEUE_TIMEOUT = 120.0
+DEFAULT_REQUEST_TIMEOUT = 300.0
+POLL_INTERVAL = 0.25
+
+QUEUE_DEPTH = metrics.gauge(
+    "aimstream_scheduler_queued", "Requests waiting for a slot", ("model",)
+)
+IN_FLIGHT = metrics.gauge(
+    "aimstream_scheduler_in_flight", "Requests holding a slot", ("model",)
+)
+QUEUE_WAIT = metrics.histogram(
+    "aimstream_scheduler_queue_wait_seconds",
+    "Time requests waited for a slot",
+    ("model",),
+)
+REJECTED = metrics.counter(
+    "aimstream_scheduler_rejected_total",
+    "Requests that left the queue without running",
+    ("model", "reason"),
+)
+
+
+class SchedulerTimeout(TimeoutError):
+    """A request waited in the queue, or ran, for longer than allowed"""
+
+
+class Cancelled(Exception):
+    """A request was cancelled before or while it ran"""
+
+
+class Ticket:
+    """One request's place in a model's queue"""
+
+    def __init__(self, model: str, session_id: Optional[str]) -> None:
+        self.model = model
+        self.session_id = session_id
+        self.enqueued = time.monotonic()
+        self.started: Optional[float] = None
+        self.cancelled = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.started is not None
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+
+class Scheduler:
+    """Admits LLM requests to each model in FIFO order, at most `max_in_flight` at once
+
+    One scheduler is shared by every Streamlit session in the process. A session
+    holds at most one waiting ticket per model: submitting again, e.g. after a
+    rerun, cancels the ticket it was still waiting on so stale prompts never reach
+    the model.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.limits = dict(limits or {})
+        self._queues: Dict[str, Deque[Ticket]] = collections.defaultdict(
+            collections.deque
+        )
+        self._in_flight: Dict[str, int] = collections.defaultdict(int)
+        self._condition = threading.Condition()
+
+    def limit(self, model: str) -> int:
+        return self.limits.get(model, self.max_in_flight)
+
+    def submit(self, model: str, session_id: Optional[str] = None) -> Ticket:
+        """Queue a request for `model`
+        @parameter model : str - Model the request goes to
+        @parameter session_id : str - Optional, the Streamlit session submitting it
+        @returns Ticket - Place in the queue, pass it to `wait` and `release`
+        """
+        ticket = Ticket(model, session_id)
+        with self._condition:
+            queue = self._queues[model]
+            if session_id is not None:
+                for waiting in list(queue):
+                    if waiting.session_id == session_id:
+                        waiting.cancel()
+                        queue.remove(waiting)
+            queue.append(ticket)
+            self._update_gauges(model)
+            self._condition.notify_all()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """Number of requests ahead of `ticket`, 0 once it runs or is next"""
+        with self._condition:
+            try:
+                return self._queues[ticket.model].index(ticket)
+            except ValueError:
+                return 0
+
+    def _remove(self, ticket: Ticket) -> None:
+        queue = self._queues[ticket.model]
+        if ticket in queue:
+            queue.remove(ticket)
+            self._condition.notify_all()
+        self._update_gauges(ticket.model)
+
+    def _update_gauges(self, model: str) -> None:
+        QUEUE_DEPTH.labels(model).set(len(self._queues[model]))
+        IN_FLIGHT.labels(model).set(self._in_flight[model])
+
+    def wait(
+        self,
+        ticket: Ticket,
+        timeout: Optional[float] = DEFAULT_QUEUE_TIMEOUT,
+        on_position: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        """Block until `ticket` may run
+        @parameter ticket : Ticket - Ticket returned by `submit`
+        @parameter timeout : float - Seconds to wait in the queue, None waits forever
+        @parameter on_position : Callable - Called with the queue position whenever it changes
+        @returns None - Raises SchedulerTimeout or Cancelled instead of admitting the request
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        reported = None
+        while True:
+            with self._condition:
+                if ticket.cancelled.is_set():
+                    self._remove(ticket)
+                    REJECTED.labels(ticket.model, "cancelled").inc()
+                    raise Cancelled(f"Request to {ticket.model} was cancelled")
+                queue = self._queues[ticket.model]
+                position = queue.index(ticket)
+                if position == 0 and self._in_flight[ticket.model] < self.limit(
+                    ticket.model
+                ):
+                    queue.popleft()
+                    self._in_flight[ticket.model] += 1
+                    ticket.started = time.monotonic()
+                    self._update_gauges(ticket.model)
+                    QUEUE_WAIT.labels(ticket.model).observe(
+                        ticket.started - ticket.enqueued
+                    )
+                    return
+                if on_position is None or position == reported:
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        self._remove(ticket)
+                        REJECTED.labels(ticket.model, "timeout").inc()
+                        raise SchedulerTimeout(
+                            f"Waited {timeout:.0f}s in the queue for {ticket.model}"
+                        )
+                    # Wake up regularly to notice cancellation from other threads
+                    self._condition.wait(
+                        POLL_INTERVAL
+                        if remaining is None
+                        else min(remaining, POLL_INTERVAL)
+                    )
+                    continue
+                reported = position
+            # Report outside the lock: a slow UI update must not hold up admission
+            on_position(position + 1)
+
+    def release(self, ticket: Ticket) -> None:
+        """Free the slot held by `ticket`, or drop it from the queue if it never ran"""
+        with self._condition:
+            if ticket.running:
+                ticket.started = None
+                self._in_flight[ticket.model] -= 1
+            self._remove(ticket)
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def slot(
+        self,
+        model: str,
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = DEFAULT_QUEUE_TIMEOUT,
+        on_position: Optional[Callable[[int], None]] = None,
+    ) -> Iterator[Ticket]:
+        """Hold a slot for `model` for the duration of the block"""
+        ticket = self.submit(model, session_id)
+        try:
+            self.wait(ticket, timeout, on_position)
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stream(
+        self,
+        client: Union[OpenAI, Router],
+        prompt: str,
+        model_option: str,
+        stats: Optional[StreamStats] = None,
+        session_id: Optional[str] = None,
+        queue_timeout: Optional[float] = DEFAULT_QUEUE_TIMEOUT,
+        request_timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+        on_position: Optional[Callable[[int], None]] = None,
+        messages: Optional[List[dict]] = None,
+    ) -> Iterator[str]:
+        """`stream_completion` that first waits for a slot on the model
+        @parameter client : OpenAI | Router - Client for the model server, or a router over several
+        @parameter prompt : str - User prompt
+        @parameter model_option : str - Model name
+        @parameter stats : StreamStats - Optional, timed from admission rather than submission
+        @parameter session_id : str - Optional, the Streamlit session submitting it
+        @parameter queue_timeout : float - Seconds to wait for a slot
+        @parameter request_timeout : float - Seconds the generation may run once admitted
+        @parameter on_position : Callable - Called with the queue position whenever it changes
+        @parameter messages : List[dict] - Optional, full chat messages including earlier turns
+        @returns Iterator[str] - Text deltas; closing the iterator cancels the generation
+        """
+        with self.slot(model_option, session_id, queue_timeout, on_position) as ticket:
+            stats = stats if stats is not None else StreamStats()
+            stats.started = time.perf_counter()
+            if isinstance(client, Router):
+                chunks = client.stream(
+                    prompt, model_option, stats=stats, messages=messages
+                )
+            else:
+                chunks = stream_completion(
+                    client, prompt, model_option, stats=stats, messages=messages
+                )
+            try:
+                for chunk in chunks:
+                    if ticket.cancelled.is_set():
+                        raise Cancelled(f"Request to {model_option} was cancelled")
+                    if (
+                        request_timeout is not None
+                        and time.monotonic() - ticket.started > request_timeout
+                    ):
+                        raise SchedulerTimeout(
+                            f"Generation on {model_option} exceeded {request_timeout:.0f}s"
+                        )
+                    yield chunk
+            finally:
+                chunks.close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._condition:
+            models = set(self._queues) | set(self._in_flight)
+            return {
+                model: {
+                    "queued": len(self._queues[model]),
+                    "in_flight": self._in_flight[model],
+                    "limit": self.limit(model),
+                }
+                for model in sorted(models)
+            }
@@ -1,24 +1,97 @@
 import streamlit as st
 from streamlit_monaco import st_monaco
 from code_editor import code_editor
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
-import uuid
-import time
 import hmac
+import logging
+import uuid
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from aimstream import metrics
+from aimstream.context import ContextBuilder
+from aimstream.conversation_store import ConversationStore, MemoryStore, SQLiteStore
+from aimstream.dockerfile import DockerfileExtractor, analyze, extract_dockerfile
+from aimstream.history import (
+    DEFAULT_RECENT_SIZE,
+    HISTORY_PAGE_SIZE,
+    History,
+    render_html,
+    window_size,
+)
+from aimstream.llm import StreamStats, create_client, embed
+from aimstream.response_cache import ExactCache, ResponseCache, SemanticCache
+from aimstream.retrieval import (
+    EXAMPLE_PROMPTS,
+    PromptEmbeddings,
+    ReferenceRetriever,
+    format_references,
+)
+from aimstream.router import NoBackendAvailable, Router
+from aimstream.scheduler import Cancelled, Scheduler, SchedulerTimeout
+from st_weaviate_connection import WeaviateConnection
 
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 # Constants
 ENV_VARS = ["WEAVIATE_URL", "WEAVIATE_API_KEY", "OPENAI_KEY"]
 NUM_IMAGES_PER_ROW = 3
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", ".aimstream_cache.sqlite")
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", 1))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", 120))
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", 300))
+LLM_BACKENDS = os.environ.get("LLM_BACKENDS", "backends.json")
+# Keep conversations on disk across restarts when set, else in a bounded in-memory store
+CONVERSATION_DB = os.environ.get("CONVERSATION_DB", "")
+LLM_CONTEXT_TOKENS = int(os.environ.get("LLM_CONTEXT_TOKENS", 2048))
+EXAMPLE_EMBEDDINGS = os.environ.get("EXAMPLE_EMBEDDINGS", "data/example_embeddings.json")
+# Serve Prometheus metrics on this port when set; spans go to TRACE_FILE when set
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+
+@st.cache_resource
+def start_metrics():
+    """Turn on metrics and tracing as configured, once per process"""
+    metrics.configure(enabled=bool(METRICS_PORT) or None, trace_file=TRACE_FILE or None)
+    if METRICS_PORT:
+        return metrics.serve(METRICS_PORT)
+    return None
+
+@st.cache_resource
+def get_client():
+    """Client for the local server, shared by every session and rerun"""
+    return create_client()
+
+@st.cache_resource
+def get_conversation_store() -> ConversationStore:
+    """Conversation store shared by every session"""
+    if CONVERSATION_DB:
+        return SQLiteStore(CONVERSATION_DB)
+    return MemoryStore()
+
+@st.cache_resource
+def get_router() -> Router:
+    """Router over the model backends in LLM_BACKENDS, shared by every session"""
+    router = Router.from_file(LLM_BACKENDS)
+    router.start_health_checks()
+    return router
+
+@st.cache_resource
+def get_scheduler() -> Scheduler:
+    """Request scheduler in front of the model backends, shared by every session"""
+    router = get_router()
+    # Each endpoint serving a model adds LLM_MAX_IN_FLIGHT slots for it
+    limits = {model: LLM_MAX_IN_FLIGHT * router.capacity(model) for model in router.models()}
+    return Scheduler(max_in_flight=LLM_MAX_IN_FLIGHT, limits=limits)
 
 # Initialize the client with local server settings
-client = OpenAI(base_url="http://localhost:1234/v1", api_key="lm-studio")
+start_metrics()
+client = get_client()
+router = get_router()
+scheduler = get_scheduler()
 
-model_system_request = "From now on, act as a tech professional. Pay close attention to user questions. Provide outputs that users would regarding the input."
 # Functions
 def check_password():
     """Returns `True` if the user had a correct password."""
@@ -55,30 +128,6 @@ def check_password():
         st.error("😕 User not known or password incorrect")
     return False
 
-def stream_data(content: str):
-    for word in content.split(" "):
-        yield word + " "
-        time.sleep(0.02)
-
-def get_openai_response_by_model(prompt: str, model_option: str) -> str:
-    print("User Prompt:" + prompt)
-    completion = client.chat.completions.create(
-        model=model_option,
-        messages=[
-            {"role": "system", "content": model_system_request},
-            {"role": "user", "content": prompt}
-        ],
-        temperature = 0.7,
-        max_tokens = -1
-    )
-    # print(completion.choices[0].message.content)
-    response_content = "DONE."
-    return response_content, completion.choices[0].message.content
-    # print("Response Content: " + tmp)
-    # return extract_dockerfile_content(tmp)
-    # return tmp
-  
-
 def get_env_vars(env_vars: list) -> dict:
     """Retrieve environment variables
     @parameter env_vars : list - List containing keys of environment variables
@@ -96,15 +145,18 @@ def display_chat_messages() -> None:
     """Print the latest question and response in the sidebar
     @returns None
     """
-    if len(st.session_state.messages) >= 2:
-        user_message = st.session_state.messages[-2]
-        assistant_message = st.session_state.messages[-1]
+    if len(st.session_state.history) >= 2:
+        user_message, assistant_message = st.session_state.history.last(2)
 
         with st.sidebar:
             with st.chat_message(user_message["role"]):
                 st.markdown(user_message["content"])
             with st.chat_message(assistant_message["role"]):
                 st.markdown(assistant_message["content"])
+                if "stats" in assistant_message:
+                    display_stream_stats(assistant_message["stats"])
+                if assistant_message.get("check"):
+                    display_dockerfile_check(assistant_message["check"])
                 if "images" in assistant_message:
                     for i in range(0, len(assistant_message["images"]), NUM_IMAGES_PER_ROW):
                         cols = st.columns(NUM_IMAGES_PER_ROW)
@@ -112,22 +164,120 @@ def display_chat_messages() -> None:
                             if i + j < len(assistant_message["images"]):
                                 cols[j].image(assistant_message["images"][i + j], width=200)
 
+def get_weaviate_connection() -> WeaviateConnection:
+    """Weaviate connection configured by WEAVIATE_URL and WEAVIATE_API_KEY
+    @returns WeaviateConnection - Shared connection
+    """
+    connection = st.connection(
+        "weaviate",
+        type=WeaviateConnection,
+        url=env_vars["WEAVIATE_URL"],
+        api_key=env_vars["WEAVIATE_API_KEY"] or None,
+        on_timing=metrics.connection_timer() if metrics.REGISTRY.enabled else None,
+    )
+    if metrics.REGISTRY.enabled:
+        metrics.instrument_connection(connection)
+    return connection
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache, with a semantic layer when Weaviate is configured
+    @returns ResponseCache - Shared cache
+    """
+    semantic = None
+    if env_vars["WEAVIATE_URL"]:
+        try:
+            semantic = SemanticCache(
+                get_weaviate_connection(), embed=lambda text: embed(client, text)
+            )
+        except Exception as e:
+            logger.warning("Semantic response cache disabled: %s", e)
+    return ResponseCache(ExactCache(RESPONSE_CACHE_PATH), semantic)
+
+@st.cache_resource
+def get_retriever():
+    """Retriever over the reference Dockerfiles, or None without Weaviate
+    @returns ReferenceRetriever - Shared retriever
+    """
+    if not env_vars["WEAVIATE_URL"]:
+        return None
+    return ReferenceRetriever(
+        get_weaviate_connection(),
+        embed=lambda text: embed(client, text),
+        precomputed=PromptEmbeddings.load(EXAMPLE_EMBEDDINGS),
+    )
+
+def retrieve_references(prompt: str) -> str:
+    """Reference Dockerfiles for `prompt`, formatted for the prompt
+    @parameter prompt : str - User prompt
+    @returns str - Prompt section, empty when retrieval is off or fails
+    """
+    retriever = get_retriever()
+    if retriever is None or not use_references:
+        return ""
+    try:
+        with metrics.span("retrieval"):
+            return format_references(retriever.search(prompt))
+    except Exception as e:
+        # Generation works without references; never fail a request on them
+        logger.warning("Reference retrieval failed: %s", e)
+        return ""
+
+def display_stream_stats(stats: dict) -> None:
+    """Show the streaming latency of a generated response
+    @parameter stats : dict - StreamStats.to_dict() of the response
+    @returns None
+    """
+    if stats.get("cached"):
+        st.caption("Served from the response cache")
+    elif stats["time_to_first_token"] is not None:
+        st.caption(
+            f"First token after {stats['time_to_first_token']:.2f}s · "
+            f"{stats['tokens']} tokens at {stats['tokens_per_second']:.1f} tokens/s"
+        )
+
+def show_older_messages() -> None:
+    st.session_state.history_shown += HISTORY_PAGE_SIZE
+
+def dockerfile_check(code: str, extractor: DockerfileExtractor = None) -> dict:
+    """Lint the Dockerfile in a generated answer
+    @parameter code : str - Generated answer
+    @parameter extractor : DockerfileExtractor - Optional, already fed with the streamed answer
+    @returns dict - Stages, layers and issues, empty when the answer has no Dockerfile
+    """
+    dockerfile = extractor.close() if extractor is not None else extract_dockerfile(code)
+    result = analyze(dockerfile)
+    if result is None:
+        return {}
+    check = result.to_dict()
+    return {key: check[key] for key in ("stages", "layers", "issues")}
+
+def display_dockerfile_check(check: dict) -> None:
+    """Show the linter findings for a generated Dockerfile
+    @parameter check : dict - Output of dockerfile_check
+    @returns None
+    """
+    issues = check["issues"]
+    label = f"Dockerfile check: {check['stages']} stage(s), {check['layers']} layers, {len(issues)} issue(s)"
+    with st.expander(label, expanded=bool(issues)):
+        if not issues:
+            st.markdown("No build-performance issues found.")
+        for issue in issues:
+            st.markdown(f"- **{issue['rule']}** line {issue['line']} ({issue['severity']}): {issue['message']}")
+
 def display_main_body_messages() -> None:
-    """Print message history in the main body
+    """Print the latest versions of the message history in the main body
     @returns None
     """
-    st.write("<div class='flowchart'>", unsafe_allow_html=True)
-    version = 0;
-    for message in st.session_state.messages:
-        if  message["role"] == "assistant":
-            # Generate a unique key using uuid
-            unique_key = str(uuid.uuid4())
-            # Display user question in the Main body
-            st.write(f"Version {version} -- UUID: {unique_key}")
-            st.write(f"<div class='block assistant' style='background-color:black'><strong>Assistant:</strong> {message['content']}</div>", unsafe_allow_html=True)
-            st.write("<div class='line'></div>", unsafe_allow_html=True)
-            version += 1;
-    st.write("</div>", unsafe_allow_html=True)
+    history = st.session_state.history
+    shown, hidden = window_size(st.session_state.history_shown, history.assistant_count)
+    if hidden > 0:
+        st.button(
+            f"Show {min(hidden, HISTORY_PAGE_SIZE)} older versions ({hidden} hidden)",
+            on_click=show_older_messages,
+        )
+    # One element for the whole window; each message's HTML is built only once
+    st.write(render_html(history.assistant_window(shown)), unsafe_allow_html=True)
 
 # Environment variables
 env_vars = get_env_vars(ENV_VARS)
@@ -194,21 +344,33 @@ with st.sidebar:
     )
     model_option = st.selectbox(
         "Which Model would you like to be used?",
-        ("lmstudio-ai/gemma-2b-it-GGUF", "TheBloke/Mistral-7B-Instruct-v0.2-GGUF","ChatGPT"),
+        router.models(),
         index=None,
         placeholder="Please Select Your Model ...",
     )
+    use_references = st.toggle(
+        "Ground answers in reference Dockerfiles",
+        value=True,
+        disabled=not env_vars["WEAVIATE_URL"],
+    )
     st.header("Workplace: ")
 
 # Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-    st.session_state.greetings = False
+if "history" not in st.session_state:
+    # The conversation ID lives in the URL so a reload or restart resumes it
+    if "conversation" not in st.query_params:
+        st.query_params["conversation"] = uuid.uuid4().hex
+    st.session_state.history = History(
+        get_conversation_store(), st.query_params["conversation"]
+    )
+    st.session_state.history_shown = HISTORY_PAGE_SIZE
+    st.session_state.context_builder = ContextBuilder(budget=LLM_CONTEXT_TOKENS)
+    st.session_state.greetings = len(st.session_state.history) > 0
 
 # Display the latest chat messages in the sidebar
 display_chat_messages()
 
-# Display all chat messages in the main body
+# Display the latest versions in the main body, older ones on demand
 st.header("Chain of Messages:")
 display_main_body_messages()
 
@@ -219,16 +381,12 @@ with st.sidebar:
             intro = "Hey, Docker dev! Time to kick your builds into high gear with AImStream! It's like having a jetpack strapped to your Docker images – they'll be soaring to completion before you can say 'dockerize me, Captain!'"
             st.markdown(intro)
             # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": intro})
+            st.session_state.history.add("assistant", intro)
             st.session_state.greetings = True
 
 # Example prompts
 with st.sidebar:
-    example_prompts = [
-        "Set up an Alpine Linux Docker image with Nginx web server.",
-        "Build a CentOS 7 image with basic tools like Git, net-tools, and curl.",
-        "Create an Ubuntu 18.04 Docker image with OpenJDK 11 and Maven."
-    ]
+    example_prompts = EXAMPLE_PROMPTS
     button_cols = st.columns(3)
     button_pressed = ""
     if button_cols[0].button(example_prompts[0]):
@@ -249,7 +407,7 @@ if prompt := (st.sidebar.chat_input("What type of IMAGE would you like to create
         with st.chat_message("user"):
             st.markdown(prompt)
             # Add user message to chat history
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            st.session_state.history.add("user", prompt)
 
     prompt = prompt.replace('"', "").replace("'", "")
 
@@ -258,13 +416,56 @@ if prompt := (st.sidebar.chat_input("What type of IMAGE would you like to create
         query = prompt.strip().lower()
         # Here you can handle the prompt processing and response generation
         # response_content = "response content (using AI-generated result to change this)"
-        response_content, code = get_openai_response_by_model(prompt=prompt, model_option=model_option)
+        response_cache = get_response_cache()
+        # Earlier turns within the token budget; the prompt itself was just added
+        messages = st.session_state.context_builder.build(
+            st.session_state.history.last(DEFAULT_RECENT_SIZE + 1)[:-1],
+            prompt,
+            references=retrieve_references(prompt),
+        )
+        context_turns = messages[1:-1]
+        code = response_cache.get(prompt, model_option, history=context_turns)
         with st.sidebar:
             with st.chat_message("assistant"):
-                st.markdown(response_content)
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": code, "images": images}
+                if code is not None:
+                    st.markdown(code)
+                    message_stats = {"cached": True}
+                    check = dockerfile_check(code)
+                else:
+                    stats = StreamStats()
+                    queue_status = st.empty()
+                    extractor = DockerfileExtractor()
+                    try:
+                        # Wait for a slot on the model, then render chunks as they arrive
+                        chunks = scheduler.stream(
+                            router,
+                            prompt,
+                            model_option,
+                            stats=stats,
+                            session_id=get_script_run_ctx().session_id,
+                            queue_timeout=LLM_QUEUE_TIMEOUT,
+                            request_timeout=LLM_REQUEST_TIMEOUT,
+                            on_position=lambda position: queue_status.info(
+                                f"Waiting for {model_option}: position {position} in the queue"
+                            ),
+                            messages=messages,
+                        )
+                        code = st.write_stream(extractor.wrap(chunks))
+                    except (SchedulerTimeout, Cancelled, NoBackendAvailable) as e:
+                        queue_status.empty()
+                        st.error(str(e))
+                        st.stop()
+                    queue_status.empty()
+                    response_cache.put(prompt, model_option, code, history=context_turns)
+                    message_stats = stats.to_dict()
+                    check = dockerfile_check(code, extractor)
+                display_stream_stats(message_stats)
+                if check:
+                    display_dockerfile_check(check)
+                st.session_state.history.add(
+                    "assistant", code, images=images, stats=message_stats, check=check
                 )
+        response_content = "DONE."
 
         # Display response in the main body
         st.write(f"<div class='block user'><strong>User:</strong> {prompt}</div>", unsafe_allow_html=True)
@@ -0,0 +1,111 @@
+"""Query cache behaviour under a skewed workload against the fake Weaviate.
+
+Requests are BM25 searches over `--distinct` card names drawn from a Zipf
+distribution, like a few popular prompts dominating traffic. The same request
+sequence is replayed without the cache (ttl=0) and with a cache of
+`--max-entries`, optionally invalidated by a batch write every `--write-every`
+requests.
+
+Usage: python -m benchmarks.bench_cache [--requests 2000] [--distinct 500] [--max-entries 128]
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from benchmarks.bench_query import CLASS_NAME, load_cards
+from benchmarks.common import latency_summary
+from benchmarks.fakes import FakeWeaviate
+from st_weaviate_connection import WeaviateConnection
+
+
+def zipf_sequence(
+    requests: int, distinct: int, skew: float, seed: int = 0
+) -> List[int]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(distinct)]
+    return rng.choices(range(distinct), weights=weights, k=requests)
+
+
+def replay(
+    connection: WeaviateConnection,
+    sequence: List[int],
+    ttl: int,
+    write_every: int,
+) -> List[float]:
+    timings = []
+    for n, card in enumerate(sequence):
+        if write_every and n and n % write_every == 0:
+            # An import into the class drops its cached results
+            with connection.batch(CLASS_NAME):
+                pass
+        start = time.perf_counter()
+        connection.bm25(
+            CLASS_NAME, f"Card {card}", ["name", "rarity"], limit=10, ttl=ttl
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(
+    requests: int = 2000,
+    distinct: int = 500,
+    max_entries: int = 128,
+    skew: float = 1.1,
+    write_every: int = 0,
+    latency: float = 0.002,
+    rows: int = 2000,
+) -> Dict[str, float]:
+    sequence = zipf_sequence(requests, distinct, skew)
+    with FakeWeaviate(latency=latency) as weaviate:
+        load_cards(weaviate, rows, dimensions=8)
+        uncached = WeaviateConnection("bench_uncached", url=weaviate.url)
+        uncached.bm25(CLASS_NAME, "warm", ["name"], ttl=0)
+        baseline = replay(uncached, sequence, ttl=0, write_every=0)
+
+        cached = WeaviateConnection(
+            "bench_cached", url=weaviate.url, cache_max_entries=max_entries
+        )
+        cached.bm25(CLASS_NAME, "warm", ["name"], ttl=0)
+        cached.invalidate()
+        hits_before = cached.cache_stats()["hits"]
+        timings = replay(cached, sequence, ttl=3600, write_every=write_every)
+        stats = cached.cache_stats()
+        uncached.close()
+        cached.close()
+    hits = stats["hits"] - hits_before
+    return {
+        **latency_summary(baseline, "uncached_"),
+        **latency_summary(timings, "cached_"),
+        "hit_rate": hits / len(sequence),
+        "evictions": stats["evictions"],
+        "invalidations": stats["invalidations"],
+        "cached_requests_per_s": len(timings) / sum(timings),
+        "uncached_requests_per_s": len(baseline) / sum(baseline),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--max-entries", type=int, default=128)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--write-every", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    results = run(
+        args.requests,
+        args.distinct,
+        args.max_entries,
+        args.skew,
+        args.write_every,
+        args.latency,
+    )
+    for name, value in results.items():
+        print(f"{name:<28} {value:12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Card name lookups: the local CardIndex vs the current approaches.
+
+Ingestion dedupes with a `lower().strip()` set and leaves fuzzy matching to
+Scryfall's `cards/named?fuzzy=` endpoint. The index is compared with the set for
+exact lookups and deduplication, and with difflib over every name, the local
+equivalent of the remote matcher, for misspelled names.
+
+Usage: python -m benchmarks.bench_card_index [--names data/all_cards.json] [--queries 200]
+"""
+import argparse
+import difflib
+import json
+import os
+import random
+import tempfile
+import time
+
+from aimstream.card_index import CardIndex
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """`name` with one character dropped, doubled or swapped with its neighbour"""
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 2)
+    edit = rng.choice(["drop", "double", "swap"])
+    if edit == "drop":
+        return name[:i] + name[i + 1 :]
+    if edit == "double":
+        return name[:i] + name[i] + name[i:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+
+
+def timed(func, items: list) -> float:
+    """Seconds per item of calling `func` on each of `items`"""
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", default="data/all_cards.json")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--baseline-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.names, "r") as reader:
+        names = json.load(reader)["data"]
+    rng = random.Random(0)
+    exact_queries = [rng.choice(names).upper() for _ in range(args.queries)]
+    originals = [rng.choice(names) for _ in range(args.queries)]
+    typos = [misspell(name, rng) for name in originals]
+
+    start = time.perf_counter()
+    index = CardIndex.build(names)
+    print(f"build {len(index)} names      {time.perf_counter() - start:9.3f} s")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "card_index.bin")
+        index.save(path)
+        start = time.perf_counter()
+        index = CardIndex.load(path)
+        print(f"mmap load                {(time.perf_counter() - start) * 1e3:9.3f} ms")
+        print(f"index size               {os.path.getsize(path) / 1e6:9.2f} MB")
+
+        start = time.perf_counter()
+        keys = {name.lower().strip() for name in names}
+        print(f"lower().strip() set      {(time.perf_counter() - start) * 1e3:9.3f} ms")
+
+        print(
+            f"exact: set {timed(lambda q: q.lower().strip() in keys, exact_queries) * 1e6:.2f} us, "
+            f"index {timed(index.exact, exact_queries) * 1e6:.2f} us"
+        )
+        print(
+            f"dedupe {len(names)} names: set {timed(lambda n: {x.lower().strip() for x in n}, [names]):.3f} s, "
+            f"index {timed(index.dedupe, [names]):.3f} s"
+        )
+
+        lowered = [name.lower() for name in names]
+        baseline = typos[: args.baseline_queries]
+
+        def difflib_resolve(query: str) -> list:
+            return difflib.get_close_matches(query.lower(), lowered, n=1, cutoff=0.75)
+
+        correct = sum(index.resolve(t) == n for t, n in zip(typos, originals))
+        print(
+            f"fuzzy: difflib {timed(difflib_resolve, baseline) * 1e3:.1f} ms, "
+            f"index {timed(index.resolve, typos) * 1e6:.0f} us "
+            f"({correct}/{len(typos)} misspellings resolved correctly)"
+        )
+
+
+if __name__ == "__main__":
+    main()
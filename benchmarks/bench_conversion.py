@@ -0,0 +1,83 @@
+"""Compare GraphQL result conversion: pd.json_normalize vs the columnar builders.
+
+Each path is timed on its own and followed by a typical downstream step (scoring
+every vector against a query vector and filtering on `power`), since the columnar
+path pays its typing cost up front.
+
+Usage: python -m benchmarks.bench_conversion [--rows 5000] [--dimensions 1536]
+"""
+import argparse
+import random
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import best_of
+from st_weaviate_connection.columnar import stack_vectors, to_arrow, to_pandas
+
+DATA_TYPES = {"name": "text", "power": "int", "toughness": "int", "rarity": "text"}
+
+
+def make_rows(rows: int, dimensions: int) -> list:
+    rng = random.Random(0)
+    return [
+        {
+            "name": f"Card {i}",
+            "power": str(rng.randint(0, 10)),
+            "toughness": str(rng.randint(0, 10)),
+            "rarity": rng.choice(["common", "uncommon", "rare", "mythic"]),
+            "_additional": {
+                "distance": rng.random(),
+                "vector": [rng.random() for _ in range(dimensions)],
+            },
+        }
+        for i in range(rows)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.dimensions)
+    query_vector = np.ones(args.dimensions, dtype=np.float32)
+
+    def json_normalize_and_score():
+        df = pd.json_normalize(rows)
+        scores = np.array(df["_additional.vector"].tolist()) @ query_vector
+        return scores[pd.to_numeric(df["power"]).to_numpy() > 5]
+
+    def columnar_and_score():
+        df = to_pandas(rows, DATA_TYPES)
+        scores = stack_vectors(df["_additional.vector"]) @ query_vector
+        return scores[(df["power"] > 5).to_numpy()]
+
+    candidates = {
+        "json_normalize": lambda: pd.json_normalize(rows),
+        "columnar pandas": lambda: to_pandas(rows, DATA_TYPES),
+        "json_normalize + score": json_normalize_and_score,
+        "columnar + score": columnar_and_score,
+    }
+    try:
+        import pyarrow  # noqa: F401
+
+        candidates["columnar arrow"] = lambda: to_arrow(rows, DATA_TYPES)
+    except ImportError:
+        print("pyarrow not installed, skipping the arrow path")
+
+    for name, func in candidates.items():
+        seconds = best_of(func, args.repeat)
+        print(f"{name:<24} {seconds * 1000:9.1f} ms")
+
+    floats = args.rows * args.dimensions
+    print(
+        f"vector memory: python lists ~{floats * 32 / 1e6:.1f} MB, "
+        f"float32 matrix {floats * 4 / 1e6:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
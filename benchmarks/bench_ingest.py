@@ -0,0 +1,158 @@
+"""Card ingestion throughput into the fake Weaviate.
+
+Two paths of data/retrieve_magic_cards.py are measured:
+
+- the API pipeline: `--workers` fetchers, each card fetch taking `--fetch-latency`
+  seconds like a Scryfall request, feeding the BatchWriter;
+- the bulk path: normalized cards from a dump written in batches, without
+  vectors, then with client-side embeddings through the EmbeddingStage and the
+  fake OpenAI embeddings endpoint, once with a cold cache and once re-importing
+  the same cards with a warm one.
+
+Usage: python -m benchmarks.bench_ingest [--cards 5000] [--workers 8] [--fetch-latency 0.01] [--embed-latency 0.05]
+"""
+import argparse
+import json
+import tempfile
+import time
+from typing import Dict, Optional
+
+import weaviate  # type: ignore[import]
+
+from aimstream.embeddings import (
+    EmbeddingCache,
+    EmbeddingStage,
+    vectorized_properties,
+    vectorized_text,
+)
+from aimstream.llm import create_client, embed_batch
+from benchmarks.bench_normalize import make_cards
+from benchmarks.bench_query import CLASS_NAME
+from benchmarks.fakes import FakeOpenAI, FakeWeaviate
+from data.checkpoint import card_uuid
+from data.ingest import BatchWriter, run_pipeline, write_all
+from data.normalize import normalize_batches, normalize_card
+
+
+def pipeline(
+    client: weaviate.Client,
+    cards: list,
+    workers: int,
+    fetch_latency: float,
+    batch_size: int,
+) -> float:
+    by_name = {card["name"]: card for card in cards}
+
+    def fetch(card_name: str, session) -> Optional[dict]:
+        time.sleep(fetch_latency)
+        return normalize_card(by_name[card_name])
+
+    writer = BatchWriter(
+        client,
+        CLASS_NAME,
+        batch_size=batch_size,
+        uuid_for=lambda obj: card_uuid(obj["name"]),
+    )
+    start = time.perf_counter()
+    stats = run_pipeline(list(by_name), fetch, writer, workers=workers, rate=1e6)
+    elapsed = time.perf_counter() - start
+    assert stats.imported == len(cards), stats.summary()
+    return stats.imported / elapsed
+
+
+def bulk(
+    client: weaviate.Client,
+    cards: list,
+    batch_size: int,
+    embeddings: Optional[EmbeddingStage] = None,
+    class_obj: Optional[dict] = None,
+) -> float:
+    vectors_for = None
+    if embeddings is not None:
+        properties = vectorized_properties(class_obj)
+
+        def vectors_for(objects: list) -> list:
+            texts = [vectorized_text(o, properties, CLASS_NAME) for o in objects]
+            return embeddings.embed(texts).tolist()
+
+    writer = BatchWriter(
+        client,
+        CLASS_NAME,
+        batch_size=batch_size,
+        uuid_for=lambda obj: card_uuid(obj["name"]),
+        vectors_for=vectors_for,
+    )
+    start = time.perf_counter()
+    stats = write_all(normalize_batches(cards, batch_size), writer)
+    return stats.imported / (time.perf_counter() - start)
+
+
+def run(
+    cards: int = 5000,
+    workers: int = 8,
+    fetch_latency: float = 0.01,
+    batch_size: int = 100,
+    latency: float = 0.002,
+    embed_latency: float = 0.05,
+    dimensions: int = 256,
+) -> Dict[str, float]:
+    raw_cards = make_cards(cards)
+    with open("data/weaviate_schema.json", "r") as reader:
+        class_obj = json.load(reader)
+    with FakeWeaviate(latency=latency) as fake, FakeOpenAI(
+        latency=embed_latency, dimensions=dimensions
+    ) as llm:
+        fake.create_class(class_obj)
+        client = weaviate.Client(fake.url)
+        results = {
+            "pipeline_cards_per_s": pipeline(
+                client, raw_cards, workers, fetch_latency, batch_size
+            ),
+            "bulk_cards_per_s": bulk(client, raw_cards, batch_size),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            openai_client = create_client(f"{llm.url}/v1", "fake")
+            stage = EmbeddingStage(
+                lambda texts: embed_batch(openai_client, texts, "fake"),
+                EmbeddingCache(directory),
+                model="fake",
+                batch_size=batch_size,
+            )
+            results["bulk_embedded_cold_cards_per_s"] = bulk(
+                client, raw_cards, batch_size, stage, class_obj
+            )
+            results["bulk_embedded_warm_cards_per_s"] = bulk(
+                client, raw_cards, batch_size, stage, class_obj
+            )
+            results["embedding_calls"] = stage.stats.calls
+            stage.cache.close()
+            openai_client.close()
+        client._connection.close()
+        results["stored_objects"] = len(fake.objects[CLASS_NAME])
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--fetch-latency", type=float, default=0.01)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = run(
+        args.cards,
+        args.workers,
+        args.fetch_latency,
+        args.batch_size,
+        args.latency,
+        args.embed_latency,
+    )
+    for name, value in results.items():
+        print(f"{name:<32} {value:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Per-card cost of mapping Scryfall cards to the Weaviate schema.
+
+Compares the original per-card mapping (a fresh color dict and chained
+`str.replace` calls per card) with the table-driven normalizer, called once per
+card as the API path does and once per batch as the bulk path does.
+
+Usage: python -m benchmarks.bench_normalize [--cards 20000] [--bulk-file cards.json]
+"""
+import argparse
+import itertools
+import random
+
+from benchmarks.common import best_of
+from data.normalize import normalize_card, normalize_cards, to_objects
+
+KEYWORDS = ["Flying", "Trample", "Haste", "Vigilance", "Deathtouch", "Ward"]
+TYPES = ["Creature — Elf Druid", "Instant", "Sorcery", "Artifact", "Land"]
+
+
+def legacy_object(card_data: dict) -> dict:
+    """The mapping retrieve_magic_cards.py used before the normalizer"""
+    mana_dict = {"W": "White", "B": "Black", "R": "Red", "G": "Green", "U": "Blue"}
+
+    weaviate_object = {
+        "name": card_data.get("name", "Unknown"),
+        "card_id": str(card_data.get("arena_id", "0")),
+        "img": card_data.get("image_uris", {"normal": ""}).get("normal", ""),
+        "mana_cost": card_data.get("mana_cost", "0"),
+        "type": card_data.get("type_line", ""),
+        "mana_produced": str(card_data.get("produced_mana", "")),
+        "power": card_data.get("power", "0"),
+        "toughness": card_data.get("toughness", "0"),
+        "color": str(card_data.get("colors", "")),
+        "keyword": str(card_data.get("keywords", "")),
+        "set": card_data.get("set_name", ""),
+        "rarity": card_data.get("rarity", ""),
+        "description": card_data.get("oracle_text", ""),
+    }
+
+    for color_code in mana_dict:
+        for field in ("mana_produced", "mana_cost", "color"):
+            weaviate_object[field] = weaviate_object[field].replace(
+                color_code, mana_dict[color_code]
+            )
+    return weaviate_object
+
+
+def make_cards(count: int) -> list:
+    rng = random.Random(0)
+    cards = []
+    for i in range(count):
+        colors = rng.sample("WUBRG", rng.randint(0, 2))
+        card = {
+            "name": f"Card {i}",
+            "arena_id": i,
+            "image_uris": {"normal": f"https://cards.scryfall.io/normal/{i}.jpg"},
+            "mana_cost": f"{{{rng.randint(0, 5)}}}"
+            + "".join(f"{{{c}}}" for c in colors),
+            "type_line": rng.choice(TYPES),
+            "colors": colors,
+            "keywords": rng.sample(KEYWORDS, rng.randint(0, 2)),
+            "set_name": "Benchmark",
+            "rarity": rng.choice(["common", "uncommon", "rare", "mythic"]),
+            "oracle_text": "When this enters the battlefield, draw a card.",
+        }
+        if card["type_line"].startswith("Creature"):
+            card["power"] = rng.choice(["1", "2", "3", "4", "*"])
+            card["toughness"] = rng.choice(["1", "2", "3", "4", "1+*"])
+        if card["type_line"] == "Land":
+            card["produced_mana"] = colors or ["C"]
+        cards.append(card)
+    return cards
+
+
+def load_cards(path: str, count: int) -> list:
+    # Imported here so the synthetic benchmark runs without the ingestion dependencies
+    from data.ingest import iter_json_objects
+
+    return list(itertools.islice(iter_json_objects(path), count))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--bulk-file", default=None)
+    args = parser.parse_args()
+
+    cards = (
+        load_cards(args.bulk_file, args.cards)
+        if args.bulk_file
+        else make_cards(args.cards)
+    )
+
+    def batched():
+        for start in range(0, len(cards), args.batch_size):
+            to_objects(normalize_cards(cards[start : start + args.batch_size]))
+
+    candidates = {
+        "legacy per card": lambda: [legacy_object(card) for card in cards],
+        "normalize per card": lambda: [normalize_card(card) for card in cards],
+        f"normalize batch of {args.batch_size}": batched,
+    }
+    for name, func in candidates.items():
+        seconds = best_of(func, args.repeat)
+        print(
+            f"{name:<24} {seconds * 1000:9.1f} ms "
+            f"{seconds / len(cards) * 1e6:7.2f} us/card"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""End-to-end prompt latency against the fake Weaviate and the fake model server.
+
+Each prompt goes through the same steps as a chat turn in almstream_app.py:
+response cache lookup, reference retrieval (prompt embedding plus hybrid search),
+context building, a scheduled and routed streaming completion fed through the
+DockerfileExtractor, analysis of the Dockerfile and the cache put. `--concurrency`
+sessions send distinct prompts at once, admitted `--max-in-flight` at a time, so
+time to first token includes the queue wait; then every prompt is sent again and
+answered from the response cache.
+
+Usage: python -m benchmarks.bench_prompt [--prompts 64] [--concurrency 4] [--max-in-flight 1] [--ttft 0.05] [--tokens-per-second 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from aimstream.context import ContextBuilder
+from aimstream.dockerfile import DockerfileExtractor, analyze, extract_dockerfile
+from aimstream.llm import StreamStats, create_client, embed
+from aimstream.response_cache import ExactCache, ResponseCache
+from aimstream.retrieval import (
+    REFERENCE_CLASS,
+    ReferenceRetriever,
+    embedding_text,
+    format_references,
+)
+from aimstream.router import Router
+from aimstream.scheduler import DEFAULT_MAX_IN_FLIGHT, Scheduler
+from benchmarks.common import latency_summary
+from benchmarks.fakes import FakeOpenAI, FakeWeaviate
+from st_weaviate_connection import WeaviateConnection
+
+MODEL = "fake"
+BASES = ["Alpine", "Ubuntu 22.04", "Debian slim", "CentOS 7", "Python 3.11"]
+STACKS = [
+    "an Nginx web server",
+    "OpenJDK 11 and Maven",
+    "Node.js and npm",
+    "PostgreSQL client tools",
+    "Git, curl and net-tools",
+    "a Flask application served by Gunicorn",
+]
+
+
+def make_prompts(n: int) -> List[str]:
+    return [
+        f"Build a {BASES[i % len(BASES)]} Docker image with "
+        f"{STACKS[i // len(BASES) % len(STACKS)]}, variant {i}."
+        for i in range(n)
+    ]
+
+
+def load_references(weaviate: FakeWeaviate, llm: FakeOpenAI) -> None:
+    """Index the reference Dockerfiles like data/add_reference_dockerfiles.py"""
+    with open("data/dockerfile_schema.json", "r") as reader:
+        weaviate.create_class(json.load(reader))
+    with open("data/reference_dockerfiles.json", "r") as reader:
+        references = json.load(reader)
+    vectors = llm.embedder([embedding_text(r) for r in references])
+    weaviate.add_objects(
+        REFERENCE_CLASS,
+        [
+            {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, reference["source"])),
+                "properties": reference,
+                "vector": list(vector),
+            }
+            for reference, vector in zip(references, vectors)
+        ],
+    )
+
+
+class Session:
+    """What one chat turn in the app needs, shared by every benchmark thread"""
+
+    def __init__(
+        self,
+        weaviate: FakeWeaviate,
+        llm: FakeOpenAI,
+        directory: str,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ) -> None:
+        base_url = f"{llm.url}/v1"
+        self.client = create_client(base_url, "fake")
+        self.connection = WeaviateConnection("bench_prompt", url=weaviate.url)
+        self.retriever = ReferenceRetriever(
+            self.connection,
+            embed=lambda text: embed(self.client, text, MODEL),
+        )
+        self.router = Router.from_config(
+            {"models": {MODEL: {"endpoints": [{"base_url": base_url, "api_key": "x"}]}}}
+        )
+        self.scheduler = Scheduler(max_in_flight=max_in_flight)
+        self.response_cache = ResponseCache(
+            ExactCache(os.path.join(directory, "responses.sqlite"))
+        )
+        self._lock = threading.Lock()
+        self.checked = 0
+
+    def close(self) -> None:
+        self.client.close()
+        self.connection.close()
+        self.router.close()
+
+    def turn(self, prompt: str) -> Dict[str, float]:
+        """One chat turn; returns its latency, time to first token and token count"""
+        start = time.perf_counter()
+        messages = ContextBuilder().build(
+            [], prompt, references=format_references(self.retriever.search(prompt))
+        )
+        context_turns = messages[1:-1]
+        code = self.response_cache.get(prompt, MODEL, history=context_turns)
+        if code is not None:
+            first_token = time.perf_counter()
+            tokens = 0
+            result = analyze(extract_dockerfile(code))
+        else:
+            stats = StreamStats()
+            extractor = DockerfileExtractor()
+            chunks = self.scheduler.stream(
+                self.router, prompt, MODEL, stats=stats, messages=messages
+            )
+            code = "".join(extractor.wrap(chunks))
+            self.response_cache.put(prompt, MODEL, code, history=context_turns)
+            first_token = stats.first_token_at or time.perf_counter()
+            tokens = stats.tokens
+            result = analyze(extractor.dockerfile)
+        if result is not None:
+            with self._lock:
+                self.checked += 1
+        end = time.perf_counter()
+        return {
+            "latency": end - start,
+            "ttft": first_token - start,
+            "tokens": tokens,
+            "streaming": end - first_token,
+        }
+
+
+def replay(session: Session, prompts: List[str], concurrency: int) -> tuple:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        turns = list(pool.map(session.turn, prompts))
+    return turns, time.perf_counter() - start
+
+
+def run(
+    prompts: int = 64,
+    concurrency: int = 4,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    time_to_first_token: float = 0.05,
+    tokens_per_second: float = 200.0,
+    tokens: int = 64,
+    latency: float = 0.002,
+) -> Dict[str, float]:
+    texts = make_prompts(prompts)
+    with FakeWeaviate(latency=latency) as weaviate, FakeOpenAI(
+        time_to_first_token=time_to_first_token,
+        tokens_per_second=tokens_per_second,
+        tokens=tokens,
+    ) as llm, tempfile.TemporaryDirectory() as directory:
+        load_references(weaviate, llm)
+        session = Session(weaviate, llm, directory, max_in_flight)
+        try:
+            session.turn("warm up the connections")
+            session.checked = 0
+            misses, miss_elapsed = replay(session, texts, concurrency)
+            hits, hit_elapsed = replay(session, texts, concurrency)
+        finally:
+            session.close()
+        completions = llm.completions - 1
+    streamed = sum(t["tokens"] for t in misses)
+    return {
+        **latency_summary([t["latency"] for t in misses], "miss_"),
+        **latency_summary([t["ttft"] for t in misses], "miss_ttft_"),
+        **latency_summary([t["latency"] for t in hits], "hit_"),
+        "miss_prompts_per_s": len(misses) / miss_elapsed,
+        "hit_prompts_per_s": len(hits) / hit_elapsed,
+        "tokens_per_s": streamed / sum(t["streaming"] for t in misses),
+        "completions": completions,
+        "checked": session.checked,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prompts", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    results = run(
+        args.prompts,
+        args.concurrency,
+        args.max_in_flight,
+        args.ttft,
+        args.tokens_per_second,
+        args.tokens,
+        args.latency,
+    )
+    for name, value in results.items():
+        print(f"{name:<24} {value:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""WeaviateConnection.query against the fake Weaviate: transfer plus conversion.
+
+A miss (ttl=0) pays for the HTTP round trip, JSON decoding and the conversion to
+the requested format; a hit pays only for the cache key and the conversion, so
+the difference between the two is the cost of going to the server.
+
+Usage: python -m benchmarks.bench_query [--rows 2000] [--dimensions 256] [--latency 0.002]
+"""
+import argparse
+import json
+import random
+import uuid
+from typing import Dict
+
+from benchmarks.bench_normalize import make_cards
+from benchmarks.common import best_of
+from benchmarks.fakes import FakeWeaviate
+from data.normalize import normalize_card
+from st_weaviate_connection import WeaviateConnection
+
+CLASS_NAME = "MagicChat_Card"
+PROPERTIES = ["name", "mana_cost", "type", "power", "toughness", "color", "rarity"]
+
+
+def load_cards(weaviate: FakeWeaviate, rows: int, dimensions: int) -> None:
+    """Fill the fake with normalized cards in the schema ingestion uses"""
+    with open("data/weaviate_schema.json", "r") as reader:
+        weaviate.create_class(json.load(reader))
+    rng = random.Random(0)
+    weaviate.add_objects(
+        CLASS_NAME,
+        [
+            {
+                "id": str(uuid.UUID(int=i)),
+                "properties": normalize_card(card),
+                "vector": [rng.random() for _ in range(dimensions)],
+            }
+            for i, card in enumerate(make_cards(rows))
+        ],
+    )
+
+
+def formats() -> list:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return ["records", "pandas", "typed"]
+    return ["records", "pandas", "typed", "arrow"]
+
+
+def run(
+    rows: int = 2000, dimensions: int = 256, latency: float = 0.002, repeat: int = 5
+) -> Dict[str, float]:
+    with FakeWeaviate(latency=latency) as weaviate:
+        load_cards(weaviate, rows, dimensions)
+        connection = WeaviateConnection("bench_query", url=weaviate.url)
+        fields = " ".join(PROPERTIES)
+        query = (
+            f"{{Get{{{CLASS_NAME}(limit: {rows})"
+            f"{{{fields} _additional {{id vector}}}}}}}}"
+        )
+        vector = [0.5] * dimensions
+        results: Dict[str, float] = {}
+        for format in formats():
+            connection.query(query, ttl=0, format=format)  # schema lookup, warm pool
+            miss = best_of(
+                lambda: connection.query(query, ttl=0, format=format), repeat
+            )
+            results[f"{format}_miss_ms"] = miss * 1e3
+        connection.query(query)
+        for format in formats():
+            hit = best_of(lambda: connection.query(query, format=format), repeat)
+            results[f"{format}_hit_ms"] = hit * 1e3
+        results["pandas_miss_rows_per_s"] = rows / (results["pandas_miss_ms"] / 1e3)
+        results["near_vector_top10_ms"] = (
+            best_of(
+                lambda: connection.near_vector(
+                    CLASS_NAME, vector, PROPERTIES, limit=10, ttl=0
+                ),
+                repeat,
+            )
+            * 1e3
+        )
+        connection.close()
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.dimensions, args.latency, args.repeat)
+    for name, value in results.items():
+        print(f"{name:<28} {value:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
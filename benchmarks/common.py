@@ -0,0 +1,83 @@
+"""Timing helpers and the JSON results format shared by the offline suite."""
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+from aimstream.batch import percentile
+
+# Metrics named with these suffixes improve when they go up; the others when they go down
+HIGHER_IS_BETTER = ("_per_s", "hit_rate")
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def latency_summary(seconds: List[float], prefix: str = "") -> Dict[str, float]:
+    """p50, p95 and mean of `seconds`, in milliseconds"""
+    return {
+        f"{prefix}p50_ms": percentile(seconds, 50) * 1e3,
+        f"{prefix}p95_ms": percentile(seconds, 95) * 1e3,
+        f"{prefix}mean_ms": sum(seconds) / len(seconds) * 1e3 if seconds else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, results: Dict[str, dict], settings: dict) -> None:
+    """Save benchmark results with what is needed to compare them across commits"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": settings,
+        "results": results,
+    }
+    with open(path, "w") as writer:
+        json.dump(document, writer, indent=2, sort_keys=True)
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """One line per metric present in both runs, flagging changes for the worse
+    @parameter baseline : dict - Results document of the earlier run
+    @parameter current : dict - Results document of this run
+    @parameter threshold : float - Relative change that counts as a regression, e.g. 0.1
+    @returns List[str] - Report lines
+    """
+    lines = []
+    for benchmark, metrics in current["results"].items():
+        before = baseline["results"].get(benchmark, {})
+        for name, value in metrics.items():
+            old = before.get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = (value - old) / old if old else 0.0
+            worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+            flag = "REGRESSION" if worse > threshold else ""
+            lines.append(
+                f"{benchmark}.{name:<32} {old:12.3f} -> {value:12.3f} "
+                f"({change:+7.1%}) {flag}".rstrip()
+            )
+    return lines
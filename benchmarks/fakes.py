@@ -0,0 +1,455 @@
+"""In-process stand-ins for Weaviate and an OpenAI-compatible model server.
+
+Both are plain HTTP servers on daemon threads, so the real clients
+(weaviate-client, WeaviateConnection, AsyncWeaviateConnection, openai) talk to
+them unchanged and the benchmarks measure the client-side code path end to end.
+Latency and token rates are configurable; nothing here aims to rank results the
+way Weaviate does.
+
+>>> with FakeWeaviate(latency=0.002) as weaviate, FakeOpenAI(tokens_per_second=200) as llm:
+...     connection = WeaviateConnection("bench", url=weaviate.url)
+...     client = create_client(llm.url)
+"""
+import http.server
+import json
+import re
+import threading
+import time
+import uuid as uuid_lib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from aimstream.embeddings import HashEmbedder
+
+_WORD = re.compile(r"\w+")
+_NAME = re.compile(r"\s*(\w+)\s*")
+_LIMIT = re.compile(r"limit:\s*(\d+)")
+_AFTER = re.compile(r'after:\s*"([^"]+)"')
+_VECTOR = re.compile(r"vector:\s*\[([^\]]*)\]")
+_QUERY = re.compile(r'query:\s*"(.*?)"(?=\s*[,}])')
+_AGGREGATE = re.compile(r"Aggregate\s*\{\s*(\w+)")
+DEFAULT_LIMIT = 100
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so the clients' connection pools are exercised as in production
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this, delayed ACKs add ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _send_json(self, data, status: int = 200) -> None:
+        body = data if isinstance(data, bytes) else json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method: str) -> None:
+        self.server.fake.requests += 1
+        if self.server.fake.latency:
+            time.sleep(self.server.fake.latency)
+        body = self._body() if method in ("POST", "PUT") else None
+        status, data = self.server.fake.handle(method, self.path, body, self)
+        if status is None:
+            return  # the handler already wrote a streamed response
+        if data is None:
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._send_json(data, status)
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+    def do_PUT(self) -> None:
+        self._route("PUT")
+
+    def do_HEAD(self) -> None:
+        self._route("HEAD")
+
+    def do_DELETE(self) -> None:
+        self._route("DELETE")
+
+
+class FakeServer:
+    """An HTTP server on a free local port, serving until `close`"""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.requests = 0
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        threading.Thread(
+            target=self._server.serve_forever, name=type(self).__name__, daemon=True
+        ).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def handle(self, method: str, path: str, body, handler) -> Tuple[int, object]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _selection(text: str) -> Dict[str, Optional[dict]]:
+    """Parse a GraphQL selection set body, e.g. `name _additional {id}`"""
+    tokens = re.findall(r"\w+|[{}]", text)
+    stack: List[Dict[str, Optional[dict]]] = [{}]
+    last = None
+    for token in tokens:
+        if token == "{":
+            child: Dict[str, Optional[dict]] = {}
+            stack[-1][last] = child
+            stack.append(child)
+        elif token == "}":
+            stack.pop()
+        else:
+            stack[-1][token] = None
+            last = token
+    return stack[0]
+
+
+def parse_get(query: str) -> Tuple[str, str, Dict[str, Optional[dict]]]:
+    """Split `{Get{Class(args){selection}}}` into class name, arguments and selection
+
+    The selection is located from the end of the query, since the arguments may
+    hold string literals the client does not escape.
+    """
+    body = query.strip()
+    start = body.index("Get") + 3
+    class_match = _NAME.match(body, body.index("{", start) + 1)
+    class_name = class_match.group(1)
+    # The third brace from the end closes the selection, after those of Get and the root
+    close = len(body)
+    for _ in range(3):
+        close = body.rindex("}", 0, close)
+    depth = 0
+    for open_at in range(close, class_match.end() - 1, -1):
+        if body[open_at] == "}":
+            depth += 1
+        elif body[open_at] == "{":
+            depth -= 1
+            if depth == 0:
+                break
+    return (
+        class_name,
+        body[class_match.end() : open_at],
+        _selection(body[open_at + 1 : close]),
+    )
+
+
+class FakeWeaviate(FakeServer):
+    """The slice of the Weaviate REST and GraphQL API the repo's clients use
+
+    Classes and objects live in memory. `Get` supports `limit`, `after` cursors,
+    `nearVector` (cosine distance over stored vectors), `bm25` and `hybrid`
+    (term overlap, fused with the vector score when a vector is given) and the
+    `id`, `vector`, `distance` and `score` additional fields. `where` filters are
+    ignored. `Aggregate` answers `meta { count }`.
+    """
+
+    def __init__(self, latency: float = 0.0, version: str = "1.21.2") -> None:
+        self.version = version
+        self.classes: Dict[str, dict] = {}
+        self.objects: Dict[str, Dict[str, dict]] = {}
+        self._matrices: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        # Encoded GraphQL responses by query, so repeated queries cost the fake
+        # a socket write rather than a JSON encoding of every row
+        self._responses: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        super().__init__(latency)
+
+    def create_class(self, class_obj: dict) -> None:
+        with self._lock:
+            self.classes[class_obj["class"]] = class_obj
+            self.objects.setdefault(class_obj["class"], {})
+            self._responses.clear()
+
+    def add_objects(self, class_name: str, objects: List[dict]) -> None:
+        """Store `objects`, each with `properties` and optionally `id` and `vector`"""
+        with self._lock:
+            stored = self.objects.setdefault(class_name, {})
+            for obj in objects:
+                object_id = obj.get("id") or str(uuid_lib.uuid4())
+                stored[object_id] = {
+                    "id": object_id,
+                    "properties": obj.get("properties", {}),
+                    "vector": obj.get("vector"),
+                }
+            self._matrices.pop(class_name, None)
+            self._responses.clear()
+
+    def handle(self, method: str, path: str, body, handler):
+        path = path.split("?")[0]
+        parts = path.strip("/").split("/")[1:]
+        if parts[:2] == [".well-known", "ready"] or parts[:2] == [
+            ".well-known",
+            "live",
+        ]:
+            return 200, None
+        if parts == ["meta"]:
+            return 200, {"hostname": "http://[::]:8080", "version": self.version}
+        if parts[:1] == ["schema"]:
+            return self._schema(method, parts[1:], body)
+        if parts == ["batch", "objects"]:
+            return self._batch(body)
+        if parts[:1] == ["objects"] and len(parts) == 3:
+            exists = parts[2] in self.objects.get(parts[1], {})
+            return (204 if exists else 404), None
+        if parts == ["graphql"]:
+            response = self._responses.get(body["query"])
+            if response is None:
+                response = json.dumps(self._graphql(body["query"])).encode("utf-8")
+                self._responses[body["query"]] = response
+            return 200, response
+        return 404, {"error": [{"message": f"{method} {path} is not faked"}]}
+
+    def _schema(self, method: str, parts: List[str], body):
+        if method == "GET" and not parts:
+            return 200, {"classes": list(self.classes.values())}
+        if method == "POST" and not parts:
+            self.create_class(body)
+            return 200, body
+        class_name = parts[0]
+        if class_name not in self.classes:
+            return 404, None
+        if method == "GET":
+            return 200, self.classes[class_name]
+        if method == "DELETE":
+            with self._lock:
+                self._responses.clear()
+                self.classes.pop(class_name)
+                self.objects.pop(class_name, None)
+                self._matrices.pop(class_name, None)
+            return 200, None
+        if method == "POST" and parts[1:] == ["properties"]:
+            with self._lock:
+                self.classes[class_name].setdefault("properties", []).append(body)
+                self._responses.clear()
+            return 200, body
+        return 404, None
+
+    def _batch(self, body):
+        results = []
+        by_class: Dict[str, List[dict]] = {}
+        for obj in body["objects"]:
+            obj = dict(obj)
+            obj["id"] = obj.get("id") or str(uuid_lib.uuid4())
+            by_class.setdefault(obj["class"], []).append(obj)
+            results.append({**obj, "result": {}})
+        for class_name, objects in by_class.items():
+            self.add_objects(class_name, objects)
+        return 200, results
+
+    def _matrix(self, class_name: str) -> Tuple[List[str], np.ndarray]:
+        with self._lock:
+            if class_name not in self._matrices:
+                objects = self.objects.get(class_name, {})
+                ids = [i for i, obj in objects.items() if obj["vector"] is not None]
+                matrix = np.array(
+                    [objects[i]["vector"] for i in ids], dtype=np.float32
+                ).reshape(len(ids), -1)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                self._matrices[class_name] = (ids, matrix / np.where(norms, norms, 1))
+            return self._matrices[class_name]
+
+    def _term_scores(self, class_name: str, query: str) -> Dict[str, float]:
+        terms = set(_WORD.findall(query.lower()))
+        scores = {}
+        for object_id, obj in self.objects.get(class_name, {}).items():
+            text = " ".join(str(v) for v in obj["properties"].values()).lower()
+            scores[object_id] = float(len(terms & set(_WORD.findall(text))))
+        return scores
+
+    def _vector_scores(self, class_name: str, vector: List[float]) -> Dict[str, float]:
+        ids, matrix = self._matrix(class_name)
+        if not ids:
+            return {}
+        query = np.asarray(vector, dtype=np.float32)
+        similarity = matrix @ (query / (np.linalg.norm(query) or 1))
+        return dict(zip(ids, similarity.tolist()))
+
+    def _graphql(self, query: str) -> dict:
+        aggregate = _AGGREGATE.search(query)
+        if aggregate is not None:
+            class_name = aggregate.group(1)
+            count = len(self.objects.get(class_name, {}))
+            return {"data": {"Aggregate": {class_name: [{"meta": {"count": count}}]}}}
+        class_name, arguments, selection = parse_get(query)
+        if class_name not in self.classes:
+            return {"errors": [{"message": f"Cannot query field {class_name!r}"}]}
+        limit_match = _LIMIT.search(arguments)
+        limit = int(limit_match.group(1)) if limit_match else DEFAULT_LIMIT
+        objects = self.objects.get(class_name, {})
+        vector_match = _VECTOR.search(arguments)
+        vector = (
+            [float(x) for x in vector_match.group(1).split(",") if x.strip()]
+            if vector_match
+            else None
+        )
+        query_match = _QUERY.search(arguments)
+        distances: Dict[str, float] = {}
+        scores: Dict[str, float] = {}
+        if "nearVector" in arguments and vector is not None:
+            similarity = self._vector_scores(class_name, vector)
+            distances = {i: 1.0 - s for i, s in similarity.items()}
+            ids = sorted(distances, key=distances.get)
+        elif query_match is not None:
+            scores = self._term_scores(class_name, query_match.group(1))
+            if "hybrid" in arguments and vector is not None:
+                similarity = self._vector_scores(class_name, vector)
+                top = max(scores.values(), default=0.0) or 1.0
+                scores = {
+                    i: 0.5 * s / top + 0.5 * similarity.get(i, 0.0)
+                    for i, s in scores.items()
+                }
+            ids = sorted(scores, key=scores.get, reverse=True)
+        else:
+            # Cursor order: by id, starting after the `after` id
+            ids = sorted(objects)
+            after = _AFTER.search(arguments)
+            if after is not None:
+                ids = [i for i in ids if i > after.group(1)]
+        rows = []
+        additional = selection.get("_additional") or {}
+        for object_id in ids[:limit]:
+            obj = objects[object_id]
+            row = {
+                name: obj["properties"].get(name)
+                for name in selection
+                if name != "_additional"
+            }
+            if additional:
+                extra = {}
+                for field in additional:
+                    if field == "id":
+                        extra["id"] = object_id
+                    elif field == "vector":
+                        extra["vector"] = obj["vector"]
+                    elif field == "distance":
+                        extra["distance"] = distances.get(object_id)
+                    elif field == "score":
+                        extra["score"] = str(scores.get(object_id, 0.0))
+                row["_additional"] = extra
+            rows.append(row)
+        return {"data": {"Get": {class_name: rows}}}
+
+
+class FakeOpenAI(FakeServer):
+    """OpenAI-compatible chat completions, streamed at a fixed token rate
+
+    Each completion waits `time_to_first_token`, then streams `tokens` chunks at
+    `tokens_per_second`. Embeddings come from a HashEmbedder.
+    """
+
+    def __init__(
+        self,
+        time_to_first_token: float = 0.05,
+        tokens_per_second: float = 200.0,
+        tokens: int = 64,
+        dimensions: int = 256,
+        latency: float = 0.0,
+    ) -> None:
+        self.time_to_first_token = time_to_first_token
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.embedder = HashEmbedder(dimensions)
+        self.completions = 0
+        super().__init__(latency)
+
+    def completion_tokens(self, messages: List[dict]) -> List[str]:
+        """A Dockerfile-shaped answer, so downstream parsing has work to do"""
+        lines = ["```dockerfile\n", "FROM alpine:3.19\n"]
+        words = _WORD.findall(messages[-1]["content"]) or ["build"]
+        while len(lines) < self.tokens - 1:
+            lines.append(f"RUN echo {words[len(lines) % len(words)]}\n")
+        return (lines + ["```\n"])[: self.tokens]
+
+    def handle(self, method: str, path: str, body, handler):
+        path = path.split("?")[0]
+        if path == "/v1/models":
+            return 200, {"object": "list", "data": [{"id": "fake", "object": "model"}]}
+        if path == "/v1/embeddings":
+            texts = (
+                body["input"] if isinstance(body["input"], list) else [body["input"]]
+            )
+            vectors = self.embedder(texts)
+            return 200, {
+                "object": "list",
+                "model": body["model"],
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": vector}
+                    for i, vector in enumerate(vectors)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        if path == "/v1/chat/completions":
+            self.completions += 1
+            self._stream(body, handler)
+            return None, None
+        return 404, {"error": {"message": f"{method} {path} is not faked"}}
+
+    def _stream(self, body: dict, handler) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def send(data: str) -> None:
+            payload = f"data: {data}\n\n".encode("utf-8")
+            handler.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            handler.wfile.flush()
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+            return json.dumps(
+                {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+            )
+
+        time.sleep(self.time_to_first_token)
+        started = time.perf_counter()
+        try:
+            send(chunk({"role": "assistant", "content": ""}))
+            for n, token in enumerate(self.completion_tokens(body["messages"])):
+                # Paced against the start, so sleep overshoot does not accumulate
+                delay = started + n / self.tokens_per_second - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                send(chunk({"content": token}))
+            send(chunk({}, "stop"))
+            send("[DONE]")
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early
+            handler.close_connection = True
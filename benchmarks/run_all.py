@@ -0,0 +1,76 @@
+"""Run the offline suite and save the results for comparison across commits.
+
+Every benchmark talks to in-process stand-ins for Weaviate and the model server,
+so the suite needs neither Docker nor network access. Results are written to
+`benchmarks/results/<commit>.json`; pass an earlier file to `--compare` to flag
+metrics that got worse by more than `--threshold`.
+
+Usage: python -m benchmarks.run_all [--quick] [--only query,cache] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict
+
+from benchmarks import bench_cache, bench_ingest, bench_prompt, bench_query
+from benchmarks.common import compare, git_commit, write_results
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, float]]] = {
+    "query": bench_query.run,
+    "cache": bench_cache.run,
+    "ingest": bench_ingest.run,
+    "prompt": bench_prompt.run,
+}
+
+# Smaller workloads for a quick check before committing
+QUICK: Dict[str, dict] = {
+    "query": {"rows": 500, "repeat": 3},
+    "cache": {"requests": 500, "distinct": 200, "rows": 500},
+    "ingest": {"cards": 1000},
+    "prompt": {"prompts": 16},
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--only", default=",".join(BENCHMARKS))
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    settings = {name: QUICK[name] if args.quick else {} for name in names}
+
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        results[name] = BENCHMARKS[name](**settings[name])
+        print(f"{name}: {time.perf_counter() - start:.1f}s")
+        for metric, value in results[name].items():
+            print(f"  {metric:<32} {value:12.3f}")
+
+    output = args.output or f"benchmarks/results/{git_commit() or 'local'}.json"
+    write_results(output, results, settings)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as reader:
+            baseline = json.load(reader)
+        with open(output, "r") as reader:
+            current = json.load(reader)
+        print(f"Compared with {baseline.get('commit')} ({args.compare}):")
+        lines = compare(baseline, current, args.threshold)
+        for line in lines:
+            print(line)
+        if any(line.endswith("REGRESSION") for line in lines):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import weaviate  # type: ignore[import]
+import typer
+import os
+import sys
+import json
+
+from wasabi import msg  # type: ignore[import]
+
+from dotenv import load_dotenv
+from weaviate.util import generate_uuid5  # type: ignore[import]
+
+from ingest import BatchWriter
+
+# The embedding helpers are shared with the app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from aimstream.llm import EMBEDDING_MODEL, create_client, embed  # noqa: E402
+from aimstream.retrieval import (  # noqa: E402
+    EXAMPLE_PROMPTS,
+    PromptEmbeddings,
+    embedding_text,
+)
+
+load_dotenv("../.env")
+
+
+def main(
+    references_file: str = "reference_dockerfiles.json",
+    schema_file: str = "dockerfile_schema.json",
+    embeddings_file: str = "example_embeddings.json",
+    batch_size: int = 100,
+) -> None:
+    msg.divider("Starting reference Dockerfile import")
+
+    # Connect to Weaviate
+    url = os.environ.get("WEAVIATE_URL", "")
+    auth_config = weaviate.AuthApiKey(api_key=os.environ.get("WEAVIATE_API_KEY", ""))
+
+    if url == "":
+        msg.fail("Environment Variables not set.")
+        msg.warn(f"URL: {url}")
+        return
+
+    client = weaviate.Client(url=url, auth_client_secret=auth_config)
+
+    msg.good("Client connected to Weaviate Server")
+
+    with open(schema_file, "r") as reader:
+        class_obj = json.load(reader)
+    class_name = class_obj["class"]
+    if client.schema.exists(class_name):
+        msg.info(f"{class_name} class already exists")
+    else:
+        client.schema.create_class(class_obj)
+        msg.good(f"{class_name} class created")
+
+    # References and prompts are embedded with the local model the app queries with
+    llm_client = create_client()
+
+    with open(references_file, "r") as reader:
+        references = json.load(reader)
+
+    writer = BatchWriter(
+        client,
+        class_name,
+        batch_size=batch_size,
+        uuid_for=lambda obj: generate_uuid5(obj["title"], class_name),
+    )
+    for reference in references:
+        writer.add(
+            reference,
+            source=reference["title"],
+            vector=embed(llm_client, embedding_text(reference)),
+        )
+    writer.flush()
+    msg.good(f"Imported {writer.stats.imported} reference Dockerfiles")
+
+    embeddings = PromptEmbeddings.build(
+        EXAMPLE_PROMPTS, lambda prompt: embed(llm_client, prompt), EMBEDDING_MODEL
+    )
+    embeddings.save(embeddings_file)
+    msg.good(f"Saved {len(embeddings)} example prompt embeddings to {embeddings_file}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
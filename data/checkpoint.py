@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+import time
+from typing import Iterable, Set
+
+from weaviate.util import generate_uuid5  # type: ignore[import]
+
+IMPORTED = "imported"
+NOT_FOUND = "not_found"
+
+
+def card_key(card_name: str) -> str:
+    """Normalize a card name the same way everywhere it is used as a key"""
+    return card_name.lower().strip()
+
+
+def card_uuid(card_name: str, class_name: str = "MagicChat_Card") -> str:
+    """Deterministic object UUID for a card, so re-imports overwrite instead of duplicating
+    @parameter card_name : str - Card name
+    @parameter class_name : str - Weaviate class the object belongs to
+    @returns str - UUID5 derived from the normalized name and class
+    """
+    return generate_uuid5(card_key(card_name), class_name)
+
+
+class Checkpoint:
+    """Local SQLite record of the card names already processed by an ingestion run"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cards ("
+            "key TEXT PRIMARY KEY, status TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def processed(self) -> Set[str]:
+        """Keys of every card that was imported or confirmed missing
+        @returns set - Normalized card names
+        """
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT key FROM cards")}
+
+    def count(self, status: str = IMPORTED) -> int:
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM cards WHERE status = ?", (status,)
+            ).fetchone()
+            return count
+
+    def mark(self, card_names: Iterable[str], status: str = IMPORTED) -> None:
+        """Record `card_names` with `status` in a single transaction
+        @parameter card_names : Iterable[str] - Card names, normalized before storing
+        @parameter status : str - IMPORTED or NOT_FOUND
+        @returns None
+        """
+        now = time.time()
+        rows = [(card_key(card_name), status, now) for card_name in card_names]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cards (key, status, updated) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,375 @@
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import requests  # type: ignore[import]
+import weaviate  # type: ignore[import]
+from requests.adapters import HTTPAdapter  # type: ignore[import]
+from urllib3.util.retry import Retry  # type: ignore[import]
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from aimstream import metrics  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+_SEPARATORS = re.compile(r"[\s\[\],]*")
+
+FETCH_SECONDS = metrics.histogram(
+    "aimstream_ingest_fetch_seconds", "Latency of fetching one card"
+)
+FLUSH_SECONDS = metrics.histogram(
+    "aimstream_ingest_flush_seconds",
+    "Time spent per batch in each flush stage",
+    ("stage",),
+)
+BATCH_SIZE = metrics.histogram(
+    "aimstream_ingest_batch_size",
+    "Objects imported per Weaviate batch",
+    buckets=metrics.SIZE_BUCKETS,
+)
+QUEUE_DEPTH = metrics.gauge(
+    "aimstream_ingest_queued", "Items waiting between pipeline stages", ("queue",)
+)
+CARDS = metrics.counter(
+    "aimstream_ingest_cards_total", "Cards through the pipeline by outcome", ("result",)
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second on average"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it
+        @returns None
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class IngestStats:
+    """Counters shared by the pipeline stages"""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.fetched = 0
+        self.not_found = 0
+        self.failed = 0
+        self.imported = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+        for name, count in counts.items():
+            if name != "batches":
+                CARDS.labels(name).inc(count)
+
+    def throughput(self) -> float:
+        """Imported cards per second since the pipeline started"""
+        elapsed = time.monotonic() - self.started
+        return self.imported / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.imported} imported in {self.batches} batches, "
+            f"{self.not_found} not found, {self.failed} failed, "
+            f"{self.throughput():.1f} cards/s"
+        )
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """Create a keep-alive session whose pool fits all concurrent fetchers
+    @parameter pool_size : int - Maximum number of pooled connections
+    @returns requests.Session - Shared HTTP session
+    """
+    session = requests.Session()
+    # Rate limits and server errors are retried a few times, honoring Retry-After
+    retries = Retry(
+        total=3,
+        backoff_factor=1.0,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class BatchWriter:
+    """Buffers card objects and imports them to Weaviate by size or age"""
+
+    def __init__(
+        self,
+        client: weaviate.Client,
+        class_name: str,
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+        stats: Optional[IngestStats] = None,
+        on_flush: Optional[Callable[[list], None]] = None,
+        uuid_for: Optional[Callable[[dict], str]] = None,
+        vectors_for: Optional[Callable[[List[dict]], list]] = None,
+    ) -> None:
+        self.client = client
+        self.class_name = class_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = stats or IngestStats()
+        self.on_flush = on_flush
+        self.uuid_for = uuid_for
+        self.vectors_for = vectors_for
+        self._buffer: list = []
+        self._last_flush = time.monotonic()
+
+    def add(self, weaviate_obj: dict, source=None, vector=None) -> None:
+        """Buffer an object, flushing once the batch is full
+        @parameter weaviate_obj : dict - Formatted dict with the same keys as the schema
+        @parameter source : Any - What `on_flush` reports for this object, defaults to its name
+        @parameter vector : list - Optional precomputed vector, for classes without a vectorizer
+        @returns None
+        """
+        self._buffer.append((weaviate_obj, source or weaviate_obj["name"], vector))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush_if_due(self) -> None:
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Import every buffered object in one Weaviate batch
+        @returns None
+        """
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        items, self._buffer = self._buffer, []
+        with metrics.span("ingest.flush", size=len(items)):
+            if self.vectors_for is not None:
+                # Vectors for the whole batch in one call, e.g. through an EmbeddingStage
+                missing = [
+                    n for n, (_, _, vector) in enumerate(items) if vector is None
+                ]
+                if missing:
+                    started = time.perf_counter()
+                    vectors = self.vectors_for([items[n][0] for n in missing])
+                    for n, vector in zip(missing, vectors):
+                        items[n] = (items[n][0], items[n][1], vector)
+                    FLUSH_SECONDS.labels("embed").observe(time.perf_counter() - started)
+            started = time.perf_counter()
+            errors = self._write(items)
+            FLUSH_SECONDS.labels("write").observe(time.perf_counter() - started)
+        accepted = [item for item, error in zip(items, errors) if error is None]
+        rejected = [error for error in errors if error is not None]
+        if rejected:
+            logger.warning(
+                "Weaviate rejected %d of %d objects: %s",
+                len(rejected),
+                len(items),
+                rejected[0],
+            )
+        BATCH_SIZE.observe(len(accepted))
+        self.stats.add(imported=len(accepted), failed=len(rejected), batches=1)
+        if self.on_flush is not None and accepted:
+            # Only accepted objects are checkpointed, so rejected ones are retried
+            self.on_flush([source for _, source, _ in accepted])
+
+    def _write(self, items: list) -> List[Optional[str]]:
+        """Send `items` in one batch and return the error of each object, None if it was stored"""
+        errors: dict = {}
+
+        def collect(results) -> None:
+            for result in results or []:
+                messages = (result.get("result") or {}).get("errors") or {}
+                if messages:
+                    errors[result.get("id")] = "; ".join(
+                        error.get("message", "") for error in messages.get("error", [])
+                    )
+
+        # The default callback only prints per-object errors
+        self.client.batch.configure(batch_size=None, callback=collect)
+        try:
+            with self.client.batch as batch:
+                ids = [
+                    batch.add_data_object(
+                        weaviate_obj,
+                        self.class_name,
+                        uuid=self.uuid_for(weaviate_obj) if self.uuid_for else None,
+                        vector=vector,
+                    )
+                    for weaviate_obj, _, vector in items
+                ]
+        finally:
+            self.client.batch.configure(batch_size=None)
+        return [
+            (errors[str(uuid)] or "rejected") if str(uuid) in errors else None
+            for uuid in ids
+        ]
+
+
+def run_pipeline(
+    card_names: Iterable[str],
+    fetch: Callable[[str, requests.Session], Optional[dict]],
+    writer: BatchWriter,
+    workers: int = 8,
+    rate: float = 10.0,
+    queue_size: int = 1000,
+    on_progress: Optional[Callable[[IngestStats], None]] = None,
+) -> IngestStats:
+    """Fetch cards concurrently under a rate limit and import them through `writer`
+    @parameter card_names : Iterable[str] - Names to fetch, consumed lazily
+    @parameter fetch : Callable - Returns the Weaviate object for a name, or None
+    @parameter writer : BatchWriter - The single stage writing to Weaviate
+    @parameter workers : int - Number of concurrent fetchers
+    @parameter rate : float - Maximum fetch requests per second across all workers
+    @parameter queue_size : int - Bound of the queues linking the stages
+    @parameter on_progress : Callable - Called with the stats after every written card
+    @returns IngestStats - Final counters
+    """
+    stats = writer.stats
+    bucket = TokenBucket(rate)
+    session = create_session(workers)
+    names: queue.Queue = queue.Queue(maxsize=queue_size)
+    cards: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    def fetcher() -> None:
+        try:
+            while True:
+                card_name = names.get()
+                if card_name is _DONE:
+                    return
+                bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    card = fetch(card_name, session)
+                except Exception as e:
+                    # One bad card must not stop the fetcher; the card is retried next run
+                    if not isinstance(e, requests.RequestException):
+                        logger.warning("Fetching %r failed: %r", card_name, e)
+                    stats.add(failed=1)
+                    continue
+                finally:
+                    FETCH_SECONDS.observe(time.perf_counter() - started)
+                if card is None:
+                    stats.add(not_found=1)
+                else:
+                    stats.add(fetched=1)
+                    cards.put((card_name, card))
+        finally:
+            # The writer waits for one _DONE per fetcher
+            cards.put(_DONE)
+
+    threads = [
+        threading.Thread(target=fetcher, name=f"fetcher-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    def producer() -> None:
+        for card_name in card_names:
+            names.put(card_name)
+        for _ in threads:
+            names.put(_DONE)
+
+    threading.Thread(target=producer, name="producer", daemon=True).start()
+
+    finished = 0
+    while finished < len(threads):
+        try:
+            item = cards.get(timeout=writer.flush_interval)
+        except queue.Empty:
+            writer.flush_if_due()
+            continue
+        if item is _DONE:
+            finished += 1
+            continue
+        card_name, card = item
+        QUEUE_DEPTH.labels("names").set(names.qsize())
+        QUEUE_DEPTH.labels("cards").set(cards.qsize())
+        writer.add(card, source=card_name)
+        writer.flush_if_due()
+        if on_progress is not None:
+            on_progress(stats)
+    writer.flush()
+    session.close()
+    return stats
+
+
+def iter_json_objects(path: str, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """Stream the objects of a JSON array or NDJSON file without loading it whole
+    @parameter path : str - Path to the dump, e.g. a Scryfall bulk data export
+    @parameter chunk_size : int - Number of characters read at a time
+    @returns Iterator[dict] - One decoded object at a time
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    with open(path, "r", encoding="utf-8") as reader:
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos < len(buffer):
+                try:
+                    obj, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield obj
+                    continue
+            elif eof:
+                return
+            chunk = reader.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def write_all(
+    objects: Iterable[dict],
+    writer: BatchWriter,
+    on_progress: Optional[Callable[[IngestStats], None]] = None,
+) -> IngestStats:
+    """Import already-built Weaviate objects through `writer`, e.g. from a bulk dump
+    @parameter objects : Iterable[dict] - Objects to import, consumed lazily
+    @parameter writer : BatchWriter - The stage writing to Weaviate
+    @parameter on_progress : Callable - Called with the stats after every object
+    @returns IngestStats - Final counters
+    """
+    for weaviate_obj in objects:
+        writer.stats.add(fetched=1)
+        writer.add(weaviate_obj)
+        if on_progress is not None:
+            on_progress(writer.stats)
+    writer.flush()
+    return writer.stats
@@ -0,0 +1,83 @@
+import typer
+import os
+import sys
+import json
+import time
+
+from wasabi import msg  # type: ignore[import]
+
+from dotenv import load_dotenv
+
+# The migration runs through the same connection the app reads with
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from st_weaviate_connection import WeaviateConnection  # noqa: E402
+from st_weaviate_connection.connection import DEFAULT_ALIAS_TTL  # noqa: E402
+from st_weaviate_connection.migration import migrate  # noqa: E402
+
+load_dotenv("../.env")
+
+
+def main(
+    schema_file: str = "weaviate_schema.json",
+    batch_size: int = 500,
+    page_size: int = 1000,
+    dry_run: bool = False,
+    drop_previous: bool = False,
+) -> None:
+    msg.divider("Starting schema migration")
+
+    # Connect to Weaviate
+    url = os.environ.get("WEAVIATE_URL", "")
+    openai_key = os.environ.get("OPENAI_KEY", "")
+
+    if openai_key == "" or url == "":
+        msg.fail("Environment Variables not set.")
+        msg.warn(f"URL: {url}")
+        msg.warn(f"OPENAI API KEY: {openai_key}")
+        return
+
+    connection = WeaviateConnection(
+        "migrate_schema",
+        url=url,
+        api_key=os.environ.get("WEAVIATE_API_KEY") or None,
+        additional_headers={"X-OpenAI-Api-Key": openai_key},
+    )
+
+    msg.good("Client connected to Weaviate Server")
+
+    with open(schema_file, "r") as reader:
+        class_obj = json.load(reader)
+
+    def on_progress(report) -> None:
+        msg.text(
+            f"Copied {report.copied} objects ({report.throughput():.0f} objects/s)"
+        )
+
+    report = migrate(
+        connection,
+        class_obj,
+        batch_size=batch_size,
+        page_size=page_size,
+        dry_run=dry_run,
+        on_progress=on_progress,
+    )
+    if not report.diff.changed:
+        msg.good(f"{class_obj['class']} is up to date")
+        return
+    for change in report.diff.describe():
+        msg.info(change)
+    if dry_run:
+        msg.warn("Dry run, nothing changed")
+        return
+    msg.good(report.summary())
+
+    if drop_previous and report.target != report.source:
+        # Readers pick up the new alias within their alias TTL
+        msg.info(f"Waiting {2 * DEFAULT_ALIAS_TTL}s for readers to switch")
+        time.sleep(2 * DEFAULT_ALIAS_TTL)
+        connection.delete_class(report.source)
+        msg.good(f"{report.source} class deleted")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,151 @@
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# The five colors only: colorless symbols like {C} are stored as they are
+COLOR_NAMES = {
+    "W": "White",
+    "U": "Blue",
+    "B": "Black",
+    "R": "Red",
+    "G": "Green",
+}
+# Stored for cards without a mana cost, e.g. lands
+NO_MANA_COST = "0"
+
+# Weaviate data type of every property, matching weaviate_schema.json
+CARD_DATA_TYPES = {
+    "name": "text",
+    "card_id": "text",
+    "img": "text",
+    "mana_cost": "text",
+    "type": "text",
+    "mana_produced": "text[]",
+    "power": "number",
+    "toughness": "number",
+    "power_text": "text",
+    "toughness_text": "text",
+    "color": "text[]",
+    "keyword": "text[]",
+    "set": "text",
+    "rarity": "text",
+    "description": "text",
+}
+
+# Built once: every color symbol to its name in a single C-level pass
+MANA_TABLE = str.maketrans(COLOR_NAMES)
+# Joins a column so it is translated with one call; never part of a mana cost
+_SEPARATOR = "\x1f"
+
+# Parsed power/toughness values; the same few dozen strings cover every card
+_NUMBERS: Dict[str, Optional[float]] = {str(n): float(n) for n in range(-1, 21)}
+# Properties left out of an object when the card has no value for them
+_OPTIONAL = ("power", "toughness", "power_text", "toughness_text")
+
+
+def to_number(value: Any) -> Optional[float]:
+    """Power or toughness as a number, or None for values like `*` or `1+*`"""
+    if value is None:
+        return None
+    text = str(value)
+    if text in _NUMBERS:
+        return _NUMBERS[text]
+    try:
+        number: Optional[float] = float(text)
+    except ValueError:
+        number = None
+    if number is not None and not math.isfinite(number):
+        number = None
+    _NUMBERS[text] = number
+    return number
+
+
+def to_text(value: Any) -> Optional[str]:
+    """Power or toughness as printed, e.g. `1+*`, kept next to its numeric value"""
+    return None if value is None else str(value)
+
+
+def translate_mana(values: List[str]) -> List[str]:
+    """Spell out the color symbols of a whole column of mana costs at once"""
+    if not values:
+        return []
+    return _SEPARATOR.join(values).translate(MANA_TABLE).split(_SEPARATOR)
+
+
+def color_names(symbols: Optional[Iterable[str]]) -> List[str]:
+    return [COLOR_NAMES.get(symbol, symbol) for symbol in symbols or ()]
+
+
+def normalize_cards(cards: List[dict]) -> Dict[str, list]:
+    """Convert a batch of raw Scryfall cards into columns typed like the Weaviate schema
+    @parameter cards : List[dict] - Cards as returned by the scryfall API or bulk data
+    @returns Dict[str, list] - One list per property of CARD_DATA_TYPES, in card order
+    """
+    get = dict.get
+    return {
+        "name": [get(card, "name", "Unknown") for card in cards],
+        "card_id": [str(get(card, "arena_id", "0")) for card in cards],
+        "img": [get(card, "image_uris", {}).get("normal", "") for card in cards],
+        "mana_cost": translate_mana(
+            [get(card, "mana_cost", NO_MANA_COST) for card in cards]
+        ),
+        "type": [get(card, "type_line", "") for card in cards],
+        "mana_produced": [color_names(get(card, "produced_mana")) for card in cards],
+        "power": [to_number(get(card, "power")) for card in cards],
+        "toughness": [to_number(get(card, "toughness")) for card in cards],
+        "power_text": [to_text(get(card, "power")) for card in cards],
+        "toughness_text": [to_text(get(card, "toughness")) for card in cards],
+        "color": [color_names(get(card, "colors")) for card in cards],
+        "keyword": [list(get(card, "keywords") or ()) for card in cards],
+        "set": [get(card, "set_name", "") for card in cards],
+        "rarity": [get(card, "rarity", "") for card in cards],
+        "description": [get(card, "oracle_text", "") for card in cards],
+    }
+
+
+def to_objects(columns: Dict[str, list]) -> List[dict]:
+    """Pivot normalized columns into Weaviate objects, leaving out missing values"""
+    names = list(columns)
+    objects = [dict(zip(names, row)) for row in zip(*columns.values())]
+    for name in _OPTIONAL:
+        for obj in objects:
+            if obj[name] is None:
+                del obj[name]
+    return objects
+
+
+def normalize_card(card: dict) -> dict:
+    """Map one raw Scryfall card to the Weaviate schema, like `normalize_cards` does a batch"""
+    get = card.get
+    obj = {
+        "name": get("name", "Unknown"),
+        "card_id": str(get("arena_id", "0")),
+        "img": get("image_uris", {}).get("normal", ""),
+        "mana_cost": get("mana_cost", NO_MANA_COST).translate(MANA_TABLE),
+        "type": get("type_line", ""),
+        "mana_produced": color_names(get("produced_mana")),
+        "power": to_number(get("power")),
+        "toughness": to_number(get("toughness")),
+        "power_text": to_text(get("power")),
+        "toughness_text": to_text(get("toughness")),
+        "color": color_names(get("colors")),
+        "keyword": list(get("keywords") or ()),
+        "set": get("set_name", ""),
+        "rarity": get("rarity", ""),
+        "description": get("oracle_text", ""),
+    }
+    for name in _OPTIONAL:
+        if obj[name] is None:
+            del obj[name]
+    return obj
+
+
+def normalize_batches(cards: Iterable[dict], batch_size: int = 500) -> Iterator[dict]:
+    """Normalize a stream of raw cards a batch at a time, yielding Weaviate objects"""
+    batch: List[dict] = []
+    for card in cards:
+        batch.append(card)
+        if len(batch) >= batch_size:
+            yield from to_objects(normalize_cards(batch))
+            batch = []
+    if batch:
+        yield from to_objects(normalize_cards(batch))
@@ -4,78 +4,136 @@ import os
 import json
 import requests
 import random
+import sys
+
+from typing import Iterator, Optional
 
 from wasabi import msg  # type: ignore[import]
 
 from dotenv import load_dotenv
 from tqdm import tqdm
 
+from checkpoint import NOT_FOUND, Checkpoint, card_key, card_uuid
+from ingest import BatchWriter, iter_json_objects, run_pipeline, write_all
+from normalize import normalize_batches, normalize_card
+
+# The card name index and class aliases are shared with the app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from aimstream import metrics  # noqa: E402
+from aimstream.card_index import CardIndex  # noqa: E402
+from aimstream.embeddings import (  # noqa: E402
+    OPENAI_EMBEDDING_MODEL,
+    EmbeddingCache,
+    EmbeddingStage,
+    vectorized_properties,
+    vectorized_text,
+)
+from aimstream.llm import OPENAI_BASE_URL, create_client, embed_batch  # noqa: E402
+from st_weaviate_connection.aliases import resolve as resolve_class  # noqa: E402
+
 load_dotenv("../.env")
 
 
-def get_card_details(card_name) -> dict:
+def to_weaviate_object(card_data: dict) -> dict:
+    """Map a raw scryfall card to the Weaviate schema
+    @parameter card_data : dict - Card as returned by the scryfall API or bulk data
+    @returns dict - A dictionary with the card information formatted to the correct Weaviate schema
+    """
+    return normalize_card(card_data)
+
+
+def get_card_details(
+    card_name, session: requests.Session = None, index: Optional[CardIndex] = None
+) -> dict:
     """Retrieve information from the scryfall API about a card through its name
     @parameter card_name : str - Card name
-    @returns dict - A dictionary with the card information formatted to the correct Weaviate schema
+    @parameter session : requests.Session - Optional shared keep-alive session
+    @parameter index : CardIndex - Optional local name index; names it resolves are looked up exactly
+    @returns dict - A dictionary with the card information formatted to the correct Weaviate schema, None if there is no such card
     """
-    # Construct the URL for the API request
-    url = f"https://api.scryfall.com/cards/named?fuzzy={card_name}"
+    # Only names the local index cannot resolve need the remote fuzzy matcher
+    resolved = index.resolve(card_name) if index is not None else None
+    params = {"exact": resolved} if resolved is not None else {"fuzzy": card_name}
 
     # Send a GET request to the API
-    response = requests.get(url)
-
-    mana_dict = {"W": "White", "B": "Black", "R": "Red", "G": "Green", "U": "Blue"}
+    response = (session or requests).get(
+        "https://api.scryfall.com/cards/named", params=params, timeout=30
+    )
 
     # If the request was successful, the status code will be 200
     if response.status_code == 200:
         # Parse the response as JSON
-        card_data = response.json()
-
-        weaviate_object = {
-            "name": card_data.get("name", "Unknown"),
-            "card_id": str(card_data.get("arena_id", "0")),
-            "img": card_data.get("image_uris", {"normal": ""}).get("normal", ""),
-            "mana_cost": card_data.get("mana_cost", "0"),
-            "type": card_data.get("type_line", ""),
-            "mana_produced": str(card_data.get("produced_mana", "")),
-            "power": card_data.get("power", "0"),
-            "toughness": card_data.get("toughness", "0"),
-            "color": str(card_data.get("colors", "")),
-            "keyword": str(card_data.get("keywords", "")),
-            "set": card_data.get("set_name", ""),
-            "rarity": card_data.get("rarity", ""),
-            "description": card_data.get("oracle_text", ""),
-        }
-
-        for color_code in mana_dict:
-            weaviate_object["mana_produced"] = weaviate_object["mana_produced"].replace(
-                color_code, mana_dict[color_code]
-            )
-            weaviate_object["mana_cost"] = weaviate_object["mana_cost"].replace(
-                color_code, mana_dict[color_code]
-            )
-            weaviate_object["color"] = weaviate_object["color"].replace(
-                color_code, mana_dict[color_code]
-            )
-        return weaviate_object
+        return to_weaviate_object(response.json())
 
-    else:
+    # Only a 404 means the card does not exist; rate limits and server errors
+    # fail the card so that a later run retries it
+    if response.status_code == 404:
         return None
+    raise requests.HTTPError(
+        f"Scryfall returned {response.status_code} for {card_name!r}",
+        response=response,
+    )
+
+
+def iter_bulk_cards(bulk_file: str, card_names: list) -> Iterator[dict]:
+    """Stream cards from a local scryfall bulk dump, keeping the first printing of each wanted name
+    @parameter bulk_file : str - Path to a JSON array or NDJSON bulk export
+    @parameter card_names : list - Names to import, as listed in all_cards.json
+    @returns Iterator[dict] - Weaviate objects for the matching cards
+    """
+    wanted = {card_name.lower().strip() for card_name in card_names}
+
+    def matches() -> Iterator[dict]:
+        for card_data in iter_json_objects(bulk_file):
+            key = str(card_data.get("name", "")).lower().strip()
+            if key in wanted:
+                wanted.discard(key)
+                yield card_data
+
+    # Matching cards are normalized a batch at a time rather than one by one
+    return normalize_batches(matches())
 
 
-def add_card_to_weaviate(weaviate_obj: dict, client: weaviate.Client) -> None:
-    """Import a card object to Weaviate
-    @parameter weaviate_obj : diuct - Formatted dict with the same keys as the schema
+def get_imported_card_names(
+    client: weaviate.Client, class_name: str = "MagicChat_Card", page_size: int = 1000
+) -> set:
+    """Collect the names of all cards already in Weaviate using cursor pagination
     @parameter client : weaviate.Client - Weaviate Client
-    @returns None
+    @parameter class_name : str - Class holding the cards
+    @parameter page_size : int - Number of objects fetched per request
+    @returns set - Lowercased, stripped card names
     """
-    with client.batch as batch:
-        batch.batch_size = 1
-        client.batch.add_data_object(weaviate_obj, "MagicChat_Card")
-        msg.good(f"Imported {weaviate_obj['name']} to database")
+    names = set()
+    after = None
+    while True:
+        query = (
+            client.query.get(class_name, ["name"])
+            .with_additional(["id"])
+            .with_limit(page_size)
+        )
+        if after is not None:
+            query = query.with_after(after)
+        page = query.do()["data"]["Get"][class_name]
+        if not page:
+            return names
+        names.update(str(card["name"]).lower().strip() for card in page)
+        after = page[-1]["_additional"]["id"]
 
 
-def main() -> None:
+def main(
+    workers: int = 8,
+    rate: float = 10.0,
+    batch_size: int = 100,
+    flush_interval: float = 5.0,
+    bulk_file: Optional[str] = None,
+    checkpoint_file: str = "checkpoint.sqlite",
+    sync_checkpoint: bool = False,
+    index_file: str = "card_index.bin",
+    embeddings_dir: str = "embeddings",
+    upload_vectors: bool = True,
+    metrics_file: str = "",
+    trace_file: str = "",
+) -> None:
     msg.divider("Starting card retrieval")
 
     # Connect to Weaviate
@@ -97,38 +155,124 @@ def main() -> None:
 
     msg.good("Client connected to Weaviate Server")
 
-    query_results = (
-        client.query.get(
-            "MagicChat_Card",
-            ["name"],
-        )
-        .with_limit(30000)
-        .do()
-    )
+    exporter = None
+    if metrics_file:
+        # Prometheus text format, e.g. for node_exporter's textfile collector
+        metrics.configure(enabled=True)
+        exporter = metrics.FileExporter(metrics_file)
+    if trace_file:
+        metrics.configure(trace_file=trace_file)
 
-    unique_cards = set(
-        [
-            str(card["name"]).lower().strip()
-            for card in query_results["data"]["Get"]["MagicChat_Card"]
-        ]
-    )
+    # Write to whichever class currently serves MagicChat_Card after migrations
+    class_name = resolve_class(client, "MagicChat_Card")
+    msg.info(f"Importing into {class_name}")
+
+    index = CardIndex.open(index_file, "all_cards.json")
+    msg.info(f"Loaded the name index of {len(index)} cards from {index_file}")
+
+    checkpoint = Checkpoint(checkpoint_file)
+    if sync_checkpoint:
+        # One-off full scan, e.g. for a collection imported before checkpoints existed
+        checkpoint.mark(index.dedupe(get_imported_card_names(client, class_name)))
+
+    processed = checkpoint.processed()
 
-    msg.info(f"Loaded {len(query_results['data']['Get']['MagicChat_Card'])} cards")
+    msg.info(f"Loaded {checkpoint.count()} imported cards from {checkpoint_file}")
 
     with open("all_cards.json", "r") as reader:
         all_cards = json.load(reader)["data"]
 
-    msg.info(f"{len(all_cards)-len(unique_cards)} Cards left to fetch")
+    remaining = [
+        card_name
+        for card_name in index.dedupe(all_cards)
+        if card_key(card_name) not in processed
+    ]
+    msg.info(f"{len(remaining)} Cards left to fetch")
+
+    embeddings = None
+    vectors_for = None
+    if upload_vectors:
+        # Embed client-side with the schema's model and upload the vectors, so a
+        # re-import only embeds cards whose vectorized text changed
+        with open("weaviate_schema.json", "r") as reader:
+            class_obj = json.load(reader)
+        properties = vectorized_properties(class_obj)
+        openai_client = create_client(OPENAI_BASE_URL, openai_key)
+        embeddings = EmbeddingStage(
+            lambda texts: embed_batch(openai_client, texts, OPENAI_EMBEDDING_MODEL),
+            EmbeddingCache(embeddings_dir),
+            model=OPENAI_EMBEDDING_MODEL,
+            batch_size=batch_size,
+        )
+        msg.info(
+            f"Loaded {len(embeddings.cache)} cached embeddings from {embeddings_dir}"
+        )
+
+        def vectors_for(cards: list) -> list:
+            texts = [
+                vectorized_text(card, properties, class_obj["class"]) for card in cards
+            ]
+            return embeddings.embed(texts).tolist()
+
+    writer = BatchWriter(
+        client,
+        class_name,
+        batch_size=batch_size,
+        flush_interval=flush_interval,
+        on_flush=checkpoint.mark,
+        uuid_for=lambda weaviate_obj: card_uuid(weaviate_obj["name"]),
+        vectors_for=vectors_for,
+    )
+
+    if bulk_file is not None:
+        msg.info(f"Importing offline from {bulk_file}")
+        with tqdm(total=len(remaining), unit="card") as progress:
+            stats = write_all(
+                iter_bulk_cards(bulk_file, remaining),
+                writer,
+                on_progress=lambda stats: progress.update(1),
+            )
+        msg.good(f"Finished: {stats.summary()}")
+        msg.info(f"{len(remaining) - stats.fetched} cards not found in {bulk_file}")
+        if embeddings is not None:
+            msg.info(embeddings.stats.summary())
+        if exporter is not None:
+            exporter.close()
+        checkpoint.close()
+        return
+
+    random.shuffle(remaining)
 
-    random.shuffle(all_cards)
+    def fetch(card_name: str, session: requests.Session) -> Optional[dict]:
+        card = get_card_details(card_name, session, index)
+        if card is None:
+            checkpoint.mark([card_name], NOT_FOUND)
+        return card
+
+    with tqdm(total=len(remaining), unit="card") as progress:
+
+        def on_progress(stats) -> None:
+            progress.n = stats.fetched + stats.not_found + stats.failed
+            progress.set_postfix(
+                imported=stats.imported, rate=f"{stats.throughput():.1f}/s"
+            )
+
+        stats = run_pipeline(
+            remaining,
+            fetch,
+            writer,
+            workers=workers,
+            rate=rate,
+            on_progress=on_progress,
+        )
 
-    for card_name in tqdm(all_cards):
-        if card_name.lower().strip() not in unique_cards:
-            card = get_card_details(card_name)
-            if card != None:
-                add_card_to_weaviate(card, client)
-        else:
-            msg.info(f"Skipping {card_name}")
+    checkpoint.close()
+    msg.good(f"Finished: {stats.summary()}")
+    if embeddings is not None:
+        msg.info(embeddings.stats.summary())
+    if exporter is not None:
+        exporter.close()
+        msg.info(f"Metrics written to {metrics_file}")
 
 
 if __name__ == "__main__":
@@ -1 +1,2 @@
+from .aio import AsyncWeaviateConnection
 from .connection import WeaviateConnection
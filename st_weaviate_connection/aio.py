@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from . import search
+from .cache import make_key
+from .connection import (
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_RETRIES,
+    WeaviateConnection,
+)
+
+
+class AsyncWeaviateConnection(WeaviateConnection):
+    """WeaviateConnection with coroutine variants of `query` and the search methods.
+
+    The coroutines share one pooled `httpx.AsyncClient` that lives on a background
+    event loop owned by the connection, so the pool survives Streamlit reruns. Run
+    them from a script with `gather`, which blocks until all of them are done:
+
+    >>> conn = st.connection("weaviate", type=AsyncWeaviateConnection)
+    >>> cards, shows = conn.gather(
+    ...     conn.aquery("{ Get { MagicChat_Card { name } } }"),
+    ...     conn.asearch("bm25", class_name="TVShow", query="Doug", properties=[]),
+    ... )
+
+    An httpx pool only works on the loop that created it, so coroutines awaited on
+    another event loop, e.g. with `asyncio.run`, open a client for each call. Results
+    go through the same cache and DataFrame conversion as the sync methods.
+    """
+
+    def __init__(self, connection_name: str, **kwargs) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http = None
+        self._loop_lock = threading.Lock()
+        super().__init__(connection_name, **kwargs)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._run_loop,
+                    args=(loop,),
+                    name="weaviate-async",
+                    daemon=True,
+                ).start()
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        loop.run_forever()
+        loop.close()
+
+    def _get_http(self):
+        if self._http is None:
+            self._http = self._create_http()
+        return self._http
+
+    def _create_http(self):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "AsyncWeaviateConnection requires httpx, install it with "
+                "`pip install httpx`"
+            ) from e
+
+        url = self.url or self._secrets.get("WEAVIATE_URL")
+        headers = dict(self.additional_headers or {})
+        api_key = self.api_key or self._secrets.get("WEAVIATE_API_KEY")
+        if api_key is not None:
+            headers["Authorization"] = f"Bearer {api_key}"
+        timeout = self._get_timeout_config()
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        limits = httpx.Limits(
+            max_connections=int(
+                self._get_setting(
+                    self.pool_maxsize, "WEAVIATE_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE
+                )
+            ),
+            max_keepalive_connections=int(
+                self._get_setting(
+                    self.pool_connections,
+                    "WEAVIATE_POOL_CONNECTIONS",
+                    DEFAULT_POOL_CONNECTIONS,
+                )
+            ),
+        )
+        retries = int(
+            self._get_setting(self.retries, "WEAVIATE_RETRIES", DEFAULT_RETRIES)
+        )
+        return httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/v1",
+            headers=headers,
+            timeout=timeout,
+            transport=httpx.AsyncHTTPTransport(limits=limits, retries=retries),
+        )
+
+    async def _post(self, body: Dict[str, Any]):
+        if asyncio.get_running_loop() is self._loop:
+            return await self._get_http().post("/graphql", json=body)
+        async with self._create_http() as http:
+            return await http.post("/graphql", json=body)
+
+    async def _araw_query(self, query: str) -> Tuple[Dict[str, Any], int]:
+        """The parsed results and the size of the raw response, for the cache."""
+        started = time.perf_counter()
+        try:
+            response = await self._post({"query": query})
+        finally:
+            self._timed("aquery", started)
+        response.raise_for_status()
+        results = response.json()
+        if "errors" in results:
+            error_message = f"The GraphQL query returned an error: {results['errors']}"
+            raise Exception(error_message)
+        return results, len(response.content)
+
+    async def _aconvert(self, results, format: str):
+        class_name = list(results["data"]["Get"].keys())[0]
+        if format in ("typed", "arrow") and class_name not in self._data_types:
+            # The schema lookup goes through the sync client; keep it off the loop.
+            await asyncio.to_thread(self._get_data_types, class_name)
+        return self._convert_to_dataframe(results, format)
+
+    async def aquery(
+        self, query: str, ttl: int = 3600, format: str = "pandas", **kwargs
+    ) -> pd.DataFrame:
+        key = make_key(query, kwargs)
+        results = self._cache.get(key)
+        if results is None:
+            results, size = await self._araw_query(query)
+            self._cache.put(key, results, ttl=ttl, size=size)
+        return await self._aconvert(results, format)
+
+    async def asearch(
+        self, method: str, ttl: int = 3600, format: str = "pandas", **options
+    ) -> pd.DataFrame:
+        """Coroutine variant of `near_vector`, `near_text`, `hybrid` and `bm25`."""
+        if "class_name" in options:
+            # Alias lookups go through the sync client; keep them off the loop.
+            options["class_name"] = await asyncio.to_thread(
+                self.resolve, options["class_name"]
+            )
+        builder = search.build({"method": method, **options})
+        result = await self.aquery(builder.build(), ttl=ttl, format=format)
+        return self._rank(result, format)
+
+    def gather(self, *aws: Awaitable, timeout: Optional[float] = None) -> List[Any]:
+        """Run `aws` concurrently on the connection's event loop and wait for all."""
+
+        async def _gather():
+            return await asyncio.gather(*aws)
+
+        future = asyncio.run_coroutine_threadsafe(_gather(), self._get_loop())
+        return future.result(timeout)
+
+    def close(self) -> None:
+        """Close both HTTP pools and stop the background event loop."""
+        super().close()
+        if self._loop is None:
+            return
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result()
+            self._http = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
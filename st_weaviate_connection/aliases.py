@@ -0,0 +1,60 @@
+from typing import Dict
+
+from weaviate.client import Client
+from weaviate.util import generate_uuid5
+
+# Weaviate class holding one `alias -> target` object per aliased class name
+ALIAS_CLASS = "ClassAlias"
+ALIAS_SCHEMA = {
+    "class": ALIAS_CLASS,
+    "description": "Class names readers resolve to the class currently serving them",
+    "vectorizer": "none",
+    "properties": [
+        {"name": "alias", "dataType": ["text"], "tokenization": "field"},
+        {"name": "target", "dataType": ["text"], "tokenization": "field"},
+    ],
+}
+MAX_ALIASES = 10000
+
+
+def alias_uuid(alias: str) -> str:
+    return generate_uuid5(alias, ALIAS_CLASS)
+
+
+def read_aliases(client: Client) -> Dict[str, str]:
+    """Every alias stored in Weaviate, or none if the alias class does not exist."""
+    if not client.schema.exists(ALIAS_CLASS):
+        return {}
+    rows = (
+        client.query.get(ALIAS_CLASS, ["alias", "target"])
+        .with_limit(MAX_ALIASES)
+        .do()["data"]["Get"][ALIAS_CLASS]
+    )
+    return {row["alias"]: row["target"] for row in rows}
+
+
+def write_alias(client: Client, alias: str, target: str) -> None:
+    """Point `alias` at `target` with a single object write, creating the class if needed."""
+    if not client.schema.exists(ALIAS_CLASS):
+        client.schema.create_class(ALIAS_SCHEMA)
+    # One object per alias under a deterministic UUID, so switching is one write
+    data = {"alias": alias, "target": target}
+    uuid = alias_uuid(alias)
+    if client.data_object.exists(uuid, class_name=ALIAS_CLASS):
+        client.data_object.replace(data, ALIAS_CLASS, uuid)
+    else:
+        client.data_object.create(data, ALIAS_CLASS, uuid)
+
+
+def delete_alias(client: Client, alias: str) -> None:
+    """Stop resolving `alias`, so readers use the class of that name again."""
+    uuid = alias_uuid(alias)
+    if client.schema.exists(ALIAS_CLASS) and client.data_object.exists(
+        uuid, class_name=ALIAS_CLASS
+    ):
+        client.data_object.delete(uuid, class_name=ALIAS_CLASS)
+
+
+def resolve(client: Client, class_name: str) -> str:
+    """Class currently behind `class_name`, for scripts using a raw client."""
+    return read_aliases(client).get(class_name, class_name)
@@ -0,0 +1,151 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+DEFAULT_MAX_ENTRIES = 1024
+# Bounding by size is opt-in: measuring a parsed result means serializing it again
+DEFAULT_MAX_BYTES: Optional[int] = None
+
+_STRING_RE = re.compile(r'"(?:\\.|[^"\\])*"')
+_WHITESPACE_RE = re.compile(r"\s+")
+_PUNCTUATION_RE = re.compile(r" ?([{}()\[\]:,]) ?")
+
+
+def _normalize_tokens(text: str) -> str:
+    return _PUNCTUATION_RE.sub(r"\1", _WHITESPACE_RE.sub(" ", text))
+
+
+def normalize_query(query: str) -> str:
+    """Collapse insignificant whitespace in a GraphQL query, keeping string literals."""
+    parts = []
+    last = 0
+    for match in _STRING_RE.finditer(query):
+        parts.append(_normalize_tokens(query[last : match.start()]))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(_normalize_tokens(query[last:]))
+    return "".join(parts).strip()
+
+
+def make_key(query: str, variables: Optional[Dict[str, Any]] = None) -> Hashable:
+    return (
+        normalize_query(query),
+        json.dumps(variables or {}, sort_keys=True, default=str),
+    )
+
+
+def result_classes(results: Dict[str, Any]) -> Set[str]:
+    """Names of the classes a GraphQL response was read from."""
+    classes = set()
+    for operation in (results.get("data") or {}).values():
+        if isinstance(operation, dict):
+            classes.update(operation.keys())
+    return classes
+
+
+class QueryCache:
+    """Thread-safe LRU cache of raw GraphQL results bounded by entry count and, optionally, size."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float, Set[str]]]" = (
+            OrderedDict()
+        )
+        self._by_class: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(
+        self,
+        key: Hashable,
+        results: Any,
+        ttl: Optional[float] = None,
+        size: Optional[int] = None,
+    ) -> None:
+        """Cache `results`; `size` is the length of the raw response, when the caller has it."""
+        if ttl is not None and ttl <= 0:
+            return
+        if self.max_bytes is None:
+            size = 0
+        else:
+            if size is None:
+                size = len(json.dumps(results, default=str))
+            if size > self.max_bytes:
+                return
+        expires = time.monotonic() + ttl if ttl is not None else float("inf")
+        classes = result_classes(results) if isinstance(results, dict) else set()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (results, size, expires, classes)
+            self._bytes += size
+            for class_name in classes:
+                self._by_class.setdefault(class_name, set()).add(key)
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, class_names: Optional[Iterable[str]] = None) -> int:
+        """Drop cached results for `class_names`, or everything if none are given."""
+        with self._lock:
+            if class_names is None:
+                keys = list(self._entries)
+            else:
+                keys = set()
+                for class_name in class_names:
+                    keys.update(self._by_class.get(class_name, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _, classes = self._entries.pop(key)
+        self._bytes -= size
+        for class_name in classes:
+            keys = self._by_class.get(class_name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_class[class_name]
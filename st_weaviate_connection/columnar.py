@@ -0,0 +1,138 @@
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+VECTOR_COLUMN = "_additional.vector"
+
+# Weaviate returns some `_additional` fields as strings (e.g. `score`), so they
+# are typed explicitly rather than left to inference.
+ADDITIONAL_DATA_TYPES = {
+    "_additional.distance": "number",
+    "_additional.certainty": "number",
+    "_additional.score": "number",
+    "_additional.creationTimeUnix": "int",
+    "_additional.lastUpdateTimeUnix": "int",
+}
+
+FORMATS = ("pandas", "typed", "arrow", "records")
+
+
+def _flatten(row: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    for key, value in row.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def flatten_rows(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Pivot row dicts into per-column lists named like `pd.json_normalize` does."""
+    columns: Dict[str, List[Any]] = {}
+    for i, row in enumerate(rows):
+        for key, value in _flatten(row):
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * i
+            column.append(value)
+        for column in columns.values():
+            if len(column) == i:
+                column.append(None)
+    return columns
+
+
+def vector_matrix(values: List[Any]) -> Optional[np.ndarray]:
+    """Pack equal-length vectors into one contiguous float32 matrix, if possible."""
+    if not values or any(value is None for value in values):
+        return None
+    dimensions = len(values[0])
+    if any(len(value) != dimensions for value in values):
+        return None
+    flat = np.fromiter(
+        itertools.chain.from_iterable(values),
+        dtype=np.float32,
+        count=len(values) * dimensions,
+    )
+    return flat.reshape(len(values), dimensions)
+
+
+def stack_vectors(column) -> np.ndarray:
+    """Return a vector column as one 2-D float32 matrix.
+
+    Columns built by `to_pandas` are views into a shared buffer; while they are still
+    in their original order that buffer is returned without copying.
+    """
+    values = list(column)
+    if values and isinstance(values[0], np.ndarray) and values[0].base is not None:
+        base = values[0].base
+        row_bytes = values[0].nbytes
+        if base.nbytes == len(values) * row_bytes and all(
+            value.base is base and value.ctypes.data == base.ctypes.data + i * row_bytes
+            for i, value in enumerate(values)
+        ):
+            return base.reshape(len(values), -1)
+    return np.asarray(values, dtype=np.float32)
+
+
+def _data_type(name: str, data_types: Dict[str, str]) -> Optional[str]:
+    return ADDITIONAL_DATA_TYPES.get(name) or data_types.get(name)
+
+
+def _pandas_column(values: List[Any], data_type: Optional[str]):
+    if data_type == "int":
+        return pd.to_numeric(pd.Series(values), errors="coerce").astype("Int64")
+    if data_type == "number":
+        return pd.to_numeric(pd.Series(values), errors="coerce").astype("float64")
+    if data_type == "boolean":
+        return pd.array(values, dtype="boolean")
+    if data_type == "date":
+        return pd.to_datetime(pd.Series(values), utc=True, errors="coerce")
+    return values
+
+
+def to_pandas(
+    rows: List[Dict[str, Any]], data_types: Optional[Dict[str, str]] = None
+) -> pd.DataFrame:
+    """Build a DataFrame with schema-typed columns from GraphQL result rows.
+
+    `data_types` maps property names to their Weaviate data type (`int`, `number`,
+    `boolean`, `date`, ...). Vectors are stored as views into a single float32 matrix.
+    """
+    data_types = data_types or {}
+    data = {}
+    for name, values in flatten_rows(rows).items():
+        matrix = vector_matrix(values) if name == VECTOR_COLUMN else None
+        if matrix is not None:
+            column = np.empty(len(matrix), dtype=object)
+            column[:] = list(matrix)
+            data[name] = column
+        else:
+            data[name] = _pandas_column(values, _data_type(name, data_types))
+    return pd.DataFrame(data, index=pd.RangeIndex(len(rows)))
+
+
+def to_arrow(rows: List[Dict[str, Any]], data_types: Optional[Dict[str, str]] = None):
+    """Build a pyarrow Table from GraphQL result rows.
+
+    Vectors become a `fixed_size_list<float32>` column backed by one contiguous buffer.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError(
+            'format="arrow" requires pyarrow, install it with `pip install pyarrow`'
+        ) from e
+
+    data_types = data_types or {}
+    arrays = {}
+    for name, values in flatten_rows(rows).items():
+        matrix = vector_matrix(values) if name == VECTOR_COLUMN else None
+        if matrix is not None:
+            arrays[name] = pa.FixedSizeListArray.from_arrays(
+                pa.array(matrix.reshape(-1)), matrix.shape[1]
+            )
+        else:
+            column = _pandas_column(values, _data_type(name, data_types))
+            arrays[name] = pa.array(column, from_pandas=True)
+    return pa.table(arrays)
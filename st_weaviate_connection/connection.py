@@ -1,10 +1,37 @@
-from typing import Optional
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
 
 import pandas as pd
 import weaviate
+from requests.exceptions import ConnectionError, Timeout
 from streamlit.connections import ExperimentalBaseConnection
-from streamlit.runtime.caching import cache_data
+from weaviate.batch import Batch
 from weaviate.client import Client
+from weaviate.config import Config, ConnectionConfig
+from weaviate.exceptions import UnexpectedStatusCodeException, WeaviateStartUpError
+from weaviate.gql.multi_get import MultiGetBuilder
+
+from . import aliases, columnar, search
+from .cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, QueryCache, make_key
+
+T = TypeVar("T")
+
+DEFAULT_POOL_CONNECTIONS = 20
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_RETRIES = 2
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_SEARCHES_PER_REQUEST = 20
+DEFAULT_ALIAS_TTL = 30
+RETRY_BACKOFF = 0.5
+
+# Errors after which the pooled client is thrown away and rebuilt.
+RECONNECT_ERRORS = (ConnectionError, Timeout, WeaviateStartUpError)
 
 
 class WeaviateConnection(ExperimentalBaseConnection["Client"]):
@@ -14,21 +41,90 @@ class WeaviateConnection(ExperimentalBaseConnection["Client"]):
         url=None,
         api_key=None,
         additional_headers=None,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+        retries: Optional[int] = None,
+        cache_max_entries: Optional[int] = None,
+        cache_max_bytes: Optional[int] = None,
+        aliases: Optional[Dict[str, str]] = None,
+        alias_ttl: Optional[float] = None,
+        on_timing: Optional[Callable[[str, float], None]] = None,
         **kwargs,
     ) -> None:
         self.url = url
         self.api_key = api_key
         self.additional_headers = additional_headers
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.retries = retries
+        self.alias_ttl = alias_ttl
+        self._fixed_aliases = dict(aliases or {})
+        self._aliases: Dict[str, str] = {}
+        self._aliases_read: Optional[float] = None
+        self._alias_lock = threading.Lock()
+        # Called with an operation name and its duration, e.g. to feed metrics
+        self.on_timing = on_timing
         super().__init__(connection_name, **kwargs)
+        self._data_types: Dict[str, Dict[str, str]] = {}
+        self._cache = QueryCache(
+            max_entries=int(
+                self._get_setting(
+                    cache_max_entries, "WEAVIATE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES
+                )
+            ),
+            max_bytes=self._get_cache_max_bytes(cache_max_bytes),
+        )
+
+    def _get_cache_max_bytes(self, value: Optional[int]) -> Optional[int]:
+        max_bytes = self._get_setting(
+            value, "WEAVIATE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES
+        )
+        return int(max_bytes) if max_bytes is not None else None
 
     def _connect(self, **kwargs) -> Client:
         auth_config = self._create_auth_config()
         url = self.url or self._secrets.get("WEAVIATE_URL")
-        return Client(
+        connection_config = ConnectionConfig(
+            session_pool_connections=int(
+                self._get_setting(
+                    self.pool_connections,
+                    "WEAVIATE_POOL_CONNECTIONS",
+                    DEFAULT_POOL_CONNECTIONS,
+                )
+            ),
+            session_pool_maxsize=int(
+                self._get_setting(
+                    self.pool_maxsize, "WEAVIATE_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE
+                )
+            ),
+        )
+        started = time.perf_counter()
+        client = Client(
             url,
             auth_client_secret=auth_config,
+            timeout_config=self._get_timeout_config(),
             additional_headers=self.additional_headers,
+            additional_config=Config(connection_config=connection_config),
         )
+        self._timed("connect", started)
+        return client
+
+    def _timed(self, operation: str, started: float) -> None:
+        if self.on_timing is not None:
+            self.on_timing(operation, time.perf_counter() - started)
+
+    def _get_setting(self, value, secret_key: str, default):
+        if value is not None:
+            return value
+        return self._secrets.get(secret_key, default)
+
+    def _get_timeout_config(self) -> Union[float, Tuple[float, float]]:
+        timeout = self._get_setting(self.timeout, "WEAVIATE_TIMEOUT", DEFAULT_TIMEOUT)
+        if isinstance(timeout, (list, tuple)):
+            return tuple(timeout)
+        return timeout
 
     def _create_auth_config(self) -> Optional[weaviate.AuthApiKey]:
         api_key = self.api_key or self._secrets.get("WEAVIATE_API_KEY")
@@ -37,27 +133,396 @@ class WeaviateConnection(ExperimentalBaseConnection["Client"]):
         else:
             return None
 
-    def _convert_to_dataframe(self, results) -> pd.DataFrame:
+    def _execute(self, operation: Callable[[Client], T]) -> T:
+        """Run `operation` on the pooled client, reconnecting on connection errors."""
+        retries = int(
+            self._get_setting(self.retries, "WEAVIATE_RETRIES", DEFAULT_RETRIES)
+        )
+        for attempt in range(retries + 1):
+            try:
+                return operation(self._instance)
+            except RECONNECT_ERRORS:
+                if attempt == retries:
+                    raise
+                self.reset()
+                time.sleep(RETRY_BACKOFF * 2**attempt)
+
+    def is_healthy(self) -> bool:
+        try:
+            return self._instance.is_ready()
+        except RECONNECT_ERRORS:
+            return False
+
+    def resolve(self, class_name: str) -> str:
+        """Name of the class currently serving `class_name`.
+
+        Aliases passed to the constructor are fixed; the others are read from the
+        alias class in Weaviate at most every `alias_ttl` seconds, so a switch made
+        with `set_alias` reaches every connection within that time. The typed query
+        methods resolve their class names; raw GraphQL passed to `query` does not.
+        """
+        if class_name in self._fixed_aliases:
+            return self._fixed_aliases[class_name]
+        ttl = float(
+            self._get_setting(self.alias_ttl, "WEAVIATE_ALIAS_TTL", DEFAULT_ALIAS_TTL)
+        )
+        with self._alias_lock:
+            now = time.monotonic()
+            if self._aliases_read is None or now - self._aliases_read >= ttl:
+                self._aliases_read = now
+                try:
+                    self._aliases = self._execute(aliases.read_aliases)
+                except (UnexpectedStatusCodeException,) + RECONNECT_ERRORS:
+                    # Keep serving the last known aliases while Weaviate is unreachable
+                    pass
+            return self._aliases.get(class_name, class_name)
+
+    def set_alias(self, alias: str, target: str) -> None:
+        """Switch readers of `alias` to the class `target` with one object write."""
+        self._execute(lambda client: aliases.write_alias(client, alias, target))
+        with self._alias_lock:
+            self._aliases[alias] = target
+
+    def delete_alias(self, alias: str) -> None:
+        """Remove `alias`, e.g. after rolling back or dropping a migration."""
+        self._execute(lambda client: aliases.delete_alias(client, alias))
+        with self._alias_lock:
+            self._aliases.pop(alias, None)
+
+    def _get_data_types(self, class_name: str) -> Dict[str, str]:
+        """Map each property of `class_name` to its Weaviate data type."""
+        if class_name not in self._data_types:
+            try:
+                schema = self._execute(lambda client: client.schema.get(class_name))
+            except UnexpectedStatusCodeException:
+                return {}
+            self._data_types[class_name] = {
+                prop["name"]: prop["dataType"][0]
+                for prop in schema.get("properties", [])
+            }
+        return self._data_types[class_name]
+
+    def _convert(self, class_name: str, rows, format: str = "pandas"):
+        if format == "records":
+            # Rows may be the cached result itself, so callers get their own copy
+            return copy.deepcopy(rows)
+        if format == "pandas":
+            return pd.json_normalize(rows)
+        if format == "typed":
+            return columnar.to_pandas(rows, self._get_data_types(class_name))
+        if format == "arrow":
+            return columnar.to_arrow(rows, self._get_data_types(class_name))
+        raise ValueError(f"format must be one of {columnar.FORMATS}, got {format!r}")
+
+    def _convert_to_dataframe(self, results, format: str = "pandas"):
         class_name = list(results["data"]["Get"].keys())[0]
         data = results["data"]["Get"][class_name]
-        df = pd.json_normalize(data)
-        return df
-
-    def query(self, query: str, ttl: int = 3600, **kwargs) -> pd.DataFrame:
-        @cache_data(ttl=ttl)
-        def _query(query: str, **kwargs):
-            results = self._connect().query.raw(query)
-            if "errors" in results:
-                error_message = (
-                    f"The GraphQL query returned an error: {results['errors']}"
+        return self._convert(class_name, data, format)
+
+    def query(
+        self, query: str, ttl: int = 3600, format: str = "pandas", **kwargs
+    ) -> pd.DataFrame:
+        """Run a raw GraphQL `Get` query.
+
+        `format` selects the result type: a DataFrame built by `pd.json_normalize`
+        (`"pandas"`), a DataFrame with schema-typed columns and vectors as float32
+        arrays (`"typed"`), a pyarrow Table (`"arrow"`) or the raw row dicts
+        (`"records"`). The typed formats look up the class schema once per class.
+        """
+        key = make_key(query, kwargs)
+        results = self._cache.get(key)
+        if results is None:
+            results = self._raw_query(query)
+            self._cache.put(key, results, ttl=ttl)
+
+        return self._convert_to_dataframe(results, format)
+
+    def _raw_query(self, query: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            results = self._execute(lambda client: client.query.raw(query))
+        finally:
+            self._timed("query", started)
+        if "errors" in results:
+            error_message = f"The GraphQL query returned an error: {results['errors']}"
+            raise Exception(error_message)
+        return results
+
+    def _fetch_page(
+        self,
+        class_name: str,
+        properties: List[str],
+        page_size: int,
+        after: Optional[str],
+        with_vector: bool = False,
+    ) -> List[Dict[str, Any]]:
+        builder = (
+            self._instance.query.get(class_name, properties)
+            .with_additional(["id", "vector"] if with_vector else ["id"])
+            .with_limit(page_size)
+        )
+        if after is not None:
+            builder = builder.with_after(after)
+        return self._raw_query(builder.build())["data"]["Get"][class_name]
+
+    def _iter_pages(
+        self,
+        class_name: str,
+        properties: List[str],
+        page_size: int,
+        prefetch: bool,
+        with_vector: bool = False,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        fetch = partial(self._fetch_page, class_name, properties, page_size)
+        try:
+            page = fetch(None, with_vector)
+            while page:
+                after = page[-1]["_additional"]["id"]
+                if executor is not None:
+                    next_page = executor.submit(fetch, after, with_vector)
+                    yield page
+                    page = next_page.result()
+                else:
+                    yield page
+                    page = fetch(after, with_vector)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_query(
+        self,
+        class_name: str,
+        properties: List[str],
+        page_size: int = DEFAULT_PAGE_SIZE,
+        prefetch: bool = True,
+        with_vector: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield every object of `class_name` as a row dict, paging with the cursor API.
+
+        Only the current page, and the next one when `prefetch` is set, is held in
+        memory. Results bypass the query cache. With `with_vector`, each row's
+        `_additional` also holds the object's vector.
+        """
+        class_name = self.resolve(class_name)
+        pages = self._iter_pages(
+            class_name, properties, page_size, prefetch, with_vector
+        )
+        for page in pages:
+            yield from page
+
+    def scan(
+        self,
+        class_name: str,
+        properties: List[str],
+        page_size: int = DEFAULT_PAGE_SIZE,
+        prefetch: bool = True,
+        format: str = "pandas",
+    ) -> Iterator[pd.DataFrame]:
+        """Like `iter_query`, but yield one converted chunk per page."""
+        class_name = self.resolve(class_name)
+        for page in self._iter_pages(class_name, properties, page_size, prefetch):
+            yield self._convert(class_name, page, format)
+
+    def _rank(self, result, format: str):
+        if format in ("pandas", "typed"):
+            result = result.rename(columns=search.ranked_column)
+            for name in search.RANK_COLUMNS:
+                if name in result.columns:
+                    result[name] = pd.to_numeric(result[name]).astype("float64")
+            return result
+        if format == "arrow":
+            import pyarrow as pa
+
+            result = result.rename_columns(
+                [search.ranked_column(name) for name in result.column_names]
+            )
+            for name in search.RANK_COLUMNS:
+                index = result.schema.get_field_index(name)
+                if index != -1:
+                    column = result.column(index).cast(pa.float64())
+                    result = result.set_column(index, name, column)
+            return result
+        return result
+
+    def _search(self, builder, ttl: int, format: str):
+        return self._rank(self.query(builder.build(), ttl=ttl, format=format), format)
+
+    def near_vector(
+        self,
+        class_name: str,
+        vector: List[float],
+        properties: List[str],
+        limit: int = 10,
+        ttl: int = 3600,
+        format: str = "pandas",
+        **options,
+    ) -> pd.DataFrame:
+        """Rank objects of `class_name` by their distance to `vector`."""
+        builder = search.near_vector(
+            self.resolve(class_name), vector, properties, limit, **options
+        )
+        return self._search(builder, ttl, format)
+
+    def near_text(
+        self,
+        class_name: str,
+        concepts: List[str],
+        properties: List[str],
+        limit: int = 10,
+        ttl: int = 3600,
+        format: str = "pandas",
+        **options,
+    ) -> pd.DataFrame:
+        """Rank objects of `class_name` by their distance to the given `concepts`."""
+        builder = search.near_text(
+            self.resolve(class_name), concepts, properties, limit, **options
+        )
+        return self._search(builder, ttl, format)
+
+    def hybrid(
+        self,
+        class_name: str,
+        query: str,
+        properties: List[str],
+        limit: int = 10,
+        ttl: int = 3600,
+        format: str = "pandas",
+        **options,
+    ) -> pd.DataFrame:
+        """Rank objects of `class_name` by a fused BM25 and vector `score`."""
+        builder = search.hybrid(
+            self.resolve(class_name), query, properties, limit, **options
+        )
+        return self._search(builder, ttl, format)
+
+    def bm25(
+        self,
+        class_name: str,
+        query: str,
+        properties: List[str],
+        limit: int = 10,
+        ttl: int = 3600,
+        format: str = "pandas",
+        **options,
+    ) -> pd.DataFrame:
+        """Rank objects of `class_name` by their BM25 keyword `score`."""
+        builder = search.bm25(
+            self.resolve(class_name), query, properties, limit, **options
+        )
+        return self._search(builder, ttl, format)
+
+    def batch_search(
+        self,
+        searches: List[Dict[str, Any]],
+        ttl: int = 3600,
+        format: str = "pandas",
+        concurrent: bool = False,
+        searches_per_request: int = DEFAULT_SEARCHES_PER_REQUEST,
+    ) -> List[pd.DataFrame]:
+        """Run many searches with as few round trips as possible.
+
+        Each search is a dict with a `method` (`near_vector`, `near_text`, `hybrid`
+        or `bm25`) plus that method's keyword arguments. Uncached searches are packed
+        into aliased multi-get requests of up to `searches_per_request` each, or sent
+        in parallel over the connection pool when `concurrent` is set. Results come
+        back in the order of `searches` and are cached individually.
+        """
+        searches = [
+            {**options, "class_name": self.resolve(options["class_name"])}
+            for options in searches
+        ]
+        builders = [search.build(options) for options in searches]
+        keys = [make_key(builder.build()) for builder in builders]
+        results = [self._cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing and concurrent:
+            max_workers = min(
+                len(missing),
+                int(
+                    self._get_setting(
+                        self.pool_maxsize, "WEAVIATE_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE
+                    )
+                ),
+            )
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetched = executor.map(
+                    lambda i: self._raw_query(builders[i].build()), missing
                 )
-                raise Exception(error_message)
-            else:
-                return results
+                for i, result in zip(missing, fetched):
+                    results[i] = result
+        else:
+            for start in range(0, len(missing), searches_per_request):
+                chunk = missing[start : start + searches_per_request]
+                query = MultiGetBuilder(
+                    [builders[i].with_alias(f"search{i}") for i in chunk], None
+                ).build()
+                data = self._raw_query(query)["data"]["Get"]
+                for i in chunk:
+                    class_name = searches[i]["class_name"]
+                    results[i] = {"data": {"Get": {class_name: data[f"search{i}"]}}}
+
+        for i in missing:
+            self._cache.put(keys[i], results[i], ttl=ttl)
+        return [
+            self._rank(self._convert_to_dataframe(result, format), format)
+            for result in results
+        ]
+
+    def invalidate(self, *class_names: str) -> int:
+        """Drop cached results for `class_names`, or everything if none are given."""
+        if not class_names:
+            return self._cache.invalidate(None)
+        return self._cache.invalidate(
+            set(class_names) | {self.resolve(name) for name in class_names}
+        )
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+    @contextmanager
+    def batch(self, *class_names: str) -> Iterator[Batch]:
+        """Batch import that invalidates cached results for `class_names` when done."""
+        started = time.perf_counter()
+        try:
+            with self._instance.batch as batch:
+                yield batch
+        finally:
+            self._timed("batch", started)
+            self.invalidate(*class_names)
+
+    def create_class(self, schema_class: dict) -> None:
+        self._execute(lambda client: client.schema.create_class(schema_class))
+        self._data_types.pop(schema_class["class"], None)
+        self.invalidate(schema_class["class"])
+
+    def add_property(self, class_name: str, schema_property: dict) -> None:
+        self._execute(
+            lambda client: client.schema.property.create(class_name, schema_property)
+        )
+        self._data_types.pop(class_name, None)
+        self.invalidate(class_name)
+
+    def count(self, class_name: str) -> int:
+        """Number of objects in `class_name`, uncached."""
+        class_name = self.resolve(class_name)
+        results = self._execute(
+            lambda client: client.query.aggregate(class_name).with_meta_count().do()
+        )
+        return results["data"]["Aggregate"][class_name][0]["meta"]["count"]
 
-        results = _query(query, **kwargs)
+    def delete_class(self, class_name: str) -> None:
+        self._execute(lambda client: client.schema.delete_class(class_name))
+        self._data_types.pop(class_name, None)
+        self.invalidate(class_name)
 
-        return self._convert_to_dataframe(results)
+    def close(self) -> None:
+        """Close the pooled client's HTTP session; the next call reconnects."""
+        client = self._raw_instance
+        if client is not None:
+            client._connection.close()
+            self.reset()
 
     def client(self) -> Client:
-        return self._connect()
+        return self._instance
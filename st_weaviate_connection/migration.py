@@ -0,0 +1,248 @@
+import ast
+import re
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+from .connection import DEFAULT_PAGE_SIZE, WeaviateConnection
+
+DEFAULT_BATCH_SIZE = 500
+_VERSION = re.compile(r"^(?P<name>.+)_v(?P<version>\d+)$")
+# Class settings a migration compares; keys the live schema adds are ignored
+CLASS_SETTINGS = ("moduleConfig", "vectorIndexType", "vectorIndexConfig")
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _covers(live: Any, desired: Any) -> bool:
+    """Whether `live` has every setting of `desired`, ignoring defaults it adds."""
+    if isinstance(desired, dict):
+        return isinstance(live, dict) and all(
+            _covers(live.get(key), value) for key, value in desired.items()
+        )
+    return live == desired
+
+
+class SchemaDiff:
+    """Differences between a desired class definition and the live one."""
+
+    def __init__(
+        self,
+        class_name: str,
+        added: Optional[List[dict]] = None,
+        breaking: Optional[List[str]] = None,
+        missing: bool = False,
+    ) -> None:
+        self.class_name = class_name
+        self.added = added or []
+        self.breaking = breaking or []
+        self.missing = missing
+
+    @property
+    def changed(self) -> bool:
+        return self.missing or bool(self.added or self.breaking)
+
+    def describe(self) -> List[str]:
+        if self.missing:
+            return [f"{self.class_name} does not exist"]
+        return [f"add property {prop['name']}" for prop in self.added] + self.breaking
+
+
+def diff_schema(desired: dict, live: Optional[dict]) -> SchemaDiff:
+    """Compare a class definition, e.g. weaviate_schema.json, with the live class.
+
+    New properties are additive and can be created in place. Changed data types,
+    tokenization or module settings, removed properties and class-level vectorizer
+    or index changes are breaking: existing objects have to be rewritten.
+    """
+    if live is None:
+        return SchemaDiff(desired["class"], missing=True)
+    breaking = []
+    if desired.get("vectorizer", "none") != live.get("vectorizer", "none"):
+        breaking.append(
+            f"vectorizer {live.get('vectorizer')} -> {desired.get('vectorizer')}"
+        )
+    for setting in CLASS_SETTINGS:
+        if setting in desired and not _covers(live.get(setting), desired[setting]):
+            breaking.append(f"class {setting} changed")
+
+    current = {prop["name"]: prop for prop in live.get("properties", [])}
+    added = []
+    for prop in desired["properties"]:
+        name = prop["name"]
+        if name not in current:
+            added.append(prop)
+        elif prop["dataType"] != current[name]["dataType"]:
+            breaking.append(
+                f"{name}: {current[name]['dataType'][0]} -> {prop['dataType'][0]}"
+            )
+        elif "tokenization" in prop and prop["tokenization"] != current[name].get(
+            "tokenization"
+        ):
+            breaking.append(f"{name}: tokenization -> {prop['tokenization']}")
+        elif "moduleConfig" in prop and not _covers(
+            current[name].get("moduleConfig"), prop["moduleConfig"]
+        ):
+            breaking.append(f"{name}: moduleConfig changed")
+    desired_names = {prop["name"] for prop in desired["properties"]}
+    breaking.extend(f"{name}: removed" for name in current if name not in desired_names)
+    return SchemaDiff(desired["class"], added, breaking)
+
+
+def convert_value(value: Any, data_type: str) -> Any:
+    """Convert a copied value to the property's new data type, or None to drop it."""
+    if value is None:
+        return None
+    if data_type.endswith("[]"):
+        if isinstance(value, list):
+            return value
+        if isinstance(value, str) and value.startswith("["):
+            # Lists that were stored as their Python repr, e.g. "['White']"
+            try:
+                parsed = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                parsed = None
+            if isinstance(parsed, (list, tuple)):
+                return [str(item) for item in parsed]
+        return [value] if value != "" else []
+    if data_type in ("number", "int"):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return int(number) if data_type == "int" else number
+    if data_type in ("text", "string") and isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if data_type in ("text", "string"):
+        return str(value)
+    return value
+
+
+def next_version(alias: str, class_names: Iterable[str]) -> str:
+    """Name for a new shadow class of `alias`, e.g. `MagicChat_Card_v2`."""
+    versions = [1]
+    for class_name in class_names:
+        match = _VERSION.match(class_name)
+        if match is not None and match.group("name") == alias:
+            versions.append(int(match.group("version")))
+    return f"{alias}_v{max(versions) + 1}"
+
+
+class MigrationReport:
+    """What a migration did, and how fast it copied."""
+
+    def __init__(self, alias: str, source: str, diff: SchemaDiff) -> None:
+        self.alias = alias
+        self.source = source
+        self.target = source
+        self.diff = diff
+        self.copied = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def throughput(self) -> float:
+        """Copied objects per second"""
+        return self.copied / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        if self.target == self.source:
+            return f"{self.alias} is served by {self.source}"
+        return (
+            f"{self.alias} now served by {self.target}: copied {self.copied} objects "
+            f"from {self.source} in {self.elapsed:.1f}s "
+            f"({self.throughput():.0f} objects/s)"
+        )
+
+
+def migrate(
+    connection: WeaviateConnection,
+    desired: dict,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    dry_run: bool = False,
+    on_progress: Optional[Callable[[MigrationReport], None]] = None,
+) -> MigrationReport:
+    """Bring the class named by `desired` in line with it while readers keep querying it.
+
+    A missing class is created and new properties are added in place. Breaking
+    changes go to a shadow class: every object is copied with its UUID, and its
+    vector when the vectorizer is unchanged, through the cursor API and large
+    batches. Once the copy is complete, the class name is aliased to the shadow
+    class, which switches every reader resolving names through a
+    `WeaviateConnection`. The previous class is left in place.
+    """
+    alias = desired["class"]
+    schema = connection.client().schema.get()
+    classes = {c["class"]: c for c in schema.get("classes", [])}
+    source = connection.resolve(alias)
+    live = classes.get(source)
+    diff = diff_schema(desired, live)
+    report = MigrationReport(alias, source, diff)
+    if dry_run or not diff.changed:
+        return report
+    if live is None:
+        connection.create_class(desired)
+    elif not diff.breaking:
+        for prop in diff.added:
+            connection.add_property(source, prop)
+    else:
+        report.target = next_version(alias, classes)
+        _copy(connection, desired, live, report, batch_size, page_size, on_progress)
+        connection.set_alias(alias, report.target)
+    report.finished = time.monotonic()
+    return report
+
+
+def _copy(
+    connection: WeaviateConnection,
+    desired: dict,
+    live: dict,
+    report: MigrationReport,
+    batch_size: int,
+    page_size: int,
+    on_progress: Optional[Callable[[MigrationReport], None]],
+) -> None:
+    target = report.target
+    connection.create_class({**desired, "class": target})
+    data_types = {prop["name"]: prop["dataType"][0] for prop in desired["properties"]}
+    properties = [p["name"] for p in live["properties"] if p["name"] in data_types]
+    # Vectors stay valid only as long as the same model produced them
+    copy_vectors = desired.get("vectorizer", "none") == live.get(
+        "vectorizer", "none"
+    ) and _covers(live.get("moduleConfig"), desired.get("moduleConfig", {}))
+    try:
+        with connection.batch(target) as batch:
+            batch.batch_size = batch_size
+            rows = connection.iter_query(
+                report.source, properties, page_size, with_vector=copy_vectors
+            )
+            for row in rows:
+                additional = row.pop("_additional")
+                obj = {
+                    name: convert_value(row.get(name), data_types[name])
+                    for name in properties
+                }
+                batch.add_data_object(
+                    {k: v for k, v in obj.items() if v is not None},
+                    target,
+                    uuid=additional["id"],
+                    vector=additional.get("vector") if copy_vectors else None,
+                )
+                report.copied += 1
+                if on_progress is not None and report.copied % page_size == 0:
+                    on_progress(report)
+        copied, source = connection.count(target), connection.count(report.source)
+        if copied != source:
+            raise MigrationError(
+                f"{target} has {copied} objects but {report.source} has {source}; "
+                "objects failed to import or were written during the copy"
+            )
+    except BaseException:
+        # Readers never saw the shadow class, so drop it and leave everything as it was
+        connection.delete_class(target)
+        raise
@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from weaviate.gql.get import GetBuilder
+
+DISTANCE_FIELDS = ["id", "distance"]
+SCORE_FIELDS = ["id", "score"]
+
+
+def _get(
+    class_name: str,
+    properties: List[str],
+    additional: List[str],
+    limit: int,
+    where: Optional[dict],
+    with_vector: bool,
+) -> GetBuilder:
+    # The builders are only used to render GraphQL, so they need no connection.
+    builder = GetBuilder(class_name, properties, None).with_limit(limit)
+    builder = builder.with_additional(
+        additional + ["vector"] if with_vector else additional
+    )
+    if where is not None:
+        builder = builder.with_where(where)
+    return builder
+
+
+def near_vector(
+    class_name: str,
+    vector: Sequence[float],
+    properties: List[str],
+    limit: int = 10,
+    distance: Optional[float] = None,
+    where: Optional[dict] = None,
+    with_vector: bool = False,
+) -> GetBuilder:
+    content: Dict[str, Any] = {"vector": [float(x) for x in vector]}
+    if distance is not None:
+        content["distance"] = distance
+    return _get(
+        class_name, properties, DISTANCE_FIELDS, limit, where, with_vector
+    ).with_near_vector(content)
+
+
+def near_text(
+    class_name: str,
+    concepts: List[str],
+    properties: List[str],
+    limit: int = 10,
+    distance: Optional[float] = None,
+    where: Optional[dict] = None,
+    with_vector: bool = False,
+) -> GetBuilder:
+    content: Dict[str, Any] = {"concepts": list(concepts)}
+    if distance is not None:
+        content["distance"] = distance
+    return _get(
+        class_name, properties, DISTANCE_FIELDS, limit, where, with_vector
+    ).with_near_text(content)
+
+
+def hybrid(
+    class_name: str,
+    query: str,
+    properties: List[str],
+    limit: int = 10,
+    alpha: Optional[float] = None,
+    vector: Optional[Sequence[float]] = None,
+    where: Optional[dict] = None,
+    with_vector: bool = False,
+) -> GetBuilder:
+    if vector is not None:
+        vector = [float(x) for x in vector]
+    return _get(
+        class_name, properties, SCORE_FIELDS, limit, where, with_vector
+    ).with_hybrid(query, alpha=alpha, vector=vector)
+
+
+def bm25(
+    class_name: str,
+    query: str,
+    properties: List[str],
+    limit: int = 10,
+    search_properties: Optional[List[str]] = None,
+    where: Optional[dict] = None,
+    with_vector: bool = False,
+) -> GetBuilder:
+    return _get(
+        class_name, properties, SCORE_FIELDS, limit, where, with_vector
+    ).with_bm25(query, properties=search_properties)
+
+
+BUILDERS = {
+    "near_vector": near_vector,
+    "near_text": near_text,
+    "hybrid": hybrid,
+    "bm25": bm25,
+}
+
+
+def build(search: Dict[str, Any]) -> GetBuilder:
+    """Build a search from a dict naming its `method` plus that method's arguments."""
+    options = dict(search)
+    method = options.pop("method")
+    if method not in BUILDERS:
+        raise ValueError(f"method must be one of {list(BUILDERS)}, got {method!r}")
+    return BUILDERS[method](**options)
+
+
+# Ranking columns, always returned as floats; Weaviate sends `score` as a string.
+RANK_COLUMNS = ("distance", "certainty", "score")
+
+
+def ranked_column(name: str) -> str:
+    """Drop the `_additional.` prefix so search results expose `distance`/`score`."""
+    return name[len("_additional.") :] if name.startswith("_additional.") else name
@@ -0,0 +1,90 @@
+import io
+import threading
+import time
+
+from aimstream.batch import (
+    BatchResult,
+    generate_batch,
+    percentile,
+    read_prompts,
+    write_dockerfile,
+)
+from tests.test_llm import FakeClient
+
+
+class SlowClient(FakeClient):
+    def __init__(self, delay):
+        super().__init__([])
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        prompt = kwargs["messages"][-1]["content"]
+        return FakeClient([f"```dockerfile\nFROM {prompt}\n```"]).stream
+
+
+def test_read_prompts_accepts_text_and_jsonl():
+    reader = io.StringIO('alpine\n\n# comment\n{"id": "web", "prompt": "nginx"}\n')
+    assert list(read_prompts(reader)) == [("1", "alpine"), ("web", "nginx")]
+
+
+def test_invalid_jsonl_lines_fail_without_stopping_the_batch():
+    reader = io.StringIO(
+        '{"id": "web", "prompt": "nginx"}\n{"id": "x"}\n{"prompt": \n alpine\n'
+    )
+    results = []
+    report = generate_batch(
+        read_prompts(reader), "gemma", SlowClient(0), on_result=results.append
+    )
+    assert report.completed == 2 and report.failed == 2
+    errors = sorted(r.error for r in results if r.error is not None)
+    assert errors[0].startswith("line 2: ") and 'no "prompt"' in errors[0]
+    assert errors[1].startswith("line 3: invalid JSON")
+    assert sorted(r.dockerfile for r in results if r.error is None) == [
+        "FROM alpine",
+        "FROM nginx",
+    ]
+
+
+def test_percentile_interpolates():
+    assert percentile([], 50) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
+
+
+def test_generate_batch_runs_prompts_concurrently(tmp_path):
+    client = SlowClient(0.1)
+    results = []
+    prompts = [(str(i), f"image:{i}") for i in range(8)]
+    report = generate_batch(
+        iter(prompts), "gemma", client, workers=4, on_result=results.append
+    )
+    assert client.peak == 4
+    assert report.completed == 8 and report.failed == 0
+    assert report.elapsed < 0.8
+    assert sorted(r.dockerfile for r in results) == sorted(
+        f"FROM image:{i}" for i in range(8)
+    )
+    path = write_dockerfile(str(tmp_path), results[0])
+    assert open(path).read().startswith("FROM image:")
+
+
+def test_ids_with_the_same_slug_get_their_own_files(tmp_path):
+    prefix = "a-very-long-service-name-shared-by-many-prompts"
+    ids = ["svc.a", "svc-a", f"{prefix}-1", f"{prefix}-2"]
+    paths = [
+        write_dockerfile(str(tmp_path), BatchResult(i, id, "", f"FROM image:{i}", 0.0))
+        for i, id in enumerate(ids)
+    ]
+    assert len(set(paths)) == len(ids)
+    assert [open(path).read() for path in paths] == [
+        f"FROM image:{i}\n" for i in range(len(ids))
+    ]
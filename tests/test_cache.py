@@ -0,0 +1,92 @@
+import time
+
+from st_weaviate_connection.cache import QueryCache, make_key, normalize_query
+
+
+def _results(class_name, rows):
+    return {"data": {"Get": {class_name: rows}}}
+
+
+def test_normalize_query_ignores_whitespace():
+    query = """
+    {
+        Get {
+            TVShow(bm25: {query: "Hey  Arnold"}) {
+                title
+            }
+        }
+    }
+    """
+    assert normalize_query(query) == (
+        '{Get{TVShow(bm25:{query:"Hey  Arnold"}){title}}}'
+    )
+    assert make_key(query) == make_key(
+        '{ Get { TVShow(bm25: {query: "Hey  Arnold"}) { title } } }'
+    )
+    assert make_key(query, {"a": 1}) != make_key(query)
+
+
+def test_hit_and_miss_counters():
+    cache = QueryCache()
+    key = make_key("{ Get { TVShow { title } } }")
+    assert cache.get(key) is None
+    cache.put(key, _results("TVShow", [{"title": "Doug"}]))
+    assert cache.get(key) == _results("TVShow", [{"title": "Doug"}])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_lru_eviction_by_entries():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", _results("TVShow", [1]))
+    cache.put("b", _results("TVShow", [2]))
+    cache.get("a")
+    cache.put("c", _results("TVShow", [3]))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes():
+    row = {"title": "x" * 100}
+    cache = QueryCache(max_bytes=200)
+    cache.put("a", _results("TVShow", [row]))
+    cache.put("b", _results("TVShow", [row]))
+    assert len(cache) == 1
+    assert cache.stats()["bytes"] <= 200
+    cache.put("big", _results("TVShow", [row] * 10))
+    assert cache.get("big") is None
+
+
+def test_size_is_only_measured_with_a_byte_limit(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("results were serialized")
+
+    cache = QueryCache()
+    monkeypatch.setattr("st_weaviate_connection.cache.json.dumps", fail)
+    cache.put("a", _results("TVShow", [{"title": "x" * 100}]))
+    assert cache.get("a") is not None and cache.stats()["bytes"] == 0
+
+    cache = QueryCache(max_bytes=200)
+    cache.put("a", _results("TVShow", []), size=150)
+    cache.put("b", _results("TVShow", []), size=150)
+    assert cache.get("a") is None and cache.stats()["bytes"] == 150
+
+
+def test_ttl_expiry():
+    cache = QueryCache()
+    cache.put("a", _results("TVShow", []), ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_invalidate_by_class():
+    cache = QueryCache()
+    cache.put("a", _results("TVShow", []))
+    cache.put("b", _results("Movie", []))
+    assert cache.invalidate(["TVShow"]) == 1
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
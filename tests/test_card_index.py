@@ -0,0 +1,56 @@
+import os
+
+from aimstream.card_index import CardIndex, normalize_name
+
+NAMES = [
+    "Black Lotus",
+    "Blacker Lotus",
+    "Jace, the Mind Sculptor",
+    "Lim-Dûl the Necromancer",
+    '"Ach! Hans, Run!"',
+    "Delver of Secrets // Insectile Aberration",
+    "Lightning Bolt",
+    "Lightning Colt",
+]
+
+
+def test_normalize_name_ignores_case_accents_and_punctuation():
+    assert normalize_name("  Lim-Dûl the NECROMANCER ") == "lim dul the necromancer"
+    assert normalize_name('"Ach! Hans, Run!"') == "ach hans run"
+    assert normalize_name("Urza's Tower") == "urzas tower"
+
+
+def test_exact_and_fuzzy_lookups(tmp_path):
+    path = str(tmp_path / "card_index.bin")
+    CardIndex.build(NAMES + ["black lotus"]).save(path)
+    index = CardIndex.load(path)
+
+    assert len(index) == len(NAMES)
+    assert index.exact("jace the mind sculptor") == "Jace, the Mind Sculptor"
+    assert index.exact("Delver of Secrets") == NAMES[5]
+    assert "Ach Hans Run" in index
+    assert index.exact("Lightnig Bolt") is None
+
+    assert index.resolve("Lightnig Bolt") == "Lightning Bolt"
+    assert index.resolve("Blak Lotus") == "Black Lotus"
+    assert index.resolve("Counterspell") is None
+    matches = index.search("black lotus", limit=2)
+    assert matches[0] == ("Black Lotus", 1.0)
+    assert matches[1][0] == "Blacker Lotus"
+
+
+def test_dedupe_keeps_indexed_spellings_in_order():
+    index = CardIndex.build(NAMES)
+    assert index.dedupe(
+        ["black lotus", "Sol Ring", "BLACK LOTUS", "sol ring", "Jace the Mind Sculptor"]
+    ) == ["Black Lotus", "Sol Ring", "Jace, the Mind Sculptor"]
+
+
+def test_open_rebuilds_when_the_names_change(tmp_path):
+    names_file = tmp_path / "all_cards.json"
+    path = str(tmp_path / "card_index.bin")
+    names_file.write_text('{"data": ["Black Lotus"]}')
+    assert len(CardIndex.open(path, str(names_file))) == 1
+    names_file.write_text('{"data": ["Black Lotus", "Sol Ring"]}')
+    os.utime(path, (0, 0))
+    assert CardIndex.open(path, str(names_file)).exact("sol ring") == "Sol Ring"
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from st_weaviate_connection.columnar import (
+    flatten_rows,
+    stack_vectors,
+    to_arrow,
+    to_pandas,
+)
+
+ROWS = [
+    {
+        "title": "Doug",
+        "episodes": "117",
+        "_additional": {"score": "0.75", "vector": [0.2, 0.3, 0.4]},
+    },
+    {
+        "title": "Rugrats",
+        "episodes": None,
+        "_additional": {"score": "0.5", "vector": [0.5, 0.4, 0.3]},
+    },
+]
+DATA_TYPES = {"title": "text", "episodes": "int"}
+
+
+def test_flatten_rows_matches_json_normalize():
+    rows = [{"a": 1, "b": {"c": 2}}, {"b": {"c": 3, "d": 4}}]
+    columns = flatten_rows(rows)
+    assert columns == {"a": [1, None], "b.c": [2, 3], "b.d": [None, 4]}
+    assert list(columns) == list(pd.json_normalize(rows).columns)
+
+
+def test_to_pandas_types_columns():
+    df = to_pandas(ROWS, DATA_TYPES)
+    assert list(df.columns) == [
+        "title",
+        "episodes",
+        "_additional.score",
+        "_additional.vector",
+    ]
+    assert str(df["episodes"].dtype) == "Int64"
+    assert df["episodes"].isna().tolist() == [False, True]
+    assert df["_additional.score"].dtype == np.float64
+    first, second = df["_additional.vector"]
+    assert first.dtype == np.float32
+    # Both vectors are views into one contiguous matrix.
+    matrix = stack_vectors(df["_additional.vector"])
+    assert matrix.shape == (2, 3)
+    assert np.shares_memory(matrix, first)
+    reordered = stack_vectors(df["_additional.vector"][::-1])
+    assert not np.shares_memory(reordered, first)
+    assert reordered[0].tolist() == second.tolist()
+
+
+def test_to_pandas_empty():
+    assert to_pandas([]).shape == (0, 0)
+
+
+def test_to_arrow_uses_fixed_size_vectors():
+    pa = pytest.importorskip("pyarrow")
+    table = to_arrow(ROWS, DATA_TYPES)
+    assert table.schema.field("episodes").type == pa.int64()
+    assert table.schema.field("_additional.vector").type == pa.list_(pa.float32(), 3)
+    assert table.column("title").to_pylist() == ["Doug", "Rugrats"]
@@ -1,7 +1,7 @@
 import pandas as pd
 import pytest
 
-from st_weaviate_connection import WeaviateConnection
+from st_weaviate_connection import AsyncWeaviateConnection, WeaviateConnection
 
 
 @pytest.fixture
@@ -88,3 +88,201 @@ def test_query_builder(weaviate_connection):
     assert df.shape == (3, 3)
     assert set(df.columns) == {"title", "creator", "_additional.distance"}
     assert df.iloc[0]["title"] == "Animaniacs"
+
+
+def test_client_is_reused(weaviate_connection):
+    assert weaviate_connection.client() is weaviate_connection.client()
+    assert weaviate_connection.is_healthy()
+
+
+def test_query_reconnects_after_reset(weaviate_connection):
+    client = weaviate_connection.client()
+    weaviate_connection.reset()
+    df = weaviate_connection.query("{ Get { TVShow { creator } } }")
+    assert df.shape == (5, 1)
+    assert weaviate_connection.client() is not client
+
+
+def test_pool_settings_from_kwargs(weaviate_db):
+    conn = WeaviateConnection(
+        "test_weaviate_pool",
+        url="http://localhost:8080",
+        pool_maxsize=4,
+        timeout=(2, 5),
+        retries=0,
+    )
+    assert conn._get_timeout_config() == (2, 5)
+    assert conn.client().is_ready()
+
+
+def test_query_results_are_cached(weaviate_connection):
+    query = "{ Get { TVShow { title creator } } }"
+    weaviate_connection.query(query)
+    hits = weaviate_connection.cache_stats()["hits"]
+    weaviate_connection.query("{Get{TVShow{title creator}}}")
+    assert weaviate_connection.cache_stats()["hits"] == hits + 1
+
+
+def test_batch_invalidates_class(weaviate_connection):
+    query = "{ Get { TVShow { title } } }"
+    weaviate_connection.query(query)
+    with weaviate_connection.batch("TVShow") as batch:
+        batch.add_data_object(
+            data_object={"title": "Recess"},
+            class_name="TVShow",
+            vector=[0.7, 0.6, 0.5, 0.4, 0.3],
+        )
+    df = weaviate_connection.query(query)
+    assert "Recess" in set(df["title"])
+    weaviate_connection.client().batch.delete_objects(
+        "TVShow",
+        where={"path": ["title"], "operator": "Equal", "valueText": "Recess"},
+    )
+    weaviate_connection.invalidate("TVShow")
+
+
+def test_scan_pages_through_class(weaviate_connection):
+    pages = list(weaviate_connection.scan("TVShow", ["title"], page_size=2))
+    assert [len(page) for page in pages] == [2, 2, 1]
+    titles = set(pd.concat(pages)["title"])
+    assert titles == {
+        "Animaniacs",
+        "Rugrats",
+        "Doug",
+        "Hey Arnold!",
+        "The Ren & Stimpy Show",
+    }
+
+
+def test_iter_query_yields_rows(weaviate_connection):
+    rows = list(
+        weaviate_connection.iter_query("TVShow", ["title"], page_size=3, prefetch=False)
+    )
+    assert len(rows) == 5
+    assert {"title", "_additional"} <= set(rows[0])
+
+
+def test_query_formats(weaviate_connection):
+    query = """
+    {
+        Get {
+            TVShow(limit: 2, nearVector: {vector: [0.1, 0.2, 0.3, 0.4, 0.5]}) {
+                title
+                _additional {
+                    distance
+                    vector
+                }
+            }
+        }
+    }
+    """
+    records = weaviate_connection.query(query, format="records")
+    assert records[0]["title"] == "Animaniacs"
+
+    # The default keeps the pd.json_normalize output: vectors stay lists
+    df = weaviate_connection.query(query)
+    assert list(df.columns) == ["title", "_additional.distance", "_additional.vector"]
+    assert df["_additional.distance"].dtype == "float64"
+    assert isinstance(df["_additional.vector"][0], list)
+
+    typed = weaviate_connection.query(query, format="typed")
+    assert typed["_additional.distance"].dtype == "float64"
+    assert typed["_additional.vector"][0].dtype == "float32"
+
+    table = weaviate_connection.query(query, format="arrow")
+    assert table.num_rows == 2
+    assert table.schema.field("_additional.vector").type.list_size == 5
+
+    with pytest.raises(ValueError):
+        weaviate_connection.query(query, format="csv")
+
+
+def test_near_vector(weaviate_connection):
+    df = weaviate_connection.near_vector(
+        "TVShow", [0.1, 0.2, 0.3, 0.4, 0.5], ["title"], limit=3
+    )
+    assert list(df.columns) == ["title", "id", "distance"]
+    assert df.iloc[0]["title"] == "Animaniacs"
+    assert df["distance"].is_monotonic_increasing
+
+
+def test_bm25(weaviate_connection):
+    df = weaviate_connection.bm25("TVShow", "Rugrats", ["title", "creator"])
+    assert set(df["title"]) == {"Rugrats"}
+    assert df["score"].dtype == "float64"
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_batch_search(weaviate_connection, concurrent):
+    searches = [
+        {
+            "method": "near_vector",
+            "class_name": "TVShow",
+            "vector": [0.3, 0.4, 0.5, 0.6, 0.7],
+            "properties": ["title"],
+            "limit": 1,
+        },
+        {
+            "method": "bm25",
+            "class_name": "TVShow",
+            "query": "Doug",
+            "properties": ["title"],
+        },
+    ]
+    weaviate_connection.invalidate()
+    near, keyword = weaviate_connection.batch_search(searches, concurrent=concurrent)
+    assert near.iloc[0]["title"] == "The Ren & Stimpy Show"
+    assert set(keyword["title"]) == {"Doug"}
+
+    hits = weaviate_connection.cache_stats()["hits"]
+    weaviate_connection.batch_search(searches)
+    assert weaviate_connection.cache_stats()["hits"] == hits + 2
+
+
+def test_async_gather(weaviate_db):
+    conn = AsyncWeaviateConnection("test_weaviate_async", url="http://localhost:8080")
+    try:
+        titles, keyword = conn.gather(
+            conn.aquery("{ Get { TVShow { title } } }"),
+            conn.asearch(
+                "bm25", class_name="TVShow", query="Rugrats", properties=["title"]
+            ),
+        )
+        assert titles.shape == (5, 1)
+        assert set(keyword["title"]) == {"Rugrats"}
+        assert "score" in keyword.columns
+    finally:
+        conn.close()
+
+
+def test_migrate_switches_readers_to_shadow_class(weaviate_connection):
+    from st_weaviate_connection.migration import migrate
+
+    schema = {
+        "class": "Episode",
+        "vectorizer": "none",
+        "properties": [{"name": "title", "dataType": ["text"]}],
+    }
+    weaviate_connection.create_class(schema)
+    try:
+        with weaviate_connection.batch("Episode") as batch:
+            for i in range(5):
+                batch.add_data_object(
+                    {"title": f"Episode {i}"}, "Episode", vector=[0.1 * i, 1.0]
+                )
+        schema["properties"].append({"name": "season", "dataType": ["int"]})
+        report = migrate(weaviate_connection, schema)
+        assert report.target == "Episode" and not report.diff.breaking
+
+        schema["properties"][0]["dataType"] = ["text[]"]
+        report = migrate(weaviate_connection, schema, page_size=2)
+        assert report.target == "Episode_v2" and report.copied == 5
+        assert weaviate_connection.resolve("Episode") == "Episode_v2"
+        rows = list(weaviate_connection.iter_query("Episode", ["title"]))
+        assert len(rows) == 5 and isinstance(rows[0]["title"], list)
+    finally:
+        # Later tests must not resolve Episode to the deleted shadow class
+        weaviate_connection.delete_alias("Episode")
+        assert weaviate_connection.resolve("Episode") == "Episode"
+        weaviate_connection.delete_class("Episode")
+        weaviate_connection.delete_class("Episode_v2")
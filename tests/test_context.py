@@ -0,0 +1,64 @@
+from aimstream.context import ContextBuilder, count_tokens
+from aimstream.history import History
+
+DOCKERFILE = "FROM alpine:3.19\nRUN apk add --no-cache nginx"
+
+
+def words(text):
+    return len(text.split())
+
+
+def conversation(turns):
+    history = History()
+    history.add("assistant", "Hey, Docker dev!")
+    history.add("user", "nginx on alpine")
+    history.add("assistant", f"Here you go:\n```dockerfile\n{DOCKERFILE}\n```")
+    for i in range(turns):
+        history.add("user", f"question {i} " + "padding " * 20)
+        history.add("assistant", f"answer {i} " + "padding " * 20)
+    return history.last(100)
+
+
+def test_count_tokens_is_local_and_deterministic():
+    assert count_tokens("RUN apt-get update") == count_tokens("RUN apt-get update")
+    assert count_tokens("") == 0
+
+
+def test_everything_is_kept_within_budget():
+    messages = ContextBuilder(budget=10_000, tokenizer=words).build(
+        conversation(2), "now add curl"
+    )
+    assert messages[0]["role"] == "system"
+    # The greeting before the first request is left out
+    assert messages[1] == {"role": "user", "content": "nginx on alpine"}
+    assert messages[-1] == {"role": "user", "content": "now add curl"}
+    assert len(messages) == 1 + 6 + 1
+
+
+def test_trims_summarizes_and_pins_the_dockerfile():
+    builder = ContextBuilder(budget=150, tokenizer=words)
+    messages = builder.build(conversation(6), "now add curl")
+    assert builder.prompt_tokens(messages) <= 150
+    contents = "\n".join(m["content"] for m in messages)
+    # The summary keeps the latest requests that fit its share of the budget
+    assert "Earlier in this conversation the user asked for:" in contents
+    assert "- question 5 padding" in contents
+    assert f"The current Dockerfile is:\n```dockerfile\n{DOCKERFILE}\n```" in contents
+    assert messages[-1]["content"] == "now add curl"
+    kept = [m for m in messages if m["role"] != "system"]
+    assert kept[0]["role"] == "user"
+
+
+def test_prefix_is_stable_between_trims():
+    builder = ContextBuilder(budget=300, tokenizer=words)
+    history = conversation(6)
+    first = builder.build(history, "now add curl")
+    second = builder.build(
+        history
+        + [
+            {"role": "user", "content": "now add curl"},
+            {"role": "assistant", "content": "ok"},
+        ],
+        "and git",
+    )
+    assert second[: len(first) - 1] == first[:-1]
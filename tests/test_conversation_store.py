@@ -0,0 +1,83 @@
+import pytest
+
+from aimstream.conversation_store import ConversationStore, MemoryStore, SQLiteStore
+from aimstream.history import History
+
+
+def fill(history, turns):
+    for i in range(turns):
+        history.add("user", f"image {i}")
+        history.add("assistant", f"FROM image:{i}")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "conversations.sqlite"))
+
+
+def test_history_keeps_only_recent_turns_in_session(store):
+    history = History(store, "c", recent_size=4)
+    fill(history, 10)
+    assert len(history._recent) == 4
+    assert [m["version"] for m in history.assistant_window(5)] == [5, 6, 7, 8, 9]
+    assert [m["content"] for m in history.last(2)] == ["image 9", "FROM image:9"]
+
+
+def test_history_resumes_from_its_store(store):
+    fill(History(store, "c"), 3)
+    resumed = History(store, "c")
+    assert len(resumed) == 6
+    assert resumed.assistant_count == 3
+    message = resumed.add("assistant", "FROM alpine")
+    assert (message["seq"], message["version"]) == (6, 3)
+    assert History(store, "other").assistant_count == 0
+
+
+def test_memory_store_caps_each_conversation():
+    store = MemoryStore(max_messages=4)
+    fill(History(store, "c"), 5)
+    assert [seq for seq, _, _ in store.index("c")] == [6, 7, 8, 9]
+    assert store.stats()["evictions"] == 6
+
+    store = MemoryStore(max_bytes=3 * 300)
+    history = History(store, "c", recent_size=0)
+    fill(history, 5)
+    assert store.stats()["bytes"] <= 3 * 300
+    assert len(history.assistant_window(5)) < 5
+
+
+def test_memory_store_evicts_least_recently_used_conversations():
+    store = MemoryStore(max_conversations=2)
+    for conversation_id in ["a", "b"]:
+        fill(History(store, conversation_id), 1)
+    store.index("a")
+    fill(History(store, "c"), 1)
+    assert store.stats()["conversations"] == 2
+    assert store.index("b") == []
+    assert store.index("a") != []
+
+
+def test_memory_store_bounds_its_total_size():
+    store = MemoryStore(max_total_bytes=3 * 2 * 300)
+    for conversation_id in ["a", "b", "c", "d"]:
+        fill(History(store, conversation_id), 1)
+    stats = store.stats()
+    assert stats["bytes"] <= 3 * 2 * 300
+    assert stats["conversations"] < 4 and stats["dropped_conversations"] >= 1
+    assert store.index("a") == [] and store.index("d") != []
+
+
+def test_assistant_count_excludes_evicted_messages(store):
+    store.max_messages = 4
+    history = History(store, "c", recent_size=2)
+    fill(history, 5)
+    # Only the last two turns are still stored
+    assert history.assistant_count == 2
+    assert len(history.assistant_window(history.assistant_count)) == 2
+
+
+def test_conversation_store_is_abstract():
+    with pytest.raises(TypeError):
+        ConversationStore()
@@ -0,0 +1,99 @@
+from aimstream.dockerfile import (
+    DockerfileExtractor,
+    analyze,
+    extract_dockerfile,
+    lint,
+    parse,
+)
+
+ANSWER = """Here is a Dockerfile for your app:
+
+```dockerfile
+FROM python
+WORKDIR /app
+COPY . .
+RUN pip install -r requirements.txt
+CMD ["python", "app.py"]
+```
+
+Build it with `docker build .`
+"""
+
+
+def rules(dockerfile):
+    return [(issue.rule, issue.line) for issue in lint(parse(dockerfile))]
+
+
+def test_extractor_finishes_when_the_fence_closes():
+    extractor = DockerfileExtractor()
+    chunks = [ANSWER[i : i + 7] for i in range(0, len(ANSWER), 7)]
+    seen = 0
+    for chunk in chunks:
+        extractor.feed(chunk)
+        seen += len(chunk)
+        if extractor.done:
+            break
+    assert extractor.dockerfile.startswith("FROM python\n")
+    assert extractor.dockerfile.endswith('CMD ["python", "app.py"]')
+    assert seen < len(ANSWER)
+
+
+def test_extract_dockerfile_fallbacks():
+    assert extract_dockerfile("```bash\nls\n```\nno Dockerfile") is None
+    assert extract_dockerfile("FROM alpine:3.19\nRUN ls") == "FROM alpine:3.19\nRUN ls"
+    assert (
+        extract_dockerfile("```\nFROM alpine:3.19\nRUN ls")
+        == "FROM alpine:3.19\nRUN ls"
+    )
+    streamed = DockerfileExtractor()
+    assert "".join(streamed.wrap(iter(["```docker\nFROM a", "lpine:3\n```"]))) == (
+        "```docker\nFROM alpine:3\n```"
+    )
+    assert streamed.dockerfile == "FROM alpine:3"
+
+
+def test_parse_joins_continuations_and_skips_comments():
+    instructions = parse(
+        "# syntax\nfrom alpine:3.19 AS base\nRUN apk add --no-cache \\\n"
+        "    # a comment inside\n    curl \\\n    git\n\nCMD sh"
+    )
+    assert [(i.keyword, i.arguments, i.line) for i in instructions] == [
+        ("FROM", "alpine:3.19 AS base", 2),
+        ("RUN", "apk add --no-cache curl git", 3),
+        ("CMD", "sh", 8),
+    ]
+
+
+def test_lint_reports_build_performance_issues():
+    assert rules(extract_dockerfile(ANSWER)) == [
+        ("DF001", 1),
+        ("DF002", 3),
+        ("DF003", 4),
+    ]
+    assert rules(
+        "FROM ubuntu:latest\nRUN apt-get update && apt-get install -y curl"
+    ) == [
+        ("DF001", 1),
+        ("DF003", 2),
+    ]
+    assert rules("FROM alpine:3.19\nRUN a\nRUN b\nRUN c\nCMD sh") == [("DF004", 2)]
+    assert rules("\n".join(["FROM alpine:3.19"] + ["COPY a b"] * 16)) == [("DF004", 17)]
+
+
+def test_yarn_scripts_are_not_dependency_installs():
+    build = "FROM node:20-alpine\nWORKDIR /app\nCOPY . .\nRUN yarn build\n"
+    assert "DF002" not in [rule for rule, _ in rules(build)]
+    for install in ["yarn", "yarn install --frozen-lockfile", "yarn && yarn build"]:
+        dockerfile = f"FROM node:20-alpine\nCOPY . .\nRUN {install}\n"
+        assert ("DF002", 2) in rules(dockerfile), install
+
+
+def test_clean_multi_stage_build():
+    result = analyze(
+        "FROM golang:1.22 AS build\nCOPY go.mod go.sum ./\nRUN go mod download\n"
+        "COPY . .\nRUN go build -o /app\n"
+        "FROM gcr.io/distroless/static@sha256:abc\nCOPY --from=build /app /app"
+    )
+    assert result.issues == []
+    assert (result.stages, result.layers) == (2, 1)
+    assert result.to_dict()["instructions"][0]["keyword"] == "FROM"
@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+from aimstream.embeddings import (
+    EmbeddingCache,
+    EmbeddingStage,
+    HashEmbedder,
+    vectorized_properties,
+    vectorized_text,
+)
+
+CARD = {
+    "name": "Black Lotus",
+    "img": "https://cards.scryfall.io/normal/lotus.jpg",
+    "mana_produced": ["Black", "Green"],
+    "power": 0.0,
+    "color": [],
+    "rarity": "bonus",
+}
+
+
+class CountingEmbedder(HashEmbedder):
+    def __init__(self) -> None:
+        super().__init__(dimensions=32)
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return super().__call__(texts)
+
+
+def test_vectorized_text_follows_the_schema():
+    with open("data/weaviate_schema.json") as reader:
+        class_obj = json.load(reader)
+    properties = vectorized_properties(class_obj)
+    names = [name for name, _ in properties]
+    assert "img" not in names and "power" not in names
+    assert names == sorted(names)
+    assert (
+        vectorized_text(CARD, properties, class_obj["class"])
+        == "magicchat_card mana_produced black green name black lotus rarity bonus"
+    )
+
+
+def test_hash_embedder_is_deterministic_and_normalized():
+    first, second, other = HashEmbedder(64)(["black lotus", "Black Lotus", "sol ring"])
+    assert first == second
+    assert np.linalg.norm(first) == pytest.approx(1.0)
+    assert first != other
+
+
+def test_stage_embeds_in_batches_and_skips_cached_texts(tmp_path):
+    embedder = CountingEmbedder()
+    stage = EmbeddingStage(embedder, EmbeddingCache(str(tmp_path)), "m", batch_size=2)
+    texts = ["a", "b", "a", "c"]
+    vectors = stage.embed(texts)
+    assert vectors.shape == (4, 32) and vectors.dtype == np.float32
+    assert embedder.batches == [["a", "b"], ["c"]]
+    assert np.array_equal(vectors[0], vectors[2])
+    assert stage.stats.misses == 3 and stage.stats.calls == 2
+
+    # A rebuild with unchanged content needs no embedding calls
+    stage.cache.close()
+    rebuilt = EmbeddingStage(embedder, EmbeddingCache(str(tmp_path)), "m")
+    assert len(rebuilt.cache) == 3
+    assert np.array_equal(rebuilt.embed(texts), vectors)
+    assert len(embedder.batches) == 2 and rebuilt.stats.hits == 3
+
+    # Keys include the model, so switching models re-embeds
+    EmbeddingStage(embedder, rebuilt.cache, "other").embed(["a"])
+    assert embedder.batches[-1] == ["a"]
+
+
+def test_cache_rejects_vectors_of_another_size(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many(["a"], np.ones((1, 4)))
+    with pytest.raises(ValueError):
+        cache.put_many(["b"], np.ones((1, 8)))
+    assert cache.get_many(["a", "b"]).keys() == {"a"}
@@ -0,0 +1,37 @@
+from aimstream.history import History, cache_info, render_html, window_size
+
+
+def test_ids_and_versions_are_assigned_once():
+    history = History()
+    history.add("assistant", "hello")
+    history.add("user", "alpine")
+    message = history.add("assistant", "FROM alpine", stats={"tokens": 2})
+    assert message["version"] == 1
+    assert message["stats"] == {"tokens": 2}
+    assert len({m["id"] for m in history.last(3)}) == 3
+    assert history.last(2)[1] is message
+    assert history.assistant_window(1) == [message]
+
+
+def test_window_covers_only_the_latest_versions():
+    history = History()
+    for i in range(25):
+        history.add("user", str(i))
+        history.add("assistant", f"FROM image:{i}")
+    shown, hidden = window_size(10, history.assistant_count)
+    assert (shown, hidden) == (10, 15)
+    window = history.assistant_window(shown)
+    assert [m["version"] for m in window] == list(range(15, 25))
+    assert window_size(40, 3) == (3, 0)
+
+
+def test_rendering_reuses_message_html():
+    history = History()
+    message = history.add("assistant", "FROM alpine")
+    before = cache_info()
+    html = render_html([message])
+    assert message["id"] in html and "FROM alpine" in html
+    assert render_html([message]) == html
+    after = cache_info()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
@@ -0,0 +1,146 @@
+import json
+from uuid import uuid4
+
+import pytest
+import requests
+
+from data.checkpoint import Checkpoint, card_key
+from data.ingest import BatchWriter, iter_json_objects, run_pipeline
+
+
+class FakeBatch:
+    """Stands in for `client.batch`, rejecting the objects named in `reject`"""
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.callback = None
+        self.objects = []
+
+    def configure(self, batch_size=None, callback=None, **kwargs):
+        self.callback = callback
+        return self
+
+    def __enter__(self):
+        self._pending = []
+        return self
+
+    def add_data_object(self, data_object, class_name, uuid=None, vector=None):
+        object_id = uuid or str(uuid4())
+        self._pending.append((object_id, data_object))
+        return object_id
+
+    def __exit__(self, *exc):
+        results = []
+        for object_id, data_object in self._pending:
+            result = {}
+            if data_object["name"] in self.reject:
+                result = {"errors": {"error": [{"message": "invalid text property"}]}}
+            else:
+                self.objects.append(data_object)
+            results.append({"id": object_id, "result": result})
+        if self.callback is not None:
+            self.callback(results)
+
+
+class FakeClient:
+    def __init__(self, reject=()):
+        self.batch = FakeBatch(reject)
+
+
+def test_rejected_objects_are_failed_not_checkpointed(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.sqlite"))
+    client = FakeClient(reject={"Bad Card"})
+    writer = BatchWriter(client, "Card", on_flush=checkpoint.mark)
+    for name in ["Good Card", "Bad Card", "Other Card"]:
+        writer.add({"name": name})
+    writer.flush()
+    assert writer.stats.imported == 2 and writer.stats.failed == 1
+    assert checkpoint.processed() == {"good card", "other card"}
+    checkpoint.close()
+
+
+def test_checkpoint_resumes_after_partial_run(tmp_path):
+    path = str(tmp_path / "checkpoint.sqlite")
+    names = [f"Card {i}" for i in range(10)]
+
+    checkpoint = Checkpoint(path)
+    writer = BatchWriter(FakeClient(), "Card", batch_size=4, on_flush=checkpoint.mark)
+    for name in names[:6]:
+        writer.add({"name": name})
+    # The run stops before the last partial batch is flushed
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path)
+    processed = checkpoint.processed()
+    remaining = [name for name in names if card_key(name) not in processed]
+    assert remaining == names[4:]
+    client = FakeClient()
+    writer = BatchWriter(client, "Card", batch_size=4, on_flush=checkpoint.mark)
+    for name in remaining:
+        writer.add({"name": name})
+    writer.flush()
+    assert [o["name"] for o in client.batch.objects] == names[4:]
+    assert checkpoint.count() == len(names)
+    checkpoint.close()
+
+
+def test_fetch_errors_count_as_failed_and_pipeline_finishes():
+    def fetch(card_name, session):
+        if card_name == "Odd Card":
+            raise ValueError("unexpected card layout")
+        if card_name == "Offline Card":
+            raise requests.ConnectionError("connection reset")
+        if card_name == "Missing Card":
+            return None
+        return {"name": card_name}
+
+    names = ["Card A", "Odd Card", "Card B", "Offline Card", "Missing Card"]
+    client = FakeClient()
+    writer = BatchWriter(client, "Card", batch_size=2)
+    stats = run_pipeline(names, fetch, writer, workers=3, rate=1000)
+    assert (stats.fetched, stats.failed, stats.not_found) == (2, 2, 1)
+    assert sorted(o["name"] for o in client.batch.objects) == ["Card A", "Card B"]
+
+
+def test_fetcher_exceptions_never_hang_the_writer():
+    def fetch(card_name, session):
+        raise RuntimeError("sqlite is locked")
+
+    stats = run_pipeline(
+        [f"Card {i}" for i in range(20)], fetch, BatchWriter(FakeClient(), "Card")
+    )
+    assert stats.failed == 20 and stats.imported == 0
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+CARDS = [{"name": "Island", "text": "[T]: Add {U}."}, {"name": 'Say "Hi"', "n": [1, 2]}]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1 << 20])
+def test_iter_json_objects_reads_arrays(tmp_path, chunk_size):
+    path = _write(tmp_path / "cards.json", json.dumps(CARDS))
+    assert list(iter_json_objects(path, chunk_size)) == CARDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+def test_iter_json_objects_reads_ndjson(tmp_path, chunk_size):
+    text = "\n".join(json.dumps(card) for card in CARDS) + "\n"
+    path = _write(tmp_path / "cards.ndjson", text)
+    assert list(iter_json_objects(path, chunk_size)) == CARDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5])
+def test_iter_json_objects_reads_pretty_printed(tmp_path, chunk_size):
+    path = _write(tmp_path / "cards.json", json.dumps(CARDS, indent=4))
+    assert list(iter_json_objects(path, chunk_size)) == CARDS
+    assert list(iter_json_objects(_write(tmp_path / "empty.json", "[\n]\n"), 1)) == []
+
+
+def test_iter_json_objects_raises_on_truncated_input(tmp_path):
+    path = _write(tmp_path / "cards.json", json.dumps(CARDS)[:-5])
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_objects(path, 4))
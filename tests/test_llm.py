@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from aimstream.llm import StreamStats, get_openai_response_by_model, stream_completion
+
+
+class FakeStream:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.closed = False
+
+    def __iter__(self):
+        for delta in self.deltas:
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))]
+            )
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, deltas):
+        self.stream = FakeStream(deltas)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return self.stream
+
+
+def test_stream_completion_yields_deltas():
+    client = FakeClient(["FROM ", None, "alpine", ""])
+    stats = StreamStats()
+    chunks = list(stream_completion(client, "alpine", "gemma", stats=stats))
+    assert chunks == ["FROM ", "alpine"]
+    assert client.requests[0]["stream"] is True
+    assert client.stream.closed
+    assert stats.tokens == 2
+    assert stats.time_to_first_token is not None
+    assert stats.to_dict()["tokens"] == 2
+
+
+def test_get_openai_response_by_model_joins_stream():
+    client = FakeClient(["FROM ", "alpine"])
+    assert get_openai_response_by_model("alpine", "gemma", client=client) == (
+        "DONE.",
+        "FROM alpine",
+    )
@@ -0,0 +1,170 @@
+import json
+import urllib.request
+
+import pytest
+
+from aimstream import metrics
+from aimstream.llm import LLM_TOKENS, stream_completion
+from benchmarks.fakes import FakeWeaviate
+from st_weaviate_connection import WeaviateConnection
+
+from .test_llm import FakeClient
+
+
+@pytest.fixture
+def registry():
+    yield metrics.Registry(enabled=True)
+
+
+@pytest.fixture
+def enabled():
+    metrics.configure(enabled=True)
+    yield metrics.REGISTRY
+    metrics.configure(enabled=False)
+
+
+def test_disabled_registry_records_nothing():
+    registry = metrics.Registry()
+    counter = registry.counter("requests_total", "Requests", ("model",))
+    histogram = registry.histogram("latency_seconds", "Latency")
+    counter.labels("gemma").inc()
+    histogram.observe(0.2)
+    assert counter.labels("gemma").value == 0
+    assert histogram.labels().count == 0
+
+
+def test_render_counters_and_gauges(registry):
+    counter = registry.counter("requests_total", "Requests", ("model",))
+    counter.labels("gemma").inc()
+    counter.labels("gemma").inc(2)
+    counter.labels('say "hi"').inc()
+    registry.gauge("queued", "Queued").set(4)
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{model="gemma"} 3' in text
+    assert 'requests_total{model="say \\"hi\\""} 1' in text
+    assert "queued 4" in text.splitlines()
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.65" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_registration_is_idempotent(registry):
+    counter = registry.counter("requests_total", "Requests")
+    assert registry.counter("requests_total", "Requests") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
+    with pytest.raises(ValueError):
+        counter.labels("unexpected")
+
+
+def test_callbacks_are_read_at_render(registry):
+    stats = {"hits": 1}
+    registry.callback(
+        "cache_hits_total", "Hits", ("cache",), lambda: {("query",): stats["hits"]}
+    )
+    stats["hits"] = 5
+    assert 'cache_hits_total{cache="query"} 5' in registry.render()
+    registry.callback("broken", "Fails", (), lambda: 1 / 0)
+    assert "cache_hits_total" in registry.render()
+
+
+def test_write_and_serve(registry, tmp_path):
+    registry.counter("requests_total", "Requests").inc()
+    path = str(tmp_path / "metrics.prom")
+    registry.write(path)
+    with open(path) as reader:
+        assert "requests_total 1" in reader.read()
+
+    server = metrics.serve(0, registry, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert "requests_total 1" in response.read().decode()
+    finally:
+        server.shutdown()
+
+
+def test_spans_nest_and_record_errors(tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    tracer = metrics.Tracer(path)
+    with tracer.span("prompt", model="gemma") as parent:
+        with pytest.raises(KeyError):
+            with tracer.span("retrieval"):
+                raise KeyError("missing")
+        child = tracer.start("llm.stream")
+        tracer.finish(child)
+    with open(path) as reader:
+        retrieval, stream, prompt = [json.loads(line) for line in reader]
+    assert prompt["parent_id"] is None and prompt["attributes"] == {"model": "gemma"}
+    assert retrieval["parent_id"] == stream["parent_id"] == parent.span_id
+    assert retrieval["trace_id"] == prompt["trace_id"]
+    assert retrieval["error"].startswith("KeyError")
+    assert prompt["duration"] >= retrieval["duration"]
+
+
+def test_disabled_tracer_yields_no_span():
+    tracer = metrics.Tracer()
+    with tracer.span("prompt") as span:
+        assert span is None
+    assert tracer.start("prompt") is None
+
+
+def test_stream_completion_records_tokens(enabled):
+    tokens = LLM_TOKENS.labels("metrics-test")
+    before = tokens.value
+    list(stream_completion(FakeClient(["FROM ", "alpine"]), "alpine", "metrics-test"))
+    assert tokens.value == before + 2
+    text = metrics.REGISTRY.render()
+    assert (
+        'aimstream_llm_stream_seconds_count{model="metrics-test",status="ok"} 1' in text
+    )
+    assert (
+        'aimstream_llm_time_to_first_token_seconds_count{model="metrics-test"} 1'
+        in text
+    )
+
+
+def test_instrument_connection(enabled):
+    class FakeConnection:
+        on_timing = None
+
+        def cache_stats(self):
+            return {"hits": 3, "misses": 1, "evictions": 0, "entries": 1}
+
+    connection = FakeConnection()
+    metrics.instrument_connection(connection, name="fake")
+    connection.on_timing("query", 0.02)
+    text = metrics.REGISTRY.render()
+    assert 'aimstream_weaviate_query_cache_hits_total{connection="fake"} 3' in text
+    assert (
+        'aimstream_weaviate_request_seconds_count{connection="fake",operation="query"} 1'
+        in text
+    )
+
+
+def test_connection_timer_times_the_initial_connect(enabled):
+    with FakeWeaviate() as weaviate:
+        connection = WeaviateConnection(
+            "metrics-test",
+            url=weaviate.url,
+            on_timing=metrics.connection_timer("timed"),
+        )
+        metrics.instrument_connection(connection, name="timed")
+        assert connection.on_timing is metrics.connection_timer("timed")
+        connection.close()
+    text = metrics.REGISTRY.render()
+    assert (
+        'aimstream_weaviate_request_seconds_count{connection="timed",operation="connect"} 1'
+        in text
+    )
@@ -0,0 +1,81 @@
+import json
+
+from st_weaviate_connection.migration import (
+    MigrationReport,
+    convert_value,
+    diff_schema,
+    next_version,
+)
+
+
+def _schema():
+    with open("data/weaviate_schema.json") as reader:
+        return json.load(reader)
+
+
+def _live(schema: dict) -> dict:
+    """The class as Weaviate returns it, with defaults filled in"""
+    live = json.loads(json.dumps(schema))
+    live["moduleConfig"]["text2vec-openai"]["vectorizeClassName"] = True
+    live["vectorIndexType"] = "hnsw"
+    for prop in live["properties"]:
+        prop["tokenization"] = "word"
+    return live
+
+
+def test_unchanged_schema_has_no_diff():
+    schema = _schema()
+    assert not diff_schema(schema, _live(schema)).changed
+
+
+def test_missing_class_and_new_properties_are_additive():
+    schema = _schema()
+    assert diff_schema(schema, None).missing
+    live = _live(schema)
+    live["properties"] = [p for p in live["properties"] if p["name"] != "rarity"]
+    diff = diff_schema(schema, live)
+    assert [p["name"] for p in diff.added] == ["rarity"]
+    assert diff.breaking == [] and diff.describe() == ["add property rarity"]
+
+
+def test_type_vectorizer_and_removed_properties_are_breaking():
+    schema = _schema()
+    live = _live(schema)
+    live["properties"][0]["dataType"] = ["string"]
+    live["properties"].append({"name": "legacy", "dataType": ["text"]})
+    live["moduleConfig"]["text2vec-openai"]["model"] = "babbage"
+    diff = diff_schema(schema, live)
+    assert diff.breaking == [
+        "class moduleConfig changed",
+        "name: string -> text",
+        "legacy: removed",
+    ]
+    live["vectorizer"] = "none"
+    assert diff_schema(schema, live).breaking[0] == "vectorizer none -> text2vec-openai"
+
+
+def test_convert_value_to_new_types():
+    assert convert_value("['White', 'Blue']", "text[]") == ["White", "Blue"]
+    assert convert_value("", "text[]") == []
+    assert convert_value("Flying", "text[]") == ["Flying"]
+    assert convert_value("3", "number") == 3.0
+    assert convert_value("*", "number") is None
+    assert convert_value("2", "int") == 2
+    assert convert_value(["a", "b"], "text") == "a, b"
+    assert convert_value(None, "text") is None
+
+
+def test_next_version():
+    assert next_version("MagicChat_Card", ["MagicChat_Card"]) == "MagicChat_Card_v2"
+    assert (
+        next_version("MagicChat_Card", ["MagicChat_Card_v2", "Other_v9"])
+        == "MagicChat_Card_v3"
+    )
+
+
+def test_report_throughput():
+    report = MigrationReport("A", "A", diff_schema(_schema(), None))
+    report.target, report.copied = "A_v2", 500
+    report.finished = report.started + 2
+    assert report.throughput() == 250
+    assert "250 objects/s" in report.summary()
@@ -0,0 +1,79 @@
+import pytest
+
+from data.normalize import normalize_batches, normalize_card, to_number
+
+LIGHTNING_HELIX = {
+    "name": "Lightning Helix",
+    "arena_id": 68505,
+    "image_uris": {"normal": "https://cards.scryfall.io/normal/helix.jpg"},
+    "mana_cost": "{R}{W}",
+    "type_line": "Instant",
+    "colors": ["R", "W"],
+    "keywords": [],
+    "set_name": "Ravnica: City of Guilds",
+    "rarity": "uncommon",
+    "oracle_text": "Lightning Helix deals 3 damage to any target.",
+}
+TARMOGOYF = {
+    "name": "Tarmogoyf",
+    "mana_cost": "{1}{G}",
+    "type_line": "Creature — Lhurgoyf",
+    "colors": ["G"],
+    "power": "*",
+    "toughness": "1+*",
+}
+WASTES = {"name": "Wastes", "type_line": "Basic Land", "produced_mana": ["C"]}
+ELDRAZI = {
+    "name": "Thought-Knot Seer",
+    "mana_cost": "{3}{C}",
+    "type_line": "Creature — Eldrazi",
+    "colors": [],
+    "power": "4",
+    "toughness": "4",
+}
+
+
+def test_normalize_card_maps_known_cards():
+    assert normalize_card(LIGHTNING_HELIX) == {
+        "name": "Lightning Helix",
+        "card_id": "68505",
+        "img": "https://cards.scryfall.io/normal/helix.jpg",
+        "mana_cost": "{Red}{White}",
+        "type": "Instant",
+        "mana_produced": [],
+        "color": ["Red", "White"],
+        "keyword": [],
+        "set": "Ravnica: City of Guilds",
+        "rarity": "uncommon",
+        "description": "Lightning Helix deals 3 damage to any target.",
+    }
+    goyf = normalize_card(TARMOGOYF)
+    assert goyf["mana_cost"] == "{1}{Green}" and goyf["color"] == ["Green"]
+    # Variable power and toughness have no number, but keep their printed text
+    assert "power" not in goyf and "toughness" not in goyf
+    assert (goyf["power_text"], goyf["toughness_text"]) == ("*", "1+*")
+
+
+def test_colorless_and_missing_mana_costs_match_the_original_mapping():
+    wastes = normalize_card(WASTES)
+    assert wastes["mana_cost"] == "0"
+    assert wastes["mana_produced"] == ["C"]
+    seer = normalize_card(ELDRAZI)
+    assert seer["mana_cost"] == "{3}{C}"
+    assert (seer["power"], seer["toughness"]) == (4.0, 4.0)
+    assert (seer["power_text"], seer["toughness_text"]) == ("4", "4")
+
+
+def test_batches_match_single_cards():
+    cards = [LIGHTNING_HELIX, TARMOGOYF, WASTES, ELDRAZI] * 3
+    assert list(normalize_batches(cards, batch_size=5)) == [
+        normalize_card(card) for card in cards
+    ]
+
+
+@pytest.mark.parametrize(
+    "value, number",
+    [("2", 2.0), ("-1", -1.0), ("1.5", 1.5), ("*", None), ("inf", None), (None, None)],
+)
+def test_to_number(value, number):
+    assert to_number(value) == number
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeWeaviate
+from st_weaviate_connection import AsyncWeaviateConnection, WeaviateConnection
+
+SHOWS = [
+    ("Animaniacs", "Three zany siblings wreak havoc on the studio lot."),
+    ("Rugrats", "The adventures of a group of toddlers."),
+    ("Doug", "The everyday life of a shy boy named Doug Funnie."),
+]
+
+TV_SHOW = {
+    "class": "TVShow",
+    "properties": [
+        {"name": "title", "dataType": ["text"]},
+        {"name": "synopsis", "dataType": ["text"]},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def fake_weaviate():
+    with FakeWeaviate() as weaviate:
+        weaviate.create_class(TV_SHOW)
+        weaviate.add_objects(
+            "TVShow",
+            [
+                {
+                    "properties": {"title": title, "synopsis": synopsis},
+                    "vector": [float(i + 1), 1.0, 0.5],
+                }
+                for i, (title, synopsis) in enumerate(SHOWS)
+            ],
+        )
+        yield weaviate
+
+
+@pytest.fixture
+def connection(fake_weaviate):
+    connection = WeaviateConnection("test_offline", url=fake_weaviate.url)
+    yield connection
+    connection.close()
+
+
+@pytest.mark.parametrize("format", ["pandas", "typed"])
+def test_search_scores_are_floats(connection, format):
+    bm25 = connection.bm25("TVShow", "toddlers", ["title"], format=format)
+    assert bm25["score"].dtype == "float64"
+    assert bm25["title"].iloc[0] == "Rugrats"
+
+    hybrid = connection.hybrid(
+        "TVShow", "Doug", ["title"], vector=[3.0, 1.0, 0.5], format=format
+    )
+    assert hybrid["score"].dtype == "float64"
+    assert list(hybrid["score"]) == sorted(hybrid["score"], reverse=True)
+
+    [batched] = connection.batch_search(
+        [
+            {
+                "method": "bm25",
+                "class_name": "TVShow",
+                "query": "toddlers",
+                "properties": ["title"],
+            }
+        ],
+        format=format,
+    )
+    assert batched["score"].dtype == "float64"
+
+
+def test_arrow_search_scores_are_floats(connection):
+    pa = pytest.importorskip("pyarrow")
+    table = connection.bm25("TVShow", "toddlers", ["title"], format="arrow")
+    assert table.schema.field("score").type == pa.float64()
+
+
+def test_records_do_not_share_the_cached_rows(connection):
+    query = "{ Get { TVShow { title } } }"
+    records = connection.query(query, format="records")
+    records[0]["title"] = "MUTATED"
+    assert "MUTATED" not in set(connection.query(query)["title"])
+    assert connection.query(query, format="records")[0]["title"] != "MUTATED"
+
+
+def test_async_queries_work_across_event_loops(fake_weaviate):
+    pytest.importorskip("httpx")
+    connection = AsyncWeaviateConnection("test_offline_async", url=fake_weaviate.url)
+    query = "{ Get { TVShow { title } } }"
+    try:
+        for _ in range(2):
+            df = asyncio.run(connection.aquery(query, ttl=0))
+            assert set(df["title"]) == {title for title, _ in SHOWS}
+        [df] = connection.gather(connection.aquery(query, ttl=0))
+        assert len(df) == len(SHOWS)
+    finally:
+        connection.close()
@@ -0,0 +1,67 @@
+import time
+
+from aimstream.response_cache import ExactCache, ResponseCache, context_key, exact_key
+
+
+class FakeSemantic:
+    def __init__(self):
+        self.entries = {}
+        self.embedded = []
+
+    def embed(self, text):
+        self.embedded.append(text)
+        return [float(len(text))]
+
+    def get(self, prompt, context, vector):
+        return self.entries.get((context, vector[0]))
+
+    def put(self, prompt, context, vector, content):
+        self.entries[(context, vector[0])] = content
+
+
+def test_exact_key_ignores_case_and_whitespace():
+    context = context_key("gemma")
+    assert exact_key("Python  web app\n", context) == exact_key(
+        "python web app", context
+    )
+    assert exact_key("python", context) != exact_key("python", context_key("llama"))
+
+
+def test_exact_cache_expires_entries(tmp_path):
+    cache = ExactCache(str(tmp_path / "cache.sqlite"), ttl=0.05)
+    cache.put("a", "FROM alpine")
+    assert cache.get("a") == "FROM alpine"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_exact_cache_evicts_least_recently_used(tmp_path):
+    cache = ExactCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("a", "1")
+    time.sleep(0.01)
+    cache.put("b", "2")
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", "3")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+
+def test_response_cache_layers(tmp_path):
+    semantic = FakeSemantic()
+    cache = ResponseCache(ExactCache(str(tmp_path / "cache.sqlite")), semantic)
+    assert cache.get("python app", "gemma") is None
+    cache.put("python app", "gemma", "FROM python:3.11-slim")
+    # Same length prompt stands in for a near-duplicate under the fake embedder
+    assert cache.get("PYTHON APX", "gemma") == "FROM python:3.11-slim"
+    assert cache.get("python apx", "gemma") == "FROM python:3.11-slim"
+    assert cache.get("python app", "llama") is None
+    assert semantic.embedded.count("python app") == 1
+    assert cache.stats() == {
+        "exact_hits": 1,
+        "semantic_hits": 1,
+        "misses": 2,
+        "hit_rate": 0.5,
+    }
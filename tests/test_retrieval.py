@@ -0,0 +1,93 @@
+import json
+
+import pandas as pd
+
+from aimstream.context import ContextBuilder
+from aimstream.dockerfile import analyze
+from aimstream.retrieval import (
+    EXAMPLE_PROMPTS,
+    PromptEmbeddings,
+    ReferenceRetriever,
+    format_references,
+)
+
+REFERENCE = {
+    "title": "Alpine Nginx",
+    "description": "Alpine Linux image with Nginx",
+    "base_image": "alpine:3.19",
+    "dockerfile": "FROM alpine:3.19\nRUN apk add --no-cache nginx",
+}
+
+
+class FakeConnection:
+    def __init__(self):
+        self.searches = []
+
+    def hybrid(self, class_name, query, properties, limit=10, **options):
+        self.searches.append((class_name, query, limit, options))
+        return pd.DataFrame([{**REFERENCE, "score": 0.9}])
+
+
+def test_retriever_prefers_precomputed_embeddings(tmp_path):
+    path = str(tmp_path / "embeddings.json")
+    PromptEmbeddings.build(EXAMPLE_PROMPTS, lambda p: [1.0, 0.0], "m").save(path)
+    embedded = []
+    connection = FakeConnection()
+    retriever = ReferenceRetriever(
+        connection,
+        embed=lambda p: embedded.append(p) or [0.0, 1.0],
+        precomputed=PromptEmbeddings.load(path, model="m"),
+    )
+    assert retriever.search(EXAMPLE_PROMPTS[0].upper())[0]["title"] == "Alpine Nginx"
+    retriever.search("nginx on alpine")
+    retriever.search("nginx on alpine")
+    assert embedded == ["nginx on alpine"]
+    vectors = [options["vector"] for _, _, _, options in connection.searches]
+    assert vectors == [[1.0, 0.0], [0.0, 1.0], [0.0, 1.0]]
+    assert connection.searches[0][2] == 3
+
+
+def test_missing_embeddings_file_is_empty(tmp_path):
+    assert len(PromptEmbeddings.load(str(tmp_path / "missing.json"))) == 0
+
+
+def test_embeddings_from_another_model_are_ignored(tmp_path):
+    path = str(tmp_path / "embeddings.json")
+    PromptEmbeddings.build(EXAMPLE_PROMPTS, lambda p: [1.0, 0.0], "old-model").save(
+        path
+    )
+    stale = PromptEmbeddings.load(path, model="new-model")
+    assert len(stale) == 0 and stale.get(EXAMPLE_PROMPTS[0]) is None
+    assert len(PromptEmbeddings.load(path)) == 0
+    assert len(PromptEmbeddings.load(path, model="old-model")) == len(EXAMPLE_PROMPTS)
+    assert len(PromptEmbeddings.load(path, model=None)) == len(EXAMPLE_PROMPTS)
+
+
+def test_references_go_right_before_the_prompt():
+    references = format_references([REFERENCE])
+    assert "```dockerfile\nFROM alpine:3.19" in references
+    assert format_references([]) == ""
+    history = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "ok"},
+    ]
+    messages = ContextBuilder().build(history, "nginx", references=references)
+    assert [m["role"] for m in messages] == [
+        "system",
+        "user",
+        "assistant",
+        "system",
+        "user",
+    ]
+    assert messages[-2]["content"] == references
+    assert ContextBuilder(budget=50).build(history, "nginx", references=references)[
+        -2
+    ] == {"role": "assistant", "content": "ok"}
+
+
+def test_shipped_references_are_lint_clean():
+    with open("data/reference_dockerfiles.json") as reader:
+        references = json.load(reader)
+    assert len(references) >= len(EXAMPLE_PROMPTS)
+    for reference in references:
+        assert analyze(reference["dockerfile"]).issues == []
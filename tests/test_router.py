@@ -0,0 +1,110 @@
+import httpx
+import openai
+import pytest
+
+from aimstream.llm import StreamStats
+from aimstream.router import (
+    LATENCY,
+    CircuitBreaker,
+    Endpoint,
+    NoBackendAvailable,
+    Router,
+)
+from tests.test_llm import FakeClient
+
+
+class DownClient(FakeClient):
+    def __init__(self):
+        super().__init__([])
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        raise openai.APIConnectionError(
+            request=httpx.Request("POST", "http://down/v1/chat/completions")
+        )
+
+
+def endpoint(client, name):
+    return Endpoint(f"http://{name}/v1", client=client)
+
+
+def test_fails_over_to_the_next_endpoint_and_fallback_model():
+    down = DownClient()
+    small = FakeClient(["FROM ", "alpine"])
+    router = Router(
+        {"big": [endpoint(down, "a")], "small": [endpoint(small, "b")]},
+        fallbacks={"big": "small"},
+    )
+    stats = StreamStats()
+    assert list(router.stream("alpine", "big", stats=stats)) == ["FROM ", "alpine"]
+    assert small.requests[0]["model"] == "small"
+    assert stats.tokens == 2
+    assert router.backends["big"][0].breaker.failures == 1
+    assert router.backends["small"][0].outstanding == 0
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_open_endpoints_are_skipped():
+    down = DownClient()
+    router = Router({"big": [endpoint(down, "a")]})
+    router.backends["big"][0].breaker = CircuitBreaker(failure_threshold=1)
+    with pytest.raises(NoBackendAvailable):
+        list(router.stream("alpine", "big"))
+    with pytest.raises(NoBackendAvailable):
+        list(router.stream("alpine", "big"))
+    assert down.calls == 1
+
+
+def test_ranks_by_outstanding_requests_or_latency():
+    busy, idle = endpoint(FakeClient([]), "busy"), endpoint(FakeClient([]), "idle")
+    busy.outstanding, busy.latency = 2, 0.1
+    idle.outstanding, idle.latency = 0, 1.0
+    router = Router({"m": [busy, idle]})
+    assert [e for _, e in router.candidates("m")] == [idle, busy]
+    router.strategy = LATENCY
+    assert [e for _, e in router.candidates("m")] == [busy, idle]
+
+
+def test_from_config_shares_clients_per_server():
+    router = Router.from_config(
+        {
+            "models": {
+                "a": {"endpoints": [{"base_url": "http://x/v1", "api_key": "k"}]},
+                "b": {"endpoints": [{"base_url": "http://x/v1", "api_key": "k"}]},
+            }
+        }
+    )
+    assert router.backends["a"][0].client is router.backends["b"][0].client
+    assert router.capacity("a") == 1
+
+
+def test_close_closes_each_shared_client_once():
+    class ClosingClient(FakeClient):
+        def __init__(self):
+            super().__init__([])
+            self.closed = 0
+
+        def close(self):
+            self.closed += 1
+
+    shared, other = ClosingClient(), ClosingClient()
+    router = Router(
+        {
+            "a": [endpoint(shared, "x"), endpoint(other, "y")],
+            "b": [endpoint(shared, "x")],
+        }
+    )
+    router.close()
+    assert (shared.closed, other.closed) == (1, 1)
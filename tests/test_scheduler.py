@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from aimstream.scheduler import Cancelled, Scheduler, SchedulerTimeout
+from tests.test_llm import FakeClient
+
+
+def test_slots_are_limited_per_model():
+    scheduler = Scheduler(max_in_flight=1, limits={"big": 2})
+    first = scheduler.submit("small")
+    scheduler.wait(first)
+    blocked = scheduler.submit("small")
+    with pytest.raises(SchedulerTimeout):
+        scheduler.wait(blocked, timeout=0.05)
+    with scheduler.slot("big"), scheduler.slot("big"):
+        assert scheduler.stats()["big"] == {"queued": 0, "in_flight": 2, "limit": 2}
+    scheduler.release(first)
+    assert scheduler.stats()["small"] == {"queued": 0, "in_flight": 0, "limit": 1}
+
+
+def test_requests_are_admitted_in_order():
+    scheduler = Scheduler()
+    holder = scheduler.submit("gemma")
+    scheduler.wait(holder)
+    order, positions = [], {}
+
+    def request(name):
+        ticket = scheduler.submit("gemma", session_id=name)
+        scheduler.wait(ticket, on_position=lambda p: positions.setdefault(name, p))
+        order.append(name)
+        scheduler.release(ticket)
+
+    threads = []
+    for name in ["a", "b", "c"]:
+        threads.append(threading.Thread(target=request, args=(name,)))
+        threads[-1].start()
+        time.sleep(0.05)
+    scheduler.release(holder)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ["a", "b", "c"]
+    assert positions == {"a": 1, "b": 2, "c": 3}
+
+
+def test_slow_position_updates_do_not_block_other_sessions():
+    scheduler = Scheduler()
+    holder = scheduler.submit("gemma")
+    scheduler.wait(holder)
+    reporting, unblock = threading.Event(), threading.Event()
+
+    def slow_update(position):
+        reporting.set()
+        unblock.wait(5)
+
+    waiter = threading.Thread(
+        target=lambda: scheduler.wait(
+            scheduler.submit("gemma"), timeout=5, on_position=slow_update
+        )
+    )
+    waiter.start()
+    assert reporting.wait(1)
+    # Another session can still be admitted and released while the update runs
+    with scheduler.slot("other", timeout=0.5):
+        pass
+    scheduler.release(holder)
+    unblock.set()
+    waiter.join(5)
+    assert scheduler.stats()["gemma"]["in_flight"] == 1
+
+
+def test_resubmitting_cancels_the_waiting_ticket():
+    scheduler = Scheduler()
+    holder = scheduler.submit("gemma")
+    scheduler.wait(holder)
+    stale = scheduler.submit("gemma", session_id="s")
+    fresh = scheduler.submit("gemma", session_id="s")
+    with pytest.raises(Cancelled):
+        scheduler.wait(stale)
+    assert scheduler.position(fresh) == 0
+    scheduler.release(holder)
+    scheduler.wait(fresh, timeout=1)
+
+
+def test_stream_releases_the_slot_when_closed():
+    scheduler = Scheduler()
+    client = FakeClient(["FROM ", "alpine"])
+    chunks = scheduler.stream(client, "alpine", "gemma")
+    assert next(chunks) == "FROM "
+    assert scheduler.stats()["gemma"]["in_flight"] == 1
+    chunks.close()
+    assert client.stream.closed
+    assert scheduler.stats()["gemma"]["in_flight"] == 0
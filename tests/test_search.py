@@ -0,0 +1,41 @@
+import pytest
+
+from st_weaviate_connection import search
+
+
+def test_near_vector_renders_distance():
+    query = search.near_vector(
+        "TVShow", [0.1, 0.2], ["title"], limit=3, distance=0.5
+    ).build()
+    assert "nearVector: {vector: [0.1, 0.2] distance: 0.5}" in query
+    assert "_additional {" in query and "distance" in query
+    assert "limit: 3" in query
+
+
+def test_bm25_and_hybrid_render_score():
+    bm25 = search.bm25("TVShow", "Rugrats", ["title"], with_vector=True).build()
+    assert 'bm25:{query: "Rugrats"}' in bm25
+    assert "score" in bm25 and "vector" in bm25
+
+    hybrid = search.hybrid("TVShow", "Rugrats", ["title"], alpha=0.5).build()
+    assert 'hybrid:{query: "Rugrats"' in hybrid
+    assert "alpha: 0.5" in hybrid
+
+
+def test_build_from_dict():
+    builder = search.build(
+        {
+            "method": "near_text",
+            "class_name": "TVShow",
+            "concepts": ["cartoons"],
+            "properties": ["title"],
+        }
+    )
+    assert "nearText" in builder.build()
+    with pytest.raises(ValueError):
+        search.build({"method": "nearest", "class_name": "TVShow"})
+
+
+def test_ranked_column():
+    assert search.ranked_column("_additional.distance") == "distance"
+    assert search.ranked_column("title") == "title"